@@ -0,0 +1,276 @@
+"""
+Call analytics kept up to date per call, instead of recomputed per report.
+
+Two tables in zoho_sync.db:
+
+    toky_call_facts   one row per extracted call: the dimensions it counts
+                      under (type, agent, week, outcome, objection tags)
+                      plus duration and whether a next step was committed
+    toky_call_stats   (dim, key) → calls, total duration, sales-outcome
+                      counts (won / lost / pending) and next steps
+
+dims: 'total' (key ''), 'type', 'agent', 'week' (ISO Monday of init_dt),
+'outcome' (won / lost / pending / n/a) and 'objection' (tags from
+OBJECTION_TAGS, or 'other'). Win rate is won / (won + lost + pending).
+
+record_call() is called by toky_service.save_extraction / save_noise_skip
+in the same transaction as the toky_extracts write. It first subtracts the
+call's previous fact row, if any, so re-extracting a call moves its counts
+instead of doubling them. Scripts that write toky_extracts directly call
+rebuild() afterwards; ensure_tables() also rebuilds once when the tables
+are new and calls already exist.
+
+/analytics reads overview(): one scan of toky_call_stats, which is a few
+hundred rows however many calls there are.
+"""
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from datetime import date, timedelta
+from typing import Optional
+
+SALES_OUTCOMES = ("won", "lost", "pending")
+
+# First match wins per objection; a call counts once per tag.
+OBJECTION_TAGS = (
+    ("price", re.compile(r"pric(e|ey)|expensive|cost|budget|afford|cheap|discount|too much", re.I)),
+    ("timing", re.compile(r"think about|not ready|timing|later|wait|too (soon|early|late)|closing date|listing date", re.I)),
+    ("decision_maker", re.compile(r"husband|wife|partner|spouse|realtor|check with|discuss with|family", re.I)),
+    ("competitor", re.compile(r"other (stager|compan|quote)|another (stager|compan)|competitor|shop(ping)? around", re.I)),
+    ("diy", re.compile(r"own furniture|ourselves|myself|diy|already (furnished|staged)", re.I)),
+    ("scope", re.compile(r"only need|just (the|one|a few)|fewer|smaller|partial|too many (items|pieces)", re.I)),
+)
+
+_STATS_COLUMNS = ("calls", "duration_s", "sales", "won", "lost", "next_step")
+
+
+def ensure_tables(conn: sqlite3.Connection) -> None:
+    """Create the aggregate tables. Idempotent; backfills from
+    toky_extracts the first time."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS toky_call_facts (
+            callid TEXT PRIMARY KEY,
+            call_type TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            week TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            objections_json TEXT NOT NULL DEFAULT '[]',
+            duration_s INTEGER NOT NULL DEFAULT 0,
+            next_step INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS toky_call_stats (
+            dim TEXT NOT NULL,
+            key TEXT NOT NULL,
+            calls INTEGER NOT NULL DEFAULT 0,
+            duration_s INTEGER NOT NULL DEFAULT 0,
+            sales INTEGER NOT NULL DEFAULT 0,
+            won INTEGER NOT NULL DEFAULT 0,
+            lost INTEGER NOT NULL DEFAULT 0,
+            next_step INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dim, key)
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+    empty = conn.execute("SELECT 1 FROM toky_call_facts LIMIT 1").fetchone() is None
+    if empty and conn.execute("SELECT 1 FROM toky_extracts LIMIT 1").fetchone():
+        rebuild(conn)
+
+
+# ---------------- facts ----------------
+
+def normalize_outcome(value) -> str:
+    text = str(value or "").strip().lower()
+    for outcome in SALES_OUTCOMES:
+        if text.startswith(outcome):
+            return outcome
+    return "n/a"
+
+
+def objection_tags(objections) -> list[str]:
+    if not isinstance(objections, list):
+        return []
+    tags: list[str] = []
+    for objection in objections:
+        tag = next((name for name, pattern in OBJECTION_TAGS if pattern.search(str(objection))), "other")
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def week_of(init_dt: Optional[str]) -> str:
+    """ISO date of the Monday of the call's week, or 'unknown'."""
+    try:
+        day = date.fromisoformat((init_dt or "")[:10])
+    except ValueError:
+        return "unknown"
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def build_fact(call_type, extract_json, agent_id, duration_s, init_dt) -> dict:
+    try:
+        extract = json.loads(extract_json or "{}")
+    except json.JSONDecodeError:
+        extract = {}
+    sales = extract.get("sales_signal") if isinstance(extract, dict) else None
+    sales = sales if isinstance(sales, dict) else {}
+    try:
+        duration = int(duration_s or 0)
+    except (ValueError, TypeError):
+        duration = 0
+    return {
+        "call_type": call_type or "other",
+        "agent": (agent_id or "").strip() or "unknown",
+        "week": week_of(init_dt),
+        "outcome": normalize_outcome(sales.get("outcome")),
+        "objections": objection_tags(sales.get("objections_raised")),
+        "duration_s": duration,
+        "next_step": 1 if str(sales.get("next_step_committed") or "").strip() else 0,
+    }
+
+
+def _keys(fact: dict) -> list[tuple[str, str]]:
+    keys = [
+        ("total", ""),
+        ("type", fact["call_type"]),
+        ("agent", fact["agent"]),
+        ("week", fact["week"]),
+        ("outcome", fact["outcome"]),
+    ]
+    keys.extend(("objection", tag) for tag in fact["objections"])
+    return keys
+
+
+def _deltas(fact: dict) -> tuple:
+    outcome = fact["outcome"]
+    return (
+        1,
+        fact["duration_s"],
+        1 if outcome in SALES_OUTCOMES else 0,
+        1 if outcome == "won" else 0,
+        1 if outcome == "lost" else 0,
+        fact["next_step"],
+    )
+
+
+def _apply(conn: sqlite3.Connection, fact: dict, sign: int) -> None:
+    deltas = tuple(sign * d for d in _deltas(fact))
+    conn.executemany(
+        """
+        INSERT INTO toky_call_stats (dim, key, calls, duration_s, sales, won, lost, next_step)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (dim, key) DO UPDATE SET
+            calls = calls + excluded.calls,
+            duration_s = duration_s + excluded.duration_s,
+            sales = sales + excluded.sales,
+            won = won + excluded.won,
+            lost = lost + excluded.lost,
+            next_step = next_step + excluded.next_step
+        """,
+        [(dim, key) + deltas for dim, key in _keys(fact)],
+    )
+
+
+def record_call(conn: sqlite3.Connection, callid: str) -> None:
+    """Fold the call's current extract into the aggregates, replacing
+    whatever it contributed before. Doesn't commit — runs inside the
+    caller's transaction so the extract and its counts land together."""
+    # DELETE … RETURNING takes the write lock before anything is read, so
+    # two writers can't both subtract the same old row.
+    old = conn.execute(
+        "DELETE FROM toky_call_facts WHERE callid = ? "
+        "RETURNING call_type, agent, week, outcome, objections_json, duration_s, next_step",
+        (callid,),
+    ).fetchone()
+    if old:
+        _apply(conn, {
+            "call_type": old[0], "agent": old[1], "week": old[2], "outcome": old[3],
+            "objections": json.loads(old[4] or "[]"), "duration_s": old[5], "next_step": old[6],
+        }, -1)
+
+    row = conn.execute(
+        """
+        SELECT e.call_type, e.extract_json, c.agent_id, c.duration_s, c.init_dt
+        FROM toky_extracts e
+        LEFT JOIN toky_calls c ON c.callid = e.callid
+        WHERE e.callid = ?
+        """,
+        (callid,),
+    ).fetchone()
+    if row is not None:
+        fact = build_fact(*row)
+        _insert_fact(conn, callid, fact)
+        _apply(conn, fact, 1)
+    conn.execute("DELETE FROM toky_call_stats WHERE calls <= 0")
+
+
+def _insert_fact(conn: sqlite3.Connection, callid: str, fact: dict) -> None:
+    conn.execute(
+        """
+        INSERT INTO toky_call_facts
+            (callid, call_type, agent, week, outcome, objections_json, duration_s, next_step)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (callid, fact["call_type"], fact["agent"], fact["week"], fact["outcome"],
+         json.dumps(fact["objections"]), fact["duration_s"], fact["next_step"]),
+    )
+
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    """Recompute both tables from toky_extracts. Returns the call count."""
+    totals: dict = {}
+    conn.execute("DELETE FROM toky_call_facts")
+    conn.execute("DELETE FROM toky_call_stats")
+    rows = conn.execute("""
+        SELECT e.callid, e.call_type, e.extract_json, c.agent_id, c.duration_s, c.init_dt
+        FROM toky_extracts e
+        LEFT JOIN toky_calls c ON c.callid = e.callid
+    """).fetchall()
+    for callid, *columns in rows:
+        fact = build_fact(*columns)
+        _insert_fact(conn, callid, fact)
+        deltas = _deltas(fact)
+        for key in _keys(fact):
+            current = totals.setdefault(key, [0] * len(_STATS_COLUMNS))
+            for i, d in enumerate(deltas):
+                current[i] += d
+    conn.executemany(
+        "INSERT INTO toky_call_stats (dim, key, calls, duration_s, sales, won, lost, next_step) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [key + tuple(values) for key, values in totals.items()],
+    )
+    conn.commit()
+    return len(rows)
+
+
+# ---------------- reads ----------------
+
+def overview(conn: sqlite3.Connection) -> dict:
+    """{dim: [row, …]} with derived avg_duration_s / win_rate /
+    next_step_rate. 'week' rows are newest first ('unknown' last), the rest
+    busiest first."""
+    out: dict = {}
+    for dim, key, calls, duration_s, sales, won, lost, next_step in conn.execute(
+        "SELECT dim, key, calls, duration_s, sales, won, lost, next_step FROM toky_call_stats"
+    ):
+        out.setdefault(dim, []).append({
+            "key": key,
+            "calls": calls,
+            "avg_duration_s": round(duration_s / calls) if calls else 0,
+            "sales": sales,
+            "won": won,
+            "lost": lost,
+            "pending": sales - won - lost,
+            "win_rate": won / sales if sales else None,
+            "next_step": next_step,
+            "next_step_rate": next_step / calls if calls else None,
+        })
+    for dim, rows in out.items():
+        if dim == "week":
+            rows.sort(key=lambda r: (r["key"] != "unknown", r["key"]), reverse=True)
+        else:
+            rows.sort(key=lambda r: (-r["calls"], r["key"]))
+    return out
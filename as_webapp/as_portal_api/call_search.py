@@ -0,0 +1,215 @@
+"""
+Full-text search over Toky calls (SQLite FTS5).
+
+toky_call_search indexes, per call:
+
+    summary      toky_extracts.summary
+    transcript   toky_transcripts.transcript_text
+    phones       from / to numbers and the extracted customer phone, each
+                 as its bare digits plus the last 10 and last 7 digits, so
+                 "+1 (416) 555-1234", "4165551234" and "555-1234" all hit
+
+Rows are keyed by toky_call_search_ids.id, a stable integer per callid:
+FTS5 rowids must be integers, and toky_calls' own rowid isn't stable
+across VACUUM. Triggers on toky_calls / toky_transcripts / toky_extracts
+re-index a call whenever one of its indexed columns changes (INSERT OR
+REPLACE fires the INSERT trigger), so the index never needs the app's
+cooperation, including for writes from the backfill scripts.
+
+ensure_tables() only creates the table and triggers. Calls that existed
+before it are indexed by tools/backfill_call_search.py, a batch at a time,
+so the write lock on zoho_sync.db is never held for long.
+
+search() ranks with bm25 (summary and phone hits weigh more than
+transcript hits) and returns an HTML-escaped snippet with <mark> around
+the matched terms.
+"""
+from __future__ import annotations
+
+import html
+import re
+import sqlite3
+from typing import Optional
+
+# Weights for bm25(), in column order: summary, transcript, phones.
+RANK_WEIGHTS = (3.0, 1.0, 5.0)
+SNIPPET_TOKENS = 24
+# Private-use markers so snippet text can be escaped before <mark> goes in.
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+
+
+def _digits(expr: str) -> str:
+    for ch in "+-() .":
+        expr = f"replace({expr}, '{ch}', '')"
+    return expr
+
+
+def _phone_terms(expr: str) -> str:
+    d = _digits(f"coalesce({expr}, '')")
+    return f"{d} || ' ' || substr({d}, -10) || ' ' || substr({d}, -7)"
+
+
+_CUSTOMER_PHONE = (
+    "CASE WHEN json_valid(e.extract_json) "
+    "THEN json_extract(e.extract_json, '$.customer.phone') END"
+)
+
+_SOURCE_SELECT = f"""
+    SELECT i.id, e.summary, t.transcript_text,
+           {_phone_terms('c.from_number')} || ' ' || {_phone_terms('c.to_number')}
+               || ' ' || {_phone_terms(_CUSTOMER_PHONE)}
+    FROM toky_call_search_ids i
+    JOIN toky_calls c ON c.callid = i.callid
+    LEFT JOIN toky_extracts e ON e.callid = c.callid
+    LEFT JOIN toky_transcripts t ON t.callid = c.callid
+"""
+
+
+def _reindex_sql(ref: str) -> str:
+    """Trigger body re-indexing the call whose callid is `ref`. No OR IGNORE
+    on the id insert: a trigger statement takes the outer statement's
+    conflict clause, so under INSERT OR REPLACE it would re-key the call."""
+    return f"""
+        INSERT INTO toky_call_search_ids (callid)
+            SELECT callid FROM toky_calls WHERE callid = {ref}
+            AND NOT EXISTS (SELECT 1 FROM toky_call_search_ids WHERE callid = {ref});
+        DELETE FROM toky_call_search
+            WHERE rowid = (SELECT id FROM toky_call_search_ids WHERE callid = {ref});
+        INSERT INTO toky_call_search (rowid, summary, transcript, phones)
+            {_SOURCE_SELECT} WHERE i.callid = {ref};
+    """
+
+
+_TRIGGERS = {
+    "toky_call_search_calls_ins": "AFTER INSERT ON toky_calls",
+    "toky_call_search_calls_upd": "AFTER UPDATE OF from_number, to_number ON toky_calls",
+    "toky_call_search_transcripts_ins": "AFTER INSERT ON toky_transcripts",
+    "toky_call_search_transcripts_upd": "AFTER UPDATE OF transcript_text ON toky_transcripts",
+    "toky_call_search_transcripts_del": "AFTER DELETE ON toky_transcripts",
+    "toky_call_search_extracts_ins": "AFTER INSERT ON toky_extracts",
+    "toky_call_search_extracts_upd": "AFTER UPDATE OF summary, extract_json ON toky_extracts",
+    "toky_call_search_extracts_del": "AFTER DELETE ON toky_extracts",
+}
+
+
+def ensure_tables(conn: sqlite3.Connection) -> None:
+    """Create the index, its id map and the sync triggers. Idempotent and
+    cheap — existing calls are left to the backfill CLI."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS toky_call_search_ids (
+            id INTEGER PRIMARY KEY,
+            callid TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS toky_call_search USING fts5(
+            summary, transcript, phones,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '3'
+        )
+    """)
+    for name, event in _TRIGGERS.items():
+        ref = "OLD.callid" if "DELETE" in event else "NEW.callid"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {_reindex_sql(ref)} END")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS toky_call_search_calls_del AFTER DELETE ON toky_calls BEGIN
+            DELETE FROM toky_call_search
+                WHERE rowid = (SELECT id FROM toky_call_search_ids WHERE callid = OLD.callid);
+            DELETE FROM toky_call_search_ids WHERE callid = OLD.callid;
+        END
+    """)
+    conn.commit()
+
+
+def backfill_batch(conn: sqlite3.Connection, after_rowid: int,
+                   batch_size: int) -> Optional[tuple[int, int]]:
+    """(Re)index the next batch_size calls by toky_calls rowid, in one short
+    transaction. Returns (last rowid done, calls done), or None when there
+    are no more."""
+    rows = conn.execute(
+        "SELECT rowid, callid FROM toky_calls WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (after_rowid, batch_size),
+    ).fetchall()
+    if not rows:
+        return None
+    callids = [(callid,) for _, callid in rows]
+    conn.executemany("INSERT OR IGNORE INTO toky_call_search_ids (callid) VALUES (?)", callids)
+    conn.executemany(
+        "DELETE FROM toky_call_search "
+        "WHERE rowid = (SELECT id FROM toky_call_search_ids WHERE callid = ?)",
+        callids,
+    )
+    conn.executemany(
+        f"INSERT INTO toky_call_search (rowid, summary, transcript, phones) "
+        f"{_SOURCE_SELECT} WHERE i.callid = ?",
+        callids,
+    )
+    conn.commit()
+    return rows[-1][0], len(rows)
+
+
+# ---------------- queries ----------------
+
+_PHONE_QUERY = re.compile(r"[\d\s+\-().]+")
+_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def match_expression(query: str) -> str:
+    """Turn what someone typed into a safe FTS5 MATCH expression: every
+    word (or "quoted phrase") must appear, the last word as a prefix. A
+    query that looks like a phone number becomes its last 10 digits."""
+    query = (query or "").strip()
+    digits = re.sub(r"\D", "", query)
+    if _PHONE_QUERY.fullmatch(query) and len(digits) >= 7:
+        return f'phones : "{digits[-10:]}"'
+    terms = []
+    for phrase, word in _TERM.findall(query):
+        text = (phrase or word).replace('"', "")
+        if re.search(r"\w", text):
+            terms.append(f'"{text}"')
+    if terms and not _TERM.findall(query)[-1][0]:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet: Optional[str]) -> str:
+    return html.escape(snippet or "").replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 20, offset: int = 0,
+           where: str = "", params: tuple = (), columns: str = "") -> list[dict]:
+    """Best matches first. `where` is an extra SQL condition (prefixed
+    with AND) and `columns` extra select-list entries, both on aliases c
+    (toky_calls) and e (toky_extracts). Each row has the call's list
+    columns plus `snippet_html` and `rank`."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    # A phone hit's best snippet would be the digits column; show the
+    # summary instead.
+    snippet_column = 0 if expression.startswith("phones") else -1
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    cur = conn.execute(
+        f"""
+        SELECT c.callid, c.direction, c.agent_id, c.from_number, c.to_number,
+               c.duration_s, c.init_dt, c.status, e.call_type, e.confidence, e.summary,
+               snippet(toky_call_search, {snippet_column}, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25(toky_call_search, {weights}) AS rank
+               {', ' + columns if columns else ''}
+        FROM toky_call_search
+        JOIN toky_call_search_ids i ON i.id = toky_call_search.rowid
+        JOIN toky_calls c ON c.callid = i.callid
+        LEFT JOIN toky_extracts e ON e.callid = c.callid
+        WHERE toky_call_search MATCH ? {where}
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+        """,
+        (_MARK_OPEN, _MARK_CLOSE, expression, *params, limit, offset),
+    )
+    columns = [d[0] for d in cur.description]
+    out = []
+    for values in cur.fetchall():
+        row = dict(zip(columns, values))
+        row["snippet_html"] = highlight(row.pop("snippet"))
+        out.append(row)
+    return out
@@ -0,0 +1,112 @@
+"""
+Change sequence for the mobile delta sync (/api/v1/sync).
+
+Every insert, update or delete on the tracked tables in zoho_sync.db is
+recorded in `change_log` by SQLite triggers, so the sequence is fed by
+every writer without each one having to remember: Zoho sync upserts and
+prunes, the portal API's milestone / areas / line-items / media /
+dictation endpoints, the task board's local edits.
+
+`change_log` keeps one row per entity: a new change deletes the entity's
+previous row and inserts a fresh one, so `seq` (AUTOINCREMENT, never
+reused) is the position of the entity's latest change. Writes serialize in
+SQLite, so seq order is commit order and a client that has applied
+everything up to cursor N only ever needs rows with seq > N.
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Optional
+
+# entity name -> (table, primary key column)
+TRACKED = {
+    "staging":   ("Staging_Report", "ID"),
+    "area":      ("Area_Report", "ID"),
+    "line_item": ("consultation_line_items", "id"),
+    "media":     ("media_uploads", "id"),
+    "dictation": ("consultation_dictations", "id"),
+}
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,),
+    ).fetchone() is not None
+
+
+def ensure_change_log(conn: sqlite3.Connection) -> bool:
+    """Create change_log and the triggers on every tracked table that
+    exists. Idempotent. Returns True once all tracked tables are covered —
+    Staging_Report / Area_Report only appear after their first Zoho sync,
+    so callers retry until then."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_entity "
+        "ON change_log(entity, entity_id)"
+    )
+
+    complete = True
+    for entity, (table, pk) in TRACKED.items():
+        if not _table_exists(conn, table):
+            complete = False
+            continue
+        for event, ref, op in (("INSERT", "NEW", "upsert"),
+                               ("UPDATE", "NEW", "upsert"),
+                               ("DELETE", "OLD", "delete")):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS change_log_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    DELETE FROM change_log
+                     WHERE entity = '{entity}' AND entity_id = {ref}.{pk};
+                    INSERT INTO change_log (entity, entity_id, op)
+                    VALUES ('{entity}', {ref}.{pk}, '{op}');
+                END
+            """)
+    conn.commit()
+    return complete
+
+
+def current_cursor(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()
+    return row[0] or 0
+
+
+def changes_since(conn: sqlite3.Connection, since: int,
+                  limit: int = 500) -> tuple[int, bool, dict]:
+    """Entities changed after `since`, oldest first, at most `limit`.
+
+    Returns (cursor, has_more, {entity: [ids]}). `cursor` is the seq of the
+    last change included, so passing it back resumes exactly after it.
+    Callers resolve the ids against the live tables: an id whose row is
+    gone (or filtered out as deleted) is reported as a delete."""
+    rows = conn.execute(
+        "SELECT seq, entity, entity_id FROM change_log "
+        "WHERE seq > ? ORDER BY seq LIMIT ?",
+        (since, limit + 1),
+    ).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    by_entity: dict = {entity: [] for entity in TRACKED}
+    for _, entity, entity_id in rows:
+        if entity in by_entity:
+            by_entity[entity].append(entity_id)
+    cursor = rows[-1][0] if rows else since
+    return cursor, has_more, by_entity
+
+
+def parse_cursor(value: Optional[str]) -> Optional[int]:
+    """`since` query param -> int, or None when missing / malformed."""
+    try:
+        cursor = int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor is None or cursor >= 0 else None
@@ -1,58 +1,409 @@
 """
-In-process SSE pub/sub for chat + notifications.
+SSE pub/sub for chat + notifications.
 
-Single-process broadcaster: each connected client owns an asyncio.Queue keyed
-on user_id. When a message lands or a notification fires, we look up every
-recipient and `put_nowait` an event onto each of their queues. The SSE
-endpoint drains the queue and writes `data: <json>\n\n` lines.
+Each connected client owns a Subscription keyed on user_id. When a message
+lands or a notification fires, we hand the event to a broker backend, which
+assigns it a monotonic event id and dispatches it back to the bus. The bus
+records it in the recipient's replay ring and puts it on every open
+subscription. The SSE endpoint drains the subscription and writes
+`id: <n>\ndata: <json>\n\n` frames so clients can resume with Last-Event-ID.
 
-If we ever scale the webapp to multiple Uvicorn workers we'll need a
-cross-process broker (Redis pub/sub or sqlite long-poll). For now one
-worker handles the whole team comfortably.
+Resume: a reconnect with Last-Event-ID is replayed only the gap, from the
+per-user ring (last REPLAY_BUFFER_SIZE events within REPLAY_WINDOW_SECONDS)
+or, failing that, from the broker's own log. If neither covers the gap the
+client gets a single `{"type": "reset"}` event and should refetch.
+
+Coalescing: read_receipt and notification events carry a key (per
+conversation). When a subscriber falls COALESCE_AFTER events behind, or
+asked for ?coalesce=1, a pending event with the same key is replaced by the
+newer one instead of queueing both.
+
+Two backends, picked by CHAT_BUS_BACKEND:
+
+  'local' (default) — in-process fan-out. Ids are seeded from the wall clock
+      so they keep increasing across restarts. One worker only.
+  'sqlite' — every publish is appended to an event log in data/chat_events.db
+      (by a writer thread, so a busy write lock never stalls the event
+      loop) and each worker tails the log with a cursor. Any worker can serve any
+      SSE connection, and a reconnecting client is replayed the rows it
+      missed from the log (retention: CHAT_BUS_RETENTION_SECONDS).
 """
 import asyncio
+import itertools
 import json
-from collections import defaultdict
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
 
+EVENTS_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "chat_events.db"
+POLL_INTERVAL_SECONDS = 0.25
+RETENTION_SECONDS = int(os.getenv("CHAT_BUS_RETENTION_SECONDS", "900"))
+
+REPLAY_BUFFER_SIZE = 500
+REPLAY_WINDOW_SECONDS = 600
+SUBSCRIPTION_MAX_PENDING = 200
+COALESCE_AFTER = 20
+COALESCED_TYPES = ("read_receipt", "notification")
+
+
+class LocalBroker:
+    """In-process backend: publish delivers straight to this worker's
+    subscribers. Cannot replay — a reconnect starts from live events."""
 
-class ChatBus:
     def __init__(self) -> None:
-        self._subs: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        # Microsecond wall-clock seed keeps ids monotonic across restarts.
+        seed = time.time_ns() // 1000
+        self._ids = itertools.count(seed)
+        # Every id above this was issued (and recorded) by this process.
+        self.origin_id = seed - 1
+        self._last_id = self.origin_id
+        self._id_lock = threading.Lock()
+
+    def attach(self, bus: "ChatBus") -> None:
+        self._bus = bus
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    def publish(self, user_ids: set[int], body: str, key: str | None) -> None:
+        with self._id_lock:
+            event_id = next(self._ids)
+            self._last_id = event_id
+        for uid in user_ids:
+            self._bus._dispatch(uid, event_id, body, key)
+
+    def replay(self, user_id: int, after_id: int) -> list[tuple] | None:
+        """Nothing beyond the bus's own ring — None means 'can't cover'."""
+        return None
+
+    def high_water(self) -> int:
+        """Highest event id issued so far."""
+        return self._last_id
+
+
+class SQLiteBroker:
+    """Cross-process backend: an append-only event log in SQLite (WAL).
+    publish() inserts one row per recipient; a poller task in every worker
+    tails the log past its cursor and delivers rows to local subscribers.
+    The AUTOINCREMENT rowid is the event id, so ids are global and
+    monotonic across workers and restarts. The log doubles as the replay
+    source for gaps older than this worker's in-memory ring."""
+
+    def __init__(self, path: Path = EVENTS_DB_PATH) -> None:
+        self._path = path
+        self._local = threading.local()
+        self._cursor = 0
+        # Ids above this have all passed through this worker's poller.
+        self.origin_id = 2 ** 63 - 1
+        self._task: asyncio.Task | None = None
+        self._last_prune = 0.0
+        # publish() hands rows to one writer thread; None stops it
+        self._writes: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._init_schema()
+
+    def attach(self, bus: "ChatBus") -> None:
+        self._bus = bus
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self._path), timeout=15, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS chat_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                coalesce_key TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_events_user
+                ON chat_events(user_id, id);
+        """)
+        cols = {r[1] for r in self._conn().execute("PRAGMA table_info(chat_events)")}
+        if "coalesce_key" not in cols:
+            self._conn().execute("ALTER TABLE chat_events ADD COLUMN coalesce_key TEXT")
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            row = self._conn().execute("SELECT MAX(id) FROM chat_events").fetchone()
+            self._cursor = row[0] or 0
+            self.origin_id = min(self.origin_id, self._cursor)
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._writes.put(None)   # after whatever is queued
+            await asyncio.to_thread(writer.join, 15)
+
+    def publish(self, user_ids: set[int], body: str, key: str | None) -> None:
+        """Queue the rows for the writer thread. Callers are route handlers
+        on the event loop; BEGIN IMMEDIATE can wait up to the connect
+        timeout for another worker's write, which must not block them."""
+        if not user_ids:
+            return
+        now = time.time()
+        self._writes.put([(uid, body, key, now) for uid in user_ids])
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="chat-bus-writer", daemon=True,
+                )
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            rows = self._writes.get()
+            if rows is None:
+                return
+            stop = False
+            # Whatever queued up meanwhile goes in the same transaction
+            while True:
+                try:
+                    more = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                rows.extend(more)
+            try:
+                self._insert(rows)
+                self._prune()
+            except Exception as e:
+                print(f"[Chat Bus] publish error ({len(rows)} events dropped): {e}")
+            if stop:
+                return
+
+    def _insert(self, rows: list[tuple]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO chat_events (user_id, body, coalesce_key, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _prune(self) -> None:
+        """Drop rows past retention; on the writer thread, like the inserts
+        (only publishing adds rows, so pruning after writes is enough)."""
+        now = time.time()
+        if now - self._last_prune > 60:
+            self._last_prune = now
+            self._conn().execute(
+                "DELETE FROM chat_events WHERE created_at < ?",
+                (now - RETENTION_SECONDS,),
+            )
+
+    def high_water(self) -> int:
+        """Highest event id ever issued (sqlite_sequence survives pruning)."""
+        row = self._conn().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'chat_events'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def replay(self, user_id: int, after_id: int) -> list[tuple] | None:
+        conn = self._conn()
+        oldest = conn.execute("SELECT MIN(id) FROM chat_events").fetchone()[0]
+        if oldest is not None and after_id + 1 < oldest:
+            return None  # the gap starts before what retention kept
+        return conn.execute(
+            "SELECT id, body, coalesce_key FROM chat_events "
+            "WHERE user_id = ? AND id > ? ORDER BY id",
+            (user_id, after_id),
+        ).fetchall()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                self._poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Chat Bus] poll error: {e}")
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    def _poll_once(self) -> None:
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, user_id, body, coalesce_key FROM chat_events "
+            "WHERE id > ? ORDER BY id LIMIT 1000",
+            (self._cursor,),
+        ).fetchall()
+        for event_id, uid, body, key in rows:
+            self._cursor = event_id
+            self._bus._dispatch(uid, event_id, body, key)
+
+
+def _make_broker():
+    backend = os.getenv("CHAT_BUS_BACKEND", "local").strip().lower()
+    if backend == "sqlite":
+        return SQLiteBroker()
+    return LocalBroker()
+
+
+class Subscription:
+    """One SSE connection's pending events. Bounded: past
+    SUBSCRIPTION_MAX_PENDING the oldest event is dropped so a stuck consumer
+    can't OOM the box. Items are (event_id, body); event_id is None for
+    out-of-band frames like `reset`."""
+
+    def __init__(self, coalesce: bool = False) -> None:
+        self.coalesce = coalesce
+        self.cursor = 0
+        self._pending: deque[tuple[int | None, str, str | None]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, event_id: int | None, body: str, key: str | None = None) -> None:
+        if key is not None and (self.coalesce or len(self._pending) >= COALESCE_AFTER):
+            for i, (_, _, pending_key) in enumerate(self._pending):
+                if pending_key == key:
+                    del self._pending[i]
+                    break
+        if len(self._pending) >= SUBSCRIPTION_MAX_PENDING:
+            self._pending.popleft()
+        self._pending.append((event_id, body, key))
+        self._ready.set()
+
+    async def get(self, timeout: float) -> tuple[int | None, str] | None:
+        """Next pending event, or None if nothing arrived within `timeout`."""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        event_id, body, _ = self._pending.popleft()
+        return event_id, body
+
+
+def _coalesce_key(event_type: str, payload: dict) -> str | None:
+    if event_type not in COALESCED_TYPES:
+        return None
+    data = payload.get("data") if event_type == "notification" else payload
+    conv_id = (data or {}).get("conversation_id")
+    return f"{event_type}:{conv_id}"
+
+
+_RESET_BODY = json.dumps({"type": "reset", "data": {}})
+
+
+class ChatBus:
+    def __init__(self, broker=None) -> None:
+        self._subs: dict[int, set[Subscription]] = defaultdict(set)
+        # user_id -> recent (event_id, ts, body, key), plus the highest id
+        # that has fallen out of the ring (for gap-coverage checks).
+        self._history: dict[int, deque] = defaultdict(
+            lambda: deque(maxlen=REPLAY_BUFFER_SIZE)
+        )
+        self._evicted_upto: dict[int, int] = {}
         self._lock = asyncio.Lock()
+        self._broker = broker or _make_broker()
+        self._broker.attach(self)
 
-    async def subscribe(self, user_id: int) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue(maxsize=200)
+    async def subscribe(self, user_id: int, last_event_id: int | None = None,
+                        coalesce: bool = False) -> Subscription:
+        """Register a subscription for this user. With `last_event_id`, the
+        events after it are queued first: from the replay ring if it covers
+        the gap, else from the broker's log, else a single reset event.
+
+        An id the broker never issued (e.g. a µs id from the local backend
+        after switching to sqlite) also gets a reset: trusting it as the
+        cursor would skip every event up to it."""
+        await self._broker.start()
+        sub = Subscription(coalesce=coalesce)
         async with self._lock:
-            self._subs[user_id].add(q)
-        return q
+            if last_event_id is not None and last_event_id > self._broker.high_water():
+                sub.put(None, _RESET_BODY)
+            elif last_event_id is not None:
+                backlog = self._replay(user_id, last_event_id)
+                if backlog is None:
+                    sub.put(None, _RESET_BODY)
+                else:
+                    for event_id, body, key in backlog:
+                        sub.put(event_id, body, key)
+                        sub.cursor = event_id
+                sub.cursor = max(sub.cursor, last_event_id)
+            self._subs[user_id].add(sub)
+        return sub
 
-    async def unsubscribe(self, user_id: int, q: asyncio.Queue) -> None:
+    async def unsubscribe(self, user_id: int, sub: Subscription) -> None:
         async with self._lock:
             subs = self._subs.get(user_id)
-            if subs and q in subs:
-                subs.discard(q)
+            if subs and sub in subs:
+                subs.discard(sub)
                 if not subs:
                     self._subs.pop(user_id, None)
 
     def publish(self, user_ids, event_type: str, payload: dict) -> None:
-        """Fire-and-forget broadcast. Safe to call from sync code; queues
-        are bounded so a slow consumer can't OOM the box — we drop oldest."""
+        """Fire-and-forget broadcast. Safe to call from sync code."""
         body = json.dumps({"type": event_type, "data": payload})
-        for uid in set(user_ids):
-            for q in list(self._subs.get(uid, ())):
-                try:
-                    q.put_nowait(body)
-                except asyncio.QueueFull:
-                    try:
-                        q.get_nowait()
-                    except asyncio.QueueEmpty:
-                        pass
-                    try:
-                        q.put_nowait(body)
-                    except asyncio.QueueFull:
-                        pass
+        self._broker.publish(set(user_ids), body, _coalesce_key(event_type, payload))
+
+    def _replay(self, user_id: int, after_id: int) -> list[tuple] | None:
+        ring = self._history.get(user_id)
+        if ring:
+            self._expire(user_id, ring)
+        # The ring is complete for ids above both the last evicted entry and
+        # the point where this process started seeing events.
+        floor = max(self._evicted_upto.get(user_id, 0), self._broker.origin_id)
+        if after_id >= floor:
+            return [(eid, body, key) for eid, _, body, key in (ring or ()) if eid > after_id]
+        return self._broker.replay(user_id, after_id)
+
+    def _expire(self, user_id: int, ring: deque) -> None:
+        cutoff = time.time() - REPLAY_WINDOW_SECONDS
+        while ring and ring[0][1] < cutoff:
+            self._evicted_upto[user_id] = ring.popleft()[0]
+
+    def _dispatch(self, user_id: int, event_id: int, body: str, key: str | None) -> None:
+        """Backend callback: record the event in the user's replay ring and
+        put it on each open subscription, skipping subscriptions that
+        already saw it (replay/poll overlap)."""
+        ring = self._history[user_id]
+        if len(ring) == ring.maxlen:
+            self._evicted_upto[user_id] = ring[0][0]
+        ring.append((event_id, time.time(), body, key))
+        self._expire(user_id, ring)
+        for sub in list(self._subs.get(user_id, ())):
+            if event_id <= sub.cursor:
+                continue
+            sub.cursor = event_id
+            sub.put(event_id, body, key)
+
+    async def close(self) -> None:
+        await self._broker.stop()
 
     def online_users(self) -> set[int]:
+        """Users with an SSE connection open on *this* worker."""
         return set(self._subs.keys())
 
 
@@ -7,6 +7,7 @@ discriminator and stays present even though phase 1 only writes 'internal'.
 """
 import json
 import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -14,16 +15,101 @@ DB_PATH = Path(__file__).resolve().parents[2] / "data" / "chat.db"
 EMPLOYEES_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "employees.db"
 
 
+# Warm connections kept around between calls. Each one is opened once with
+# WAL + tuned PRAGMAs and employees.db already attached as `emp`, and keeps
+# its own prepared-statement cache, so a chat route pays neither connect nor
+# ATTACH cost. Idle connections above POOL_MAX_IDLE are closed for real.
+POOL_MAX_IDLE = 8
+STATEMENT_CACHE_SIZE = 256
+
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool, so the
+    existing `conn = _conn(); try: ... finally: conn.close()` call sites
+    pick up pooling without changes."""
+
+    _pool_key: tuple[str, str] | None = None
+
+    def close(self) -> None:
+        if self._pool_key is None or not _pool.release(self):
+            super().close()
+
+
+class _ConnectionPool:
+    def __init__(self, max_idle: int) -> None:
+        self._max_idle = max_idle
+        self._idle: list[_PooledConnection] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key() -> tuple[str, str]:
+        return (str(DB_PATH), str(EMPLOYEES_DB_PATH))
+
+    def acquire(self) -> _PooledConnection:
+        key = self._key()
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if conn._pool_key == key:
+                    return conn
+                sqlite3.Connection.close(conn)
+        return self._open(key)
+
+    def release(self, conn: _PooledConnection) -> bool:
+        """Return a connection to the idle list. False means the caller
+        should really close it (pool full, or the DB paths changed)."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            return False
+        conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(None)
+        with self._lock:
+            if conn._pool_key != self._key() or len(self._idle) >= self._max_idle:
+                return False
+            self._idle.append(conn)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+    @staticmethod
+    def _open(key: tuple[str, str]) -> _PooledConnection:
+        conn = sqlite3.connect(
+            key[0],
+            timeout=15,
+            factory=_PooledConnection,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA cache_size = -8000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("ATTACH DATABASE ? AS emp", (key[1],))
+        conn._pool_key = key
+        return conn
+
+
+_pool = _ConnectionPool(POOL_MAX_IDLE)
+
+
 def _conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH), timeout=15)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Borrow a pooled connection (employees.db attached as `emp`).
+    Callers close() it when done, which returns it to the pool."""
+    return _pool.acquire()
 
 
 def init_schema() -> None:
     """Create tables on first import. Idempotent."""
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _pool.clear()
     conn = _conn()
     try:
         conn.executescript("""
@@ -47,6 +133,7 @@ def init_schema() -> None:
             last_read_message_id INTEGER,
             archived_at TEXT,
             pinned_position INTEGER,
+            unread_count INTEGER NOT NULL DEFAULT 0,
             PRIMARY KEY (conversation_id, user_id),
             FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
         );
@@ -128,6 +215,21 @@ def init_schema() -> None:
             conn.execute("ALTER TABLE messages ADD COLUMN reply_to_message_id INTEGER")
         if "deleted_at" not in msg_cols:
             conn.execute("ALTER TABLE messages ADD COLUMN deleted_at TEXT")
+        if "unread_count" not in existing:
+            # Denormalized counter kept current by insert_message / mark_read /
+            # delete_message. Backfill once from the message log.
+            conn.execute(
+                "ALTER TABLE participants ADD COLUMN unread_count INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.execute("""
+                UPDATE participants SET unread_count = (
+                    SELECT COUNT(*) FROM messages m
+                    WHERE m.conversation_id = participants.conversation_id
+                      AND m.id > COALESCE(participants.last_read_message_id, 0)
+                      AND m.sender_id != participants.user_id
+                      AND m.deleted_at IS NULL
+                )
+            """)
         conn.commit()
     finally:
         conn.close()
@@ -142,7 +244,6 @@ def list_employees(exclude_user_id: int | None = None) -> list[dict]:
     show them. Cross-DB attach is the simplest path; same disk."""
     conn = _conn()
     try:
-        conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
         rows = conn.execute("""
             SELECT id, first_name, last_name, email, user_role
             FROM emp.users
@@ -169,7 +270,6 @@ def list_employees(exclude_user_id: int | None = None) -> list[dict]:
 def get_employee(user_id: int) -> dict | None:
     conn = _conn()
     try:
-        conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
         r = conn.execute(
             "SELECT id, first_name, last_name, email, user_role "
             "FROM emp.users WHERE id = ? AND is_active = 1",
@@ -257,10 +357,13 @@ def list_conversations(user_id: int, archived: bool = False) -> list[dict]:
 
     Ordering: pinned_position ASC NULLS LAST, then last_message_at DESC.
     Anna's conversation is force-pinned to the top by chat_routes.
+
+    One statement regardless of how many conversations the user has:
+    unread counts come from the denormalized `participants.unread_count`
+    and DM titles from a join against the other participant.
     """
     conn = _conn()
     try:
-        conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
         archive_filter = (
             "AND p.archived_at IS NOT NULL" if archived
             else "AND p.archived_at IS NULL"
@@ -269,9 +372,15 @@ def list_conversations(user_id: int, archived: bool = False) -> list[dict]:
             SELECT c.id, c.channel, c.kind, c.title, c.created_by,
                    c.created_at, c.last_message_at, c.last_message_preview,
                    c.last_message_sender_id,
-                   p.last_read_message_id, p.archived_at, p.pinned_position
+                   p.archived_at, p.pinned_position, p.unread_count,
+                   u.first_name AS other_first_name, u.email AS other_email
             FROM conversations c
             JOIN participants p ON p.conversation_id = c.id
+            LEFT JOIN emp.users u ON c.kind != 'group' AND u.id = (
+                SELECT op.user_id FROM participants op
+                WHERE op.conversation_id = c.id AND op.user_id != p.user_id
+                LIMIT 1
+            )
             WHERE p.user_id = ?
               {archive_filter}
             ORDER BY
@@ -281,13 +390,12 @@ def list_conversations(user_id: int, archived: bool = False) -> list[dict]:
         """, (user_id,)).fetchall()
         out = []
         for r in rows:
-            unread = conn.execute("""
-                SELECT COUNT(*) AS n FROM messages m
-                WHERE m.conversation_id = ?
-                  AND m.id > COALESCE(?, 0)
-                  AND m.sender_id != ?
-            """, (r["id"], r["last_read_message_id"], user_id)).fetchone()["n"]
-            display_title = _resolve_title(conn, dict(r), user_id)
+            if r["kind"] == "group":
+                display_title = r["title"] or "Group"
+            elif r["other_email"] is None:
+                display_title = r["title"] or "Conversation"
+            else:
+                display_title = (r["other_first_name"] or "").strip() or r["other_email"]
             out.append({
                 "id": r["id"],
                 "channel": r["channel"],
@@ -298,7 +406,7 @@ def list_conversations(user_id: int, archived: bool = False) -> list[dict]:
                 "last_message_at": r["last_message_at"],
                 "last_message_preview": r["last_message_preview"],
                 "last_message_sender_id": r["last_message_sender_id"],
-                "unread_count": unread,
+                "unread_count": r["unread_count"],
                 "archived": r["archived_at"] is not None,
                 "pinned_position": r["pinned_position"],
             })
@@ -376,7 +484,6 @@ def _resolve_title(conn: sqlite3.Connection, conv: dict, viewer_id: int) -> str:
 def get_conversation(conv_id: int, viewer_id: int) -> dict | None:
     conn = _conn()
     try:
-        conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
         r = conn.execute("""
             SELECT c.*, p.last_read_message_id
             FROM conversations c
@@ -435,91 +542,112 @@ _MSG_COLS = (
 )
 
 
-def _hydrate_message(conn: sqlite3.Connection, row: sqlite3.Row) -> dict:
-    """Turn a messages row into the API shape, including a sender display
+def _in_clause(ids) -> str:
+    return ",".join("?" * len(ids))
+
+
+def _hydrate_messages(conn: sqlite3.Connection, rows: list[sqlite3.Row]) -> list[dict]:
+    """Turn messages rows into the API shape, including a sender display
     name, an optional `reply_to` quote preview, and aggregated `reactions`
-    (one row per emoji with count + user_ids)."""
-    conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
-    sender = conn.execute(
-        "SELECT first_name, last_name, email FROM emp.users WHERE id = ?",
-        (row["sender_id"],),
-    ).fetchone()
-    sender_name = (sender["first_name"] or "").strip() if sender else ""
-    if not sender_name and sender:
-        sender_name = sender["email"]
-
-    reply_to = None
-    rid = row["reply_to_message_id"] if "reply_to_message_id" in row.keys() else None
-    if rid:
-        r = conn.execute(
-            "SELECT id, sender_id, body, deleted_at FROM messages WHERE id = ?",
-            (rid,),
-        ).fetchone()
+    (one row per emoji with count + user_ids).
+
+    Works on a whole page at once: reply targets, senders, attachments and
+    reactions are each loaded with a single IN (...) query, so the cost is
+    a handful of statements no matter how many rows are passed in."""
+    if not rows:
+        return []
+    msg_ids = [r["id"] for r in rows]
+
+    reply_ids = sorted({
+        r["reply_to_message_id"] for r in rows
+        if "reply_to_message_id" in r.keys() and r["reply_to_message_id"]
+    })
+    replies: dict[int, sqlite3.Row] = {}
+    if reply_ids:
+        for r in conn.execute(
+            f"SELECT id, sender_id, body, deleted_at FROM messages "
+            f"WHERE id IN ({_in_clause(reply_ids)})",
+            reply_ids,
+        ).fetchall():
+            replies[r["id"]] = r
+
+    sender_ids = sorted(
+        {r["sender_id"] for r in rows} | {r["sender_id"] for r in replies.values()}
+    )
+    names: dict[int, str] = {}
+    for u in conn.execute(
+        f"SELECT id, first_name, email FROM emp.users "
+        f"WHERE id IN ({_in_clause(sender_ids)})",
+        sender_ids,
+    ).fetchall():
+        names[u["id"]] = (u["first_name"] or "").strip() or u["email"]
+
+    # Attachments (photos/videos/files) per message.
+    attachments: dict[int, list[dict]] = {}
+    for a in conn.execute(
+        f"SELECT id, message_id, kind, mime_type, size, original_name, width, height "
+        f"FROM attachments WHERE message_id IN ({_in_clause(msg_ids)}) ORDER BY id",
+        msg_ids,
+    ).fetchall():
+        attachments.setdefault(a["message_id"], []).append({
+            "id": a["id"],
+            "kind": a["kind"],
+            "mime_type": a["mime_type"],
+            "size": a["size"],
+            "original_name": a["original_name"],
+            "width": a["width"],
+            "height": a["height"],
+            "url": f"/api/v1/chat/attachments/{a['id']}",
+        })
+
+    # Aggregated reactions per message.
+    by_msg: dict[int, dict[str, list[int]]] = {}
+    for rr in conn.execute(
+        f"SELECT message_id, emoji, employee_id FROM reactions "
+        f"WHERE message_id IN ({_in_clause(msg_ids)}) ORDER BY message_id, emoji",
+        msg_ids,
+    ).fetchall():
+        by_msg.setdefault(rr["message_id"], {}).setdefault(rr["emoji"], []).append(
+            rr["employee_id"]
+        )
+
+    out = []
+    for row in rows:
+        reply_to = None
+        rid = row["reply_to_message_id"] if "reply_to_message_id" in row.keys() else None
+        r = replies.get(rid) if rid else None
         if r:
-            r_sender = conn.execute(
-                "SELECT first_name, email FROM emp.users WHERE id = ?",
-                (r["sender_id"],),
-            ).fetchone()
-            r_name = (r_sender["first_name"] or "").strip() if r_sender else ""
-            if not r_name and r_sender:
-                r_name = r_sender["email"]
             preview = "(message deleted)" if r["deleted_at"] else (r["body"] or "")
             reply_to = {
                 "id": r["id"],
                 "sender_id": r["sender_id"],
-                "sender_name": r_name,
+                "sender_name": names.get(r["sender_id"], ""),
                 "body": preview[:200],
                 "deleted": r["deleted_at"] is not None,
             }
+        out.append({
+            "id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "sender_id": row["sender_id"],
+            "body": row["body"] if not row["deleted_at"] else "",
+            "kind": row["kind"],
+            "created_at": row["created_at"],
+            "edited_at": row["edited_at"],
+            "deleted_at": row["deleted_at"],
+            "deleted": row["deleted_at"] is not None,
+            "reply_to": reply_to,
+            "reactions": [
+                {"emoji": e, "count": len(uids), "user_ids": uids}
+                for e, uids in by_msg.get(row["id"], {}).items()
+            ],
+            "attachments": attachments.get(row["id"], []),
+            "sender": {"id": row["sender_id"], "display_name": names.get(row["sender_id"], "")},
+        })
+    return out
 
-    # Attachments (photos/videos/files) for this message.
-    att_rows = conn.execute(
-        "SELECT id, kind, mime_type, size, original_name, width, height "
-        "FROM attachments WHERE message_id = ? ORDER BY id",
-        (row["id"],),
-    ).fetchall()
-    attachments = [
-        {
-            "id": a["id"],
-            "kind": a["kind"],
-            "mime_type": a["mime_type"],
-            "size": a["size"],
-            "original_name": a["original_name"],
-            "width": a["width"],
-            "height": a["height"],
-            "url": f"/api/v1/chat/attachments/{a['id']}",
-        }
-        for a in att_rows
-    ]
-
-    # Aggregated reactions for this message.
-    rxn_rows = conn.execute(
-        "SELECT emoji, employee_id FROM reactions WHERE message_id = ? ORDER BY emoji",
-        (row["id"],),
-    ).fetchall()
-    by_emoji: dict[str, list[int]] = {}
-    for rr in rxn_rows:
-        by_emoji.setdefault(rr["emoji"], []).append(rr["employee_id"])
-    reactions = [
-        {"emoji": e, "count": len(uids), "user_ids": uids}
-        for e, uids in by_emoji.items()
-    ]
-
-    return {
-        "id": row["id"],
-        "conversation_id": row["conversation_id"],
-        "sender_id": row["sender_id"],
-        "body": row["body"] if not row["deleted_at"] else "",
-        "kind": row["kind"],
-        "created_at": row["created_at"],
-        "edited_at": row["edited_at"],
-        "deleted_at": row["deleted_at"],
-        "deleted": row["deleted_at"] is not None,
-        "reply_to": reply_to,
-        "reactions": reactions,
-        "attachments": attachments,
-        "sender": {"id": row["sender_id"], "display_name": sender_name},
-    }
+
+def _hydrate_message(conn: sqlite3.Connection, row: sqlite3.Row) -> dict:
+    return _hydrate_messages(conn, [row])[0]
 
 
 # Where uploaded chat media lives. One subdir per conversation so we can
@@ -631,7 +759,7 @@ def list_messages(conv_id: int, limit: int = 50, before_id: int | None = None) -
                 WHERE conversation_id = ?
                 ORDER BY id DESC LIMIT ?
             """, (conv_id, limit)).fetchall()
-        return [_hydrate_message(conn, r) for r in reversed(rows)]
+        return _hydrate_messages(conn, list(reversed(rows)))
     finally:
         conn.close()
 
@@ -675,12 +803,18 @@ def insert_message(
             "WHERE id = ?",
             (preview, sender_id, conv_id),
         )
-        # Sender has now "read" their own message.
+        # Sender has now "read" their own message (and everything before
+        # it); everyone else gets one more unread.
         conn.execute(
-            "UPDATE participants SET last_read_message_id = ? "
+            "UPDATE participants SET last_read_message_id = ?, unread_count = 0 "
             "WHERE conversation_id = ? AND user_id = ?",
             (msg_id, conv_id, sender_id),
         )
+        conn.execute(
+            "UPDATE participants SET unread_count = unread_count + 1 "
+            "WHERE conversation_id = ? AND user_id != ?",
+            (conv_id, sender_id),
+        )
         row = conn.execute(
             f"SELECT {_MSG_COLS} FROM messages WHERE id = ?",
             (msg_id,),
@@ -757,6 +891,13 @@ def delete_message(msg_id: int, sender_id: int) -> dict | None:
             "UPDATE messages SET deleted_at = datetime('now') WHERE id = ?",
             (msg_id,),
         )
+        # Anyone who hadn't read it yet loses it from their unread count.
+        conn.execute(
+            "UPDATE participants SET unread_count = MAX(unread_count - 1, 0) "
+            "WHERE conversation_id = ? AND user_id != ? "
+            "  AND COALESCE(last_read_message_id, 0) < ?",
+            (r["conversation_id"], sender_id, msg_id),
+        )
         # If this was the last preview in the conversation, repoint to
         # the most recent surviving message (or clear it).
         latest = conn.execute(
@@ -801,6 +942,9 @@ def participant_ids(conv_id: int) -> list[int]:
 
 
 def mark_read(conv_id: int, user_id: int, message_id: int) -> None:
+    """Advance the read cursor and recount what's left unread past it.
+    The recount is an index range scan over idx_messages_conv_time and is
+    usually empty, since clients mark the newest message read."""
     conn = _conn()
     try:
         conn.execute("""
@@ -808,6 +952,17 @@ def mark_read(conv_id: int, user_id: int, message_id: int) -> None:
             SET last_read_message_id = MAX(COALESCE(last_read_message_id, 0), ?)
             WHERE conversation_id = ? AND user_id = ?
         """, (message_id, conv_id, user_id))
+        conn.execute("""
+            UPDATE participants
+            SET unread_count = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.conversation_id = participants.conversation_id
+                  AND m.id > COALESCE(participants.last_read_message_id, 0)
+                  AND m.sender_id != participants.user_id
+                  AND m.deleted_at IS NULL
+            )
+            WHERE conversation_id = ? AND user_id = ?
+        """, (conv_id, user_id))
         conn.commit()
     finally:
         conn.close()
@@ -904,7 +1059,6 @@ def get_anna_user_id() -> int | None:
     """Return the user_id of the Anna agent, or None if not seeded."""
     conn = _conn()
     try:
-        conn.execute(f"ATTACH DATABASE '{EMPLOYEES_DB_PATH}' AS emp")
         r = conn.execute(
             "SELECT id FROM emp.users WHERE user_role = 'agent' "
             "AND first_name = 'Anna' LIMIT 1"
@@ -15,7 +15,7 @@ from datetime import datetime
 from starlette.requests import Request
 from starlette.responses import FileResponse, JSONResponse, StreamingResponse
 
-from . import anna_service, chat_db, employees_db
+from . import anna_service, chat_db, employees_db, media_renditions
 from .chat_bus import bus
 
 
@@ -330,7 +330,7 @@ def register(rt):
         return JSONResponse({"message": full})
 
     @rt("/api/v1/chat/attachments/{att_id}")
-    def chat_get_attachment(request: Request, att_id: int):
+    async def chat_get_attachment(request: Request, att_id: int):
         user = _api_user(request)
         if not user:
             return JSONResponse({"error": "Not authenticated"}, status_code=401)
@@ -342,6 +342,9 @@ def register(rt):
         path = att["file_path"]
         if not os.path.isfile(path):
             return JSONResponse({"error": "File missing"}, status_code=410)
+        rendition = await media_renditions.rendition_response(request, path, att["mime_type"])
+        if rendition is not None:
+            return rendition
         return FileResponse(
             path,
             media_type=att["mime_type"] or "application/octet-stream",
@@ -466,7 +469,15 @@ def register(rt):
             return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
         user_id = user["id"]
-        queue = await bus.subscribe(user_id)
+        # Browsers' EventSource resends the last `id:` it saw as a header on
+        # reconnect; mobile clients can pass it as ?last_event_id= instead.
+        resume_raw = (request.headers.get("last-event-id")
+                      or request.query_params.get("last_event_id") or "").strip()
+        last_event_id = int(resume_raw) if resume_raw.isdigit() else None
+        # Slow consumers (or clients that ask) get read_receipt/notification
+        # bursts collapsed to the latest per conversation.
+        coalesce = request.query_params.get("coalesce") in ("1", "true", "yes")
+        sub = await bus.subscribe(user_id, last_event_id=last_event_id, coalesce=coalesce)
 
         async def event_stream():
             # Initial hello so the client knows the connection is live.
@@ -476,16 +487,19 @@ def register(rt):
                 while True:
                     if await request.is_disconnected():
                         break
-                    try:
-                        item = await asyncio.wait_for(queue.get(), timeout=20.0)
-                    except asyncio.TimeoutError:
+                    event = await sub.get(timeout=20.0)
+                    if event is None:
                         # Heartbeat keeps proxies / load balancers from idling
                         # the connection out at 30s.
                         yield ": ping\n\n"
                         continue
-                    yield f"data: {item}\n\n"
+                    event_id, item = event
+                    if event_id is None:
+                        yield f"data: {item}\n\n"
+                    else:
+                        yield f"id: {event_id}\ndata: {item}\n\n"
             finally:
-                await bus.unsubscribe(user_id, queue)
+                await bus.unsubscribe(user_id, sub)
 
         headers = {
             "Cache-Control": "no-cache, no-transform",
@@ -0,0 +1,320 @@
+"""
+Resumable chunked uploads into media_uploads.
+
+The single-request POST /api/v1/stagings/{id}/media restarts from byte 0
+whenever LTE drops mid-video. This protocol lets the device pick up where
+it stopped:
+
+    POST   /api/v1/stagings/{staging_id}/media/uploads
+           JSON {client_id, total_size, media_type, area_id, area_name,
+                 notes, filename, content_type}
+           -> {upload_id, offset, total_size, chunk_size}
+    PUT    /api/v1/media/uploads/{upload_id}     Upload-Offset: <n>, body = bytes
+           -> {offset}, or the media row once offset == total_size
+    GET    /api/v1/media/uploads/{upload_id}     -> {offset, total_size}
+    DELETE /api/v1/media/uploads/{upload_id}     abort
+
+Starting a session with a client_id that already has one returns that
+session (and its offset), so "start, then send from `offset`" is all a
+client needs after reconnecting. A client_id that has already finished
+returns the media row with deduped=True, same as the single-shot POST.
+
+Chunks are appended to data/staging_media/.incoming/<upload_id>.part and
+fsynced before the session's `received` counter moves, so the counter
+never claims bytes that aren't on disk. The in-process lock only covers
+one worker: the part file is also flock()ed while a chunk is written, and
+the counter only moves from the offset the chunk was written at, so a
+second worker process sending the same session gets OffsetConflict (409)
+instead of interleaving bytes. The last chunk moves the file into place
+with os.replace (same filesystem, atomic) and inserts the media_uploads
+row — a half-sent file is never visible to readers. Sessions
+idle for MEDIA_UPLOAD_SESSION_TTL_HOURS (default 48) are swept, with their
+part files, whenever a new one starts.
+"""
+import asyncio
+import fcntl
+import mimetypes
+import os
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parents[2]
+ZOHO_DB_PATH = ROOT / "data" / "zoho_sync.db"
+MEDIA_ROOT = ROOT / "data" / "staging_media"
+INCOMING_DIR = MEDIA_ROOT / ".incoming"
+
+CHUNK_SIZE = int(os.getenv("MEDIA_UPLOAD_CHUNK_MB", "4")) * 1024 * 1024
+MAX_CHUNK_SIZE = 8 * CHUNK_SIZE
+SESSION_TTL_HOURS = int(os.getenv("MEDIA_UPLOAD_SESSION_TTL_HOURS", "48"))
+
+_locks: dict = {}   # upload_id -> asyncio.Lock, one writer per session
+
+
+class OffsetConflict(RuntimeError):
+    """The session moved on (or went away) under a chunk; `offset` is where
+    it stands now, None when the session no longer exists."""
+
+    def __init__(self, offset: Optional[int]):
+        super().__init__(f"upload offset is now {offset}")
+        self.offset = offset
+
+
+def _conn():
+    conn = sqlite3.connect(str(ZOHO_DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def ensure_sessions_table() -> None:
+    """Create media_upload_sessions. Idempotent."""
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    conn = _conn()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media_upload_sessions (
+                id TEXT PRIMARY KEY,
+                staging_id TEXT NOT NULL,
+                area_id TEXT,
+                area_name TEXT,
+                media_type TEXT NOT NULL,
+                client_id TEXT NOT NULL UNIQUE,
+                filename TEXT,
+                content_type TEXT,
+                notes TEXT,
+                total_size INTEGER NOT NULL,
+                received INTEGER NOT NULL DEFAULT 0,
+                uploaded_by TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pick_extension(filename: str, content_type: str, media_type: str) -> str:
+    """Extension for a stored upload, from the device's filename or
+    content type."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext:
+        ext = mimetypes.guess_extension(content_type or "") or (".mp4" if media_type == "video" else ".jpg")
+    # Normalise a few guesses.
+    if ext == ".jpe":
+        ext = ".jpg"
+    return ext
+
+
+def media_file_path(staging_id: str, area_id: Optional[str], media_id: str, ext: str) -> str:
+    safe_area = (area_id or "unassigned").replace("/", "_").replace("..", "_")
+    area_dir = os.path.join(str(MEDIA_ROOT), staging_id, safe_area)
+    os.makedirs(area_dir, exist_ok=True)
+    return os.path.join(area_dir, f"{media_id}{ext}")
+
+
+def part_path(upload_id: str) -> Path:
+    return INCOMING_DIR / f"{upload_id}.part"
+
+
+def lock_for(upload_id: str) -> asyncio.Lock:
+    if upload_id not in _locks:
+        _locks[upload_id] = asyncio.Lock()
+    return _locks[upload_id]
+
+
+def find_media_by_client_id(client_id: str) -> Optional[dict]:
+    conn = _conn()
+    try:
+        row = conn.execute(
+            "SELECT id, staging_id, area_id, area_name, media_type, file_size, mime_type "
+            "FROM media_uploads WHERE client_id = ?",
+            (client_id,),
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def get_session(upload_id: str) -> Optional[dict]:
+    conn = _conn()
+    try:
+        row = conn.execute(
+            "SELECT * FROM media_upload_sessions WHERE id = ?", (upload_id,),
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def sweep_expired() -> int:
+    """Drop sessions idle longer than SESSION_TTL_HOURS and their part
+    files. Returns how many went."""
+    conn = _conn()
+    try:
+        stale = [r["id"] for r in conn.execute(
+            "SELECT id FROM media_upload_sessions WHERE updated_at < datetime('now', ?)",
+            (f"-{SESSION_TTL_HOURS} hours",),
+        )]
+        conn.executemany("DELETE FROM media_upload_sessions WHERE id = ?", [(s,) for s in stale])
+        conn.commit()
+    finally:
+        conn.close()
+    for upload_id in stale:
+        part_path(upload_id).unlink(missing_ok=True)
+        _locks.pop(upload_id, None)
+    return len(stale)
+
+
+def start_session(staging_id: str, client_id: str, total_size: int, media_type: str,
+                  area_id=None, area_name=None, notes=None, filename=None,
+                  content_type=None, uploaded_by=None) -> dict:
+    """Open a session, or return the one client_id already has."""
+    sweep_expired()
+    conn = _conn()
+    try:
+        existing = conn.execute(
+            "SELECT * FROM media_upload_sessions WHERE client_id = ?", (client_id,),
+        ).fetchone()
+        if existing:
+            return dict(existing)
+        upload_id = uuid.uuid4().hex
+        conn.execute(
+            """
+            INSERT INTO media_upload_sessions
+                (id, staging_id, area_id, area_name, media_type, client_id,
+                 filename, content_type, notes, total_size, uploaded_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (upload_id, staging_id, area_id, area_name, media_type, client_id,
+             filename, content_type, notes, total_size, uploaded_by),
+        )
+        conn.commit()
+        row = conn.execute(
+            "SELECT * FROM media_upload_sessions WHERE id = ?", (upload_id,),
+        ).fetchone()
+    finally:
+        conn.close()
+    part_path(upload_id).touch()
+    return dict(row)
+
+
+def _received(conn: sqlite3.Connection, upload_id: str) -> Optional[int]:
+    row = conn.execute(
+        "SELECT received FROM media_upload_sessions WHERE id = ?", (upload_id,),
+    ).fetchone()
+    return row["received"] if row else None
+
+
+def write_chunk(session: dict, offset: int, data: bytes) -> int:
+    """Write `data` at `offset` (== session["received"]), fsync, then
+    advance `received`. Blocking; run in a thread. Returns the new offset,
+    or raises OffsetConflict if another request moved the session first.
+    Anything past `offset` in the part file is a previous chunk that never
+    got acknowledged, so it's overwritten/truncated."""
+    path = part_path(session["id"])
+    new_offset = offset + len(data)
+    conn = _conn()
+    try:
+        with open(path, "r+b" if path.exists() else "wb") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)   # released when fh closes
+            current = _received(conn, session["id"])
+            if current != offset:
+                raise OffsetConflict(current)
+            fh.seek(offset)
+            fh.write(data)
+            fh.truncate()
+            fh.flush()
+            os.fsync(fh.fileno())
+            moved = conn.execute(
+                "UPDATE media_upload_sessions SET received = ?, updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ? AND received = ?",
+                (new_offset, session["id"], offset),
+            ).rowcount
+            conn.commit()
+            if moved != 1:
+                raise OffsetConflict(_received(conn, session["id"]))
+    finally:
+        conn.close()
+    return new_offset
+
+
+def finalize(session: dict) -> tuple[dict, bool]:
+    """Move a complete part file into place and insert its media_uploads
+    row (id = upload_id). Blocking; run in a thread. Returns (media,
+    deduped) — deduped when the single-shot endpoint stored the same
+    client_id first, in which case the assembled copy is discarded. Raises
+    OffsetConflict unless the session is still there and complete (another
+    worker may have finalized or aborted it)."""
+    media_id = session["id"]
+    ext = pick_extension(session["filename"], session["content_type"], session["media_type"])
+    file_path = media_file_path(session["staging_id"], session["area_id"], media_id, ext)
+    mime_type = session["content_type"] or mimetypes.guess_type(file_path)[0] or None
+
+    conn = _conn()
+    try:
+        # Held until the session row is deleted: one finalizer per session
+        conn.execute("BEGIN IMMEDIATE")
+        current = _received(conn, media_id)
+        if current != session["total_size"]:
+            conn.rollback()
+            raise OffsetConflict(current)
+        os.replace(part_path(media_id), file_path)
+        dir_fd = os.open(os.path.dirname(file_path), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        try:
+            conn.execute(
+                """
+                INSERT INTO media_uploads
+                    (id, staging_id, area_id, area_name, media_type, client_id,
+                     file_path, file_size, mime_type, uploaded_by, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    media_id, session["staging_id"], session["area_id"], session["area_name"],
+                    session["media_type"], session["client_id"],
+                    os.path.relpath(file_path, str(ROOT)), session["total_size"], mime_type,
+                    session["uploaded_by"], session["notes"],
+                ),
+            )
+            deduped = False
+        except sqlite3.IntegrityError:
+            os.remove(file_path)
+            deduped = True
+        conn.execute("DELETE FROM media_upload_sessions WHERE id = ?", (media_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    _locks.pop(media_id, None)
+
+    if deduped:
+        return find_media_by_client_id(session["client_id"]), True
+    return {
+        "id": media_id,
+        "staging_id": session["staging_id"],
+        "area_id": session["area_id"],
+        "area_name": session["area_name"],
+        "media_type": session["media_type"],
+        "file_size": session["total_size"],
+        "mime_type": mime_type,
+    }, False
+
+
+def abort(upload_id: str) -> bool:
+    conn = _conn()
+    try:
+        deleted = conn.execute(
+            "DELETE FROM media_upload_sessions WHERE id = ?", (upload_id,),
+        ).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    part_path(upload_id).unlink(missing_ok=True)
+    _locks.pop(upload_id, None)
+    return bool(deleted)
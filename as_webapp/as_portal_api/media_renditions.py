@@ -0,0 +1,211 @@
+"""
+On-demand resized renditions for /api/v1/media/{id} and
+/api/v1/chat/attachments/{id}.
+
+    GET /api/v1/media/123?w=480&fmt=webp
+
+`w` is snapped up to the next of WIDTHS (so a grid asking for 300, 310
+and 320 shares one file); `fmt` is jpeg (default) or webp. Requests
+without either parameter, and files that aren't raster images, get the
+original as before.
+
+A rendition is generated once, in the shared image process pool
+(tools/image_pipeline.py), from the EXIF-rotated original, and stored next
+to it:
+
+    data/staging_media/<...>/.renditions/<original name>.w480.webp
+
+Concurrent requests for the same missing rendition share one job. All
+renditions under RENDITION_ROOTS together stay within
+MEDIA_RENDITION_BUDGET_MB; past that the least recently served are
+deleted (file mtime is the LRU clock, touched on every hit, so the order
+survives restarts). Responses carry a strong ETag derived from the
+original's size + mtime and the rendition parameters, and answer a
+matching If-None-Match with 304.
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+
+from tools.image_pipeline import image_pipeline, render_resized
+
+_DATA = Path(__file__).resolve().parents[2] / "data"
+RENDITION_ROOTS = (_DATA / "staging_media", _DATA / "chat_media")
+BUDGET_BYTES = int(os.getenv("MEDIA_RENDITION_BUDGET_MB", "2048")) * 1024 * 1024
+
+WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+FORMATS = {"jpeg": ("JPEG", "jpg", "image/jpeg", 82), "jpg": ("JPEG", "jpg", "image/jpeg", 82),
+           "webp": ("WEBP", "webp", "image/webp", 80)}
+RASTER_TYPES = ("image/jpeg", "image/png", "image/webp", "image/heic", "image/heif",
+                "image/gif", "image/bmp", "image/tiff")
+# Bump when encoder settings change so clients drop cached renditions
+VERSION = "1"
+
+
+class RenditionIndex:
+    """LRU bookkeeping for every rendition file under RENDITION_ROOTS."""
+
+    def __init__(self, roots, budget_bytes: int) -> None:
+        self.roots = roots
+        self.budget_bytes = budget_bytes
+        self._files: "OrderedDict[str, int]" = OrderedDict()   # path -> size, LRU first
+        self._used = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def _scan(self) -> list:
+        """Existing renditions as (path, size), oldest first. Runs in a thread."""
+        found = []
+        for root in self.roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                if os.path.basename(dirpath) != ".renditions":
+                    continue
+                for name in filenames:
+                    if name.startswith(".tmp-"):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, path, st.st_size))
+        return [(path, size) for _, path, size in sorted(found)]
+
+    async def ensure_loaded(self) -> None:
+        # One scan however many first requests arrive together
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            found = await anyio.to_thread.run_sync(self._scan)
+            # Scanned files go in least recently used; anything added or
+            # discarded meanwhile is already accounted for
+            files: "OrderedDict[str, int]" = OrderedDict(
+                (path, size) for path, size in found if path not in self._files
+            )
+            self._used += sum(files.values())
+            files.update(self._files)
+            self._files = files
+            self._loaded = True
+
+    def touch(self, path: str) -> None:
+        if path in self._files:
+            self._files.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def add(self, path: str, size: int) -> None:
+        self._used -= self._files.pop(path, 0)
+        self._files[path] = size
+        self._used += size
+        while self._used > self.budget_bytes and len(self._files) > 1:
+            old, old_size = self._files.popitem(last=False)
+            self._used -= old_size
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def discard_for(self, original: str) -> None:
+        """Delete every rendition of `original` (it's being deleted)."""
+        prefix = os.path.join(os.path.dirname(original), ".renditions",
+                              os.path.basename(original) + ".w")
+        for path in [p for p in self._files if p.startswith(prefix)]:
+            self._used -= self._files.pop(path)
+        rendition_dir = os.path.dirname(prefix)
+        if os.path.isdir(rendition_dir):
+            for name in os.listdir(rendition_dir):
+                path = os.path.join(rendition_dir, name)
+                if path.startswith(prefix):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+_index = RenditionIndex(RENDITION_ROOTS, BUDGET_BYTES)
+_inflight: dict = {}   # rendition path -> Future
+
+
+def discard_renditions(original: str) -> None:
+    _index.discard_for(original)
+
+
+def _snap_width(w: int) -> int:
+    for width in WIDTHS:
+        if w <= width:
+            return width
+    return WIDTHS[-1]
+
+
+def _etag(st: os.stat_result, width: int, ext: str) -> str:
+    key = f"{st.st_size}-{st.st_mtime_ns}-{width}-{ext}-{VERSION}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=10).hexdigest() + '"'
+
+
+async def _render(original: str, path: str, width: int, fmt: str, quality: int) -> None:
+    size = await image_pipeline.run(render_resized, original, path, width, fmt, quality)
+    _index.add(path, size)
+
+
+async def _generate(original: str, path: str, width: int, fmt: str, quality: int) -> None:
+    """Render `path` once however many requests are waiting for it. The job
+    is shielded so a client disconnecting doesn't cancel it for the rest."""
+    pending = _inflight.get(path)
+    if pending is None:
+        pending = asyncio.ensure_future(_render(original, path, width, fmt, quality))
+        _inflight[path] = pending
+        pending.add_done_callback(lambda _: _inflight.pop(path, None))
+    await asyncio.shield(pending)
+
+
+async def rendition_response(request: Request, original: str,
+                             mime_type: Optional[str]) -> Optional[Response]:
+    """Response for a ?w= / ?fmt= request on `original`, or None when the
+    caller should serve the original (no rendition asked for, or not a
+    raster image)."""
+    params = request.query_params
+    if "w" not in params and "fmt" not in params:
+        return None
+    if (mime_type or "").lower() not in RASTER_TYPES:
+        return None
+
+    try:
+        width = _snap_width(int(params.get("w") or WIDTHS[-1]))
+    except ValueError:
+        return JSONResponse({"error": "w must be an integer"}, status_code=400)
+    fmt_key = (params.get("fmt") or "jpeg").lower()
+    if fmt_key not in FORMATS:
+        return JSONResponse({"error": f"fmt must be one of {', '.join(FORMATS)}"}, status_code=400)
+    fmt, ext, media_type, quality = FORMATS[fmt_key]
+
+    st = os.stat(original)
+    etag = _etag(st, width, ext)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000"}
+    path = os.path.join(os.path.dirname(original), ".renditions",
+                        f"{os.path.basename(original)}.w{width}.{ext}")
+
+    await _index.ensure_loaded()
+    if request.headers.get("if-none-match") == etag and os.path.exists(path):
+        _index.touch(path)
+        return Response(status_code=304, headers=headers)
+
+    if os.path.exists(path) and os.path.getmtime(path) >= st.st_mtime:
+        _index.touch(path)
+    else:
+        try:
+            await _generate(original, path, width, fmt, quality)
+        except Exception as e:
+            print(f"Rendition {path} failed: {e}")
+            return None
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -14,10 +14,11 @@ import re
 import sqlite3
 import uuid
 
+import anyio
 from starlette.requests import Request
-from starlette.responses import FileResponse, JSONResponse
+from starlette.responses import FileResponse, JSONResponse, Response
 
-from . import employees_db
+from . import change_feed, chunked_uploads, employees_db, media_renditions
 
 ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 ZOHO_DB_PATH = os.path.join(ROOT, "data", "zoho_sync.db")
@@ -72,6 +73,7 @@ def _ensure_media_table():
 
 
 _ensure_media_table()
+chunked_uploads.ensure_sessions_table()
 
 
 def _ensure_dictation_table():
@@ -177,6 +179,27 @@ def _ensure_toky_tables():
 _ensure_toky_tables()
 
 
+_change_log_ready = False
+
+
+def _ensure_change_log(conn: sqlite3.Connection = None):
+    """Install the change_log triggers (see change_feed.py). Re-checked on
+    each /api/v1/sync call until Staging_Report / Area_Report exist."""
+    global _change_log_ready
+    if _change_log_ready:
+        return
+    own = conn is None
+    conn = conn or sqlite3.connect(ZOHO_DB_PATH)
+    try:
+        _change_log_ready = change_feed.ensure_change_log(conn)
+    finally:
+        if own:
+            conn.close()
+
+
+_ensure_change_log()
+
+
 # ---------------- quote catalog + pricing ----------------
 # Mirrors page/staging_inquiry.py (items_data + getBaseFee + getAreaPrice).
 # Single source of truth for mobile consultations; if the website's list
@@ -478,6 +501,50 @@ _STAGING_SELECT = """
 """
 
 
+def _board_query(period: str, today: date):
+    """SQL + params for /api/v1/tasks/board, or None for an unknown period.
+
+    Range and ordering run on the indexed _Staging_Date_iso /
+    _Destaging_Date_iso generated columns (YYYY-MM-DD, NULL when the
+    MM/DD/YYYY text is empty or malformed — see
+    tools/zoho_sync/database.py ensure_iso_date_columns), so the rows come
+    back already filtered and sorted. tools/check_board_query_plans.py
+    asserts none of the dated periods scan Staging_Report."""
+    iso = today.isoformat()
+    if period == "today":
+        where = " AND (_Staging_Date_iso = ? OR _Destaging_Date_iso = ?)"
+        params = [iso, iso]
+    elif period == "week":
+        where = " AND _Staging_Date_iso BETWEEN ? AND ?"
+        params = [iso, (today + timedelta(days=6)).isoformat()]
+    elif period == "upcoming":
+        where = " AND _Staging_Date_iso BETWEEN ? AND ?"
+        params = [iso, (today + timedelta(days=60)).isoformat()]
+    elif period == "past":
+        where = " AND _Staging_Date_iso < ?"
+        params = [iso]
+    elif period == "all":
+        where = ""
+        params = []
+    else:
+        return None
+
+    if period == "all":
+        order = "_Staging_Date_iso IS NULL, _Staging_Date_iso DESC"
+    elif period == "past":
+        order = "_Staging_Date_iso DESC"
+    else:
+        order = "_Staging_Date_iso ASC"
+    query = f"""
+        {_STAGING_SELECT}
+        WHERE _sync_status != 'deleted'
+        {where}
+        ORDER BY {order}, CAST(ID AS INTEGER) DESC
+        LIMIT 500
+    """
+    return query, params
+
+
 def _staging_row_to_dict(r) -> dict:
     """Map a Staging_Report row (columns from _STAGING_SELECT) to the API shape."""
     staging_date = _parse_zoho_date(r["Staging_Date"])
@@ -536,6 +603,84 @@ def _staging_row_to_dict(r) -> dict:
 
 # ---------------- route registration ----------------
 
+_AREA_SELECT = """
+    SELECT ID, Area_Name, Area_Display_Name, Floor, Notes, Staging,
+           Videos_and_Pictures, Added_Time
+    FROM Area_Report
+    WHERE _sync_status != 'deleted'
+      AND (Delete_Area IS NULL OR Delete_Area = '' OR Delete_Area = 'false')
+"""
+
+
+def _area_row_to_dict(r) -> dict:
+    """Map an Area_Report row (columns from _AREA_SELECT) to the API shape."""
+    raw_name = r["Area_Name"] or r["Area_Display_Name"] or ""
+    display_name = _strip_area_prefix(r["Area_Display_Name"] or raw_name) or raw_name
+    return {
+        "id": r["ID"],
+        "name": display_name or "(unnamed)",
+        "raw_name": raw_name,
+        "floor": r["Floor"] or None,
+        "notes": r["Notes"] or None,
+    }
+
+
+_MEDIA_SELECT = """
+    SELECT id, staging_id, area_id, area_name, media_type, client_id,
+           file_size, mime_type, uploaded_by, uploaded_at, zoho_synced, notes
+    FROM media_uploads
+"""
+
+
+def _media_row_to_dict(r) -> dict:
+    """Map a media_uploads row (columns from _MEDIA_SELECT) to the API shape."""
+    return {
+        "id": r["id"],
+        "staging_id": r["staging_id"],
+        "area_id": r["area_id"],
+        "area_name": r["area_name"],
+        "media_type": r["media_type"],
+        "client_id": r["client_id"],
+        "file_size": r["file_size"],
+        "mime_type": r["mime_type"],
+        "uploaded_by": r["uploaded_by"],
+        "uploaded_at": r["uploaded_at"],
+        "zoho_synced": bool(r["zoho_synced"]),
+        "notes": r["notes"],
+        "url": f"/api/v1/media/{r['id']}",
+    }
+
+
+def _serve_file(request: Request, path: str, media_type: str) -> Response:
+    """FileResponse for a stored upload. Starlette answers Range requests
+    itself (206, multipart ranges, 416) and honours If-Range against the
+    ETag / Last-Modified set here from a single stat; a matching
+    If-None-Match gets 304. Stored files never change under the same id,
+    so clients may reuse them for a day without asking."""
+    response = FileResponse(path, media_type=media_type, stat_result=os.stat(path))
+    response.headers["Cache-Control"] = "private, max-age=86400"
+    etag = response.headers["etag"]
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers={
+            "ETag": etag, "Cache-Control": response.headers["Cache-Control"],
+        })
+    return response
+
+
+def _line_item_row_to_dict(r) -> dict:
+    return {
+        "id": r["id"],
+        "staging_id": r["staging_id"],
+        "area_id": r["area_id"],
+        "action": r["action"],
+        "item_name": r["item_name"],
+        "unit_price": r["unit_price"] or 0.0,
+        "quantity": r["quantity"] or 0,
+        "updated_at": r["updated_at"],
+    }
+
+
 def register(rt):
     """Attach all /api/v1/* handlers to the given FastHTML router."""
 
@@ -588,49 +733,14 @@ def register(rt):
 
         today = date.today()
 
-        def fmt(d):
-            return d.strftime("%m/%d/%Y")
-
-        sql_iso = ("substr(Staging_Date, 7, 4) || '-' || "
-                   "substr(Staging_Date, 1, 2) || '-' || substr(Staging_Date, 4, 2)")
-
-        date_filter_sql = ""
-        date_params = []
-        if period == "today":
-            date_filter_sql = " AND (Staging_Date = ? OR Destaging_Date = ?)"
-            date_params = [fmt(today), fmt(today)]
-        elif period == "week":
-            end = today + timedelta(days=6)
-            date_filter_sql = f" AND Staging_Date != '' AND {sql_iso} BETWEEN ? AND ?"
-            date_params = [today.isoformat(), end.isoformat()]
-        elif period == "upcoming":
-            end = today + timedelta(days=60)
-            date_filter_sql = f" AND Staging_Date != '' AND {sql_iso} BETWEEN ? AND ?"
-            date_params = [today.isoformat(), end.isoformat()]
-        elif period == "past":
-            date_filter_sql = f" AND Staging_Date != '' AND {sql_iso} < ?"
-            date_params = [today.isoformat()]
-        elif period == "all":
-            date_filter_sql = ""
-        else:
+        board_query = _board_query(period, today)
+        if board_query is None:
             return JSONResponse({"error": f"Invalid period: {period}"}, status_code=400)
+        query, date_params = board_query
 
         conn = sqlite3.connect(ZOHO_DB_PATH)
         conn.row_factory = sqlite3.Row
         try:
-            iso_expr = ("substr(Staging_Date, 7, 4) || '-' || "
-                        "substr(Staging_Date, 1, 2) || '-' || substr(Staging_Date, 4, 2)")
-            order_dir = "ASC" if period in ("today", "week", "upcoming") else "DESC"
-            query = f"""
-                {_STAGING_SELECT}
-                WHERE _sync_status != 'deleted'
-                {date_filter_sql}
-                ORDER BY
-                  CASE WHEN Staging_Date IS NULL OR Staging_Date = '' THEN 1 ELSE 0 END,
-                  {iso_expr} {order_dir},
-                  CAST(ID AS INTEGER) DESC
-                LIMIT 500
-            """
             rows = conn.execute(query, date_params).fetchall()
         finally:
             conn.close()
@@ -640,27 +750,6 @@ def register(rt):
 
         out = []
         for r in rows:
-            staging_date = _parse_zoho_date(r["Staging_Date"])
-
-            if period == "week":
-                if not staging_date:
-                    continue
-                sd = date.fromisoformat(staging_date)
-                if not (today <= sd <= today + timedelta(days=6)):
-                    continue
-            elif period == "upcoming":
-                if not staging_date:
-                    continue
-                sd = date.fromisoformat(staging_date)
-                if sd < today or sd > today + timedelta(days=60):
-                    continue
-            elif period == "past":
-                if not staging_date:
-                    continue
-                sd = date.fromisoformat(staging_date)
-                if sd >= today:
-                    continue
-
             staging = _staging_row_to_dict(r)
 
             if mine_flag and first_name_lower:
@@ -671,9 +760,6 @@ def register(rt):
 
             out.append(staging)
 
-        if period in ("upcoming", "today", "week"):
-            out.sort(key=lambda s: s["staging_date"] or "9999-12-31")
-
         return JSONResponse({"stagings": out, "total": len(out), "period": period, "today": today.isoformat()})
 
     @rt("/api/v1/stagings/{staging_id}/milestone", methods=["POST"])
@@ -1003,14 +1089,7 @@ def register(rt):
         conn.row_factory = sqlite3.Row
         try:
             rows = conn.execute(
-                """
-                SELECT ID, Area_Name, Area_Display_Name, Floor, Notes, Staging,
-                       Videos_and_Pictures, Added_Time
-                FROM Area_Report
-                WHERE _sync_status != 'deleted'
-                  AND (Delete_Area IS NULL OR Delete_Area = '' OR Delete_Area = 'false')
-                  AND Staging LIKE ?
-                """,
+                f"{_AREA_SELECT} AND Staging LIKE ?",
                 (f"%{staging_id}%",),
             ).fetchall()
         finally:
@@ -1023,16 +1102,9 @@ def register(rt):
             # Staging link ID matches the requested staging.
             if link.get("id") != staging_id:
                 continue
-            raw_name = r["Area_Name"] or r["Area_Display_Name"] or ""
-            display_name = _strip_area_prefix(r["Area_Display_Name"] or raw_name) or raw_name
-            areas.append({
-                "id": r["ID"],
-                "name": display_name or "(unnamed)",
-                "raw_name": raw_name,
-                "floor": r["Floor"] or None,
-                "notes": r["Notes"] or None,
-                "sort_key": raw_name,
-            })
+            area = _area_row_to_dict(r)
+            area["sort_key"] = area["raw_name"]
+            areas.append(area)
 
         areas.sort(key=lambda a: (a["sort_key"] or "").lower())
         for a in areas:
@@ -1200,35 +1272,13 @@ def register(rt):
         conn.row_factory = sqlite3.Row
         try:
             rows = conn.execute(
-                """
-                SELECT id, staging_id, area_id, area_name, media_type, client_id,
-                       file_size, mime_type, uploaded_by, uploaded_at, zoho_synced, notes
-                FROM media_uploads
-                WHERE staging_id = ?
-                ORDER BY uploaded_at DESC
-                """,
+                f"{_MEDIA_SELECT} WHERE staging_id = ? ORDER BY uploaded_at DESC",
                 (staging_id,),
             ).fetchall()
         finally:
             conn.close()
 
-        out = []
-        for r in rows:
-            out.append({
-                "id": r["id"],
-                "staging_id": r["staging_id"],
-                "area_id": r["area_id"],
-                "area_name": r["area_name"],
-                "media_type": r["media_type"],
-                "client_id": r["client_id"],
-                "file_size": r["file_size"],
-                "mime_type": r["mime_type"],
-                "uploaded_by": r["uploaded_by"],
-                "uploaded_at": r["uploaded_at"],
-                "zoho_synced": bool(r["zoho_synced"]),
-                "notes": r["notes"],
-                "url": f"/api/v1/media/{r['id']}",
-            })
+        out = [_media_row_to_dict(r) for r in rows]
 
         return JSONResponse({
             "staging_id": staging_id,
@@ -1296,18 +1346,10 @@ def register(rt):
         # Pick a sane extension from the uploaded filename / content type.
         original_name = getattr(upload, "filename", None) or ""
         content_type = getattr(upload, "content_type", None) or ""
-        ext = os.path.splitext(original_name)[1].lower()
-        if not ext:
-            ext = mimetypes.guess_extension(content_type) or (".mp4" if media_type == "video" else ".jpg")
-        # Normalise a few guesses.
-        if ext == ".jpe":
-            ext = ".jpg"
+        ext = chunked_uploads.pick_extension(original_name, content_type, media_type)
 
         media_id = uuid.uuid4().hex
-        safe_area = (area_id or "unassigned").replace("/", "_").replace("..", "_")
-        area_dir = os.path.join(MEDIA_ROOT, staging_id, safe_area)
-        os.makedirs(area_dir, exist_ok=True)
-        file_path = os.path.join(area_dir, f"{media_id}{ext}")
+        file_path = chunked_uploads.media_file_path(staging_id, area_id, media_id, ext)
 
         # Write the file to disk. Starlette's UploadFile exposes an async read()
         # that returns bytes; this fits in memory because the mobile client is
@@ -1353,8 +1395,142 @@ def register(rt):
             },
         })
 
+    # ---------------- Resumable media upload (see chunked_uploads) ----------------
+
+    @rt("/api/v1/stagings/{staging_id}/media/uploads", methods=["POST"])
+    async def v1_media_upload_start(request: Request, staging_id: str):
+        """Open (or resume) a chunked upload. JSON body: `client_id` and
+        `total_size` (required), plus the same optional fields as the
+        single-shot upload and `filename` / `content_type`."""
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        try:
+            data = await request.json()
+        except Exception:
+            return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+
+        client_id = (data.get("client_id") or "").strip()
+        if not client_id:
+            return JSONResponse({"error": "client_id required"}, status_code=400)
+        try:
+            total_size = int(data.get("total_size"))
+        except (TypeError, ValueError):
+            total_size = 0
+        if total_size <= 0:
+            return JSONResponse({"error": "total_size must be a positive integer"}, status_code=400)
+        media_type = (data.get("media_type") or "photo").lower()
+        if media_type not in ("photo", "panorama", "video"):
+            return JSONResponse({"error": "media_type must be photo|panorama|video"}, status_code=400)
+
+        existing = chunked_uploads.find_media_by_client_id(client_id)
+        if existing and existing["staging_id"] == staging_id:
+            existing["url"] = f"/api/v1/media/{existing['id']}"
+            return JSONResponse({"ok": True, "deduped": True, "media": existing})
+
+        session = chunked_uploads.start_session(
+            staging_id, client_id, total_size, media_type,
+            area_id=(data.get("area_id") or "").strip() or None,
+            area_name=(data.get("area_name") or "").strip() or None,
+            notes=(data.get("notes") or "").strip() or None,
+            filename=(data.get("filename") or "").strip() or None,
+            content_type=(data.get("content_type") or "").strip() or None,
+            uploaded_by=user.get("email"),
+        )
+        if session["staging_id"] != staging_id or session["total_size"] != total_size:
+            return JSONResponse(
+                {"error": "client_id already used for a different upload"}, status_code=409,
+            )
+        return JSONResponse({
+            "ok": True,
+            "upload_id": session["id"],
+            "offset": session["received"],
+            "total_size": session["total_size"],
+            "chunk_size": chunked_uploads.CHUNK_SIZE,
+        })
+
+    @rt("/api/v1/media/uploads/{upload_id}", methods=["GET"])
+    def v1_media_upload_status(request: Request, upload_id: str):
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        session = chunked_uploads.get_session(upload_id)
+        if not session:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return JSONResponse({
+            "upload_id": upload_id,
+            "offset": session["received"],
+            "total_size": session["total_size"],
+        })
+
+    def _offset_conflict(current: int) -> JSONResponse:
+        return JSONResponse(
+            {"error": "Offset mismatch", "offset": current}, status_code=409,
+            headers={"Upload-Offset": str(current)},
+        )
+
+    @rt("/api/v1/media/uploads/{upload_id}", methods=["PUT"])
+    async def v1_media_upload_chunk(request: Request, upload_id: str):
+        """Append the request body at `Upload-Offset` (header, or ?offset=).
+        The offset must equal the session's current offset — otherwise 409
+        with the offset to resume from. The chunk that reaches total_size
+        assembles the file and returns the media row."""
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        try:
+            offset = int(request.headers.get("upload-offset") or request.query_params.get("offset"))
+        except (TypeError, ValueError):
+            return JSONResponse({"error": "Upload-Offset header required"}, status_code=400)
+
+        async with chunked_uploads.lock_for(upload_id):
+            session = chunked_uploads.get_session(upload_id)
+            if not session:
+                return JSONResponse({"error": "Not found"}, status_code=404)
+            if offset != session["received"]:
+                return _offset_conflict(session["received"])
+
+            limit = min(chunked_uploads.MAX_CHUNK_SIZE, session["total_size"] - offset)
+            chunk = bytearray()
+            async for piece in request.stream():
+                chunk += piece
+                if len(chunk) > limit:
+                    return JSONResponse(
+                        {"error": f"Chunk exceeds {limit} bytes", "offset": offset}, status_code=413,
+                    )
+            if not chunk:
+                return JSONResponse({"error": "Empty chunk", "offset": offset}, status_code=400)
+
+            try:
+                offset = await anyio.to_thread.run_sync(
+                    chunked_uploads.write_chunk, session, offset, bytes(chunk),
+                )
+                if offset < session["total_size"]:
+                    return JSONResponse({"ok": True, "offset": offset})
+                media, deduped = await anyio.to_thread.run_sync(chunked_uploads.finalize, session)
+            except chunked_uploads.OffsetConflict as e:
+                # Another worker process moved the session under us
+                if e.offset is None:
+                    return JSONResponse({"error": "Not found"}, status_code=404)
+                return _offset_conflict(e.offset)
+
+        media["url"] = f"/api/v1/media/{media['id']}"
+        return JSONResponse({"ok": True, "deduped": deduped, "media": media})
+
+    @rt("/api/v1/media/uploads/{upload_id}", methods=["DELETE"])
+    async def v1_media_upload_abort(request: Request, upload_id: str):
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        async with chunked_uploads.lock_for(upload_id):
+            if not chunked_uploads.abort(upload_id):
+                return JSONResponse({"error": "Not found"}, status_code=404)
+        return JSONResponse({"ok": True, "upload_id": upload_id})
+
     @rt("/api/v1/media/{media_id}", methods=["GET"])
-    def v1_media_get(request: Request, media_id: str):
+    async def v1_media_get(request: Request, media_id: str):
+        """The stored file, or with ?w=/?fmt= a resized rendition of it
+        (see media_renditions)."""
         user = _api_user(request)
         if not user:
             return JSONResponse({"error": "Not authenticated"}, status_code=401)
@@ -1379,7 +1555,10 @@ def register(rt):
             return JSONResponse({"error": "Not found"}, status_code=404)
         if not os.path.exists(full):
             return JSONResponse({"error": "File missing"}, status_code=410)
-        return FileResponse(full, media_type=row["mime_type"] or "application/octet-stream")
+        rendition = await media_renditions.rendition_response(request, full, row["mime_type"])
+        if rendition is not None:
+            return rendition
+        return _serve_file(request, full, row["mime_type"] or "application/octet-stream")
 
     @rt("/api/v1/media/{media_id}", methods=["DELETE"])
     def v1_media_delete(request: Request, media_id: str):
@@ -1405,6 +1584,7 @@ def register(rt):
                     os.remove(full)
                 except OSError:
                     pass
+                media_renditions.discard_renditions(full)
             conn.execute("DELETE FROM media_uploads WHERE id = ?", (media_id,))
             conn.commit()
         finally:
@@ -1692,7 +1872,7 @@ def register(rt):
             return JSONResponse({"error": "Not found"}, status_code=404)
         if not os.path.exists(full):
             return JSONResponse({"error": "File missing"}, status_code=410)
-        return FileResponse(full, media_type="audio/m4a")
+        return _serve_file(request, full, "audio/m4a")
 
     @rt("/api/v1/dictations/{dictation_id}/send-email", methods=["POST"])
     async def v1_dictation_send_email(request: Request, dictation_id: str):
@@ -1846,6 +2026,93 @@ def register(rt):
             status_code=200 if not errors else 207,
         )
 
+    # ---------------- Delta sync ----------------
+    # Mobile refresh: instead of re-downloading the board, areas, media and
+    # dictation lists, the app keeps a cursor and asks for what changed
+    # since. The sequence is written by triggers (change_feed.py), so Zoho
+    # sync upserts and every local write endpoint feed it.
+
+    def _sync_fetch(conn, query: str, ids: list) -> list:
+        if not ids:
+            return []
+        placeholders = ",".join("?" for _ in ids)
+        return conn.execute(query.format(ids=placeholders), ids).fetchall()
+
+    @rt("/api/v1/sync")
+    def v1_sync(request: Request, since: str = "", limit: int = 500):
+        """Stagings, areas, line items, media and dictations created, changed
+        or deleted after cursor `since`.
+
+        No cursor (first run) or a cursor ahead of the server (DB restored)
+        returns `reset: true` with the current cursor and no rows:
+        the client does its normal full load, then syncs from that cursor.
+        Take the cursor *before* the full load — rows changed in between are
+        sent again, which is harmless because every change is a full upsert.
+
+        `has_more: true` means the page was cut at `limit` changes; call
+        again with the returned cursor. Ids in `deleted` are gone (hard
+        delete, or tombstoned with _sync_status = 'deleted')."""
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+        cursor = change_feed.parse_cursor(since)
+        limit = max(1, min(limit, 500))
+
+        conn = sqlite3.connect(ZOHO_DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            _ensure_change_log(conn)
+            head = change_feed.current_cursor(conn)
+            empty = {"stagings": [], "areas": [], "line_items": [], "media": [],
+                     "dictations": [],
+                     "deleted": {"stagings": [], "areas": [], "line_items": [],
+                                 "media": [], "dictations": []}}
+            if cursor is None or cursor > head:
+                return JSONResponse({"cursor": head, "reset": True, "has_more": False, **empty})
+
+            new_cursor, has_more, changed = change_feed.changes_since(conn, cursor, limit)
+
+            stagings = _sync_fetch(
+                conn, f"{_STAGING_SELECT} WHERE ID IN ({{ids}}) AND _sync_status != 'deleted'",
+                changed["staging"],
+            )
+            areas = _sync_fetch(conn, f"{_AREA_SELECT} AND ID IN ({{ids}})", changed["area"])
+            line_items = _sync_fetch(
+                conn,
+                "SELECT id, staging_id, area_id, action, item_name, unit_price, quantity, "
+                "updated_at FROM consultation_line_items WHERE id IN ({ids})",
+                changed["line_item"],
+            )
+            media = _sync_fetch(conn, f"{_MEDIA_SELECT} WHERE id IN ({{ids}})", changed["media"])
+            dictations = _sync_fetch(
+                conn, "SELECT * FROM consultation_dictations WHERE id IN ({ids})",
+                changed["dictation"],
+            )
+        finally:
+            conn.close()
+
+        def with_staging_id(r):
+            area = _area_row_to_dict(r)
+            area["staging_id"] = (_parse_zoho_link(r["Staging"]) or {}).get("id")
+            return area
+
+        payload = {
+            "stagings": [_staging_row_to_dict(r) for r in stagings],
+            "areas": [with_staging_id(r) for r in areas],
+            "line_items": [_line_item_row_to_dict(r) for r in line_items],
+            "media": [_media_row_to_dict(r) for r in media],
+            "dictations": [_dictation_row_to_dict(r) for r in dictations],
+        }
+        id_keys = {"stagings": ("staging", "id"), "areas": ("area", "id"),
+                   "line_items": ("line_item", "id"), "media": ("media", "id"),
+                   "dictations": ("dictation", "id")}
+        payload["deleted"] = {
+            key: sorted(set(changed[entity]) - {str(item[field]) for item in payload[key]})
+            for key, (entity, field) in id_keys.items()
+        }
+        return JSONResponse({"cursor": new_cursor, "reset": False, "has_more": has_more, **payload})
+
     @rt("/api/v1/items")
     def v1_items(request: Request, search: str = "", limit: int = 100):
         user = _api_user(request)
@@ -1939,6 +2206,19 @@ def register(rt):
             conn.close()
         return JSONResponse({"ok": True, "callid": callid, "queued": True})
 
+    @rt("/api/v1/toky/pipeline")
+    def v1_toky_pipeline(request: Request):
+        """Per-stage throughput / latency / queue depth of the running Toky
+        worker (see toky_pipeline.metrics)."""
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        from . import toky_pipeline
+        metrics = toky_pipeline.metrics()
+        if metrics is None:
+            return JSONResponse({"running": False})
+        return JSONResponse({"running": True, **metrics})
+
     @rt("/api/v1/toky/calls")
     def v1_toky_calls(request: Request, call_type: str = "", status: str = "", limit: int = 100):
         """List recent Toky calls with their extraction summary. Supports
@@ -2000,6 +2280,34 @@ def register(rt):
             })
         return JSONResponse({"calls": out, "total": len(out)})
 
+    @rt("/api/v1/toky/search")
+    def v1_toky_search(request: Request, q: str = "", call_type: str = "",
+                       limit: int = 20, offset: int = 0):
+        """Full-text search over transcripts, extract summaries and phone
+        numbers (call_search.py). Best match first; each hit carries
+        `snippet_html` with the matched terms in <mark>."""
+        user = _api_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        if not q.strip():
+            return JSONResponse({"error": "q is required"}, status_code=400)
+
+        from . import call_search
+        where, params = "", ()
+        if call_type:
+            where, params = "AND e.call_type = ?", (call_type,)
+        conn = sqlite3.connect(ZOHO_DB_PATH)
+        try:
+            results = call_search.search(
+                conn, q, limit=max(1, min(limit, 100)), offset=max(0, offset),
+                where=where, params=params,
+            )
+        except sqlite3.OperationalError as e:
+            return JSONResponse({"error": f"bad query: {e}"}, status_code=400)
+        finally:
+            conn.close()
+        return JSONResponse({"query": q, "results": results, "total": len(results)})
+
     @rt("/api/v1/toky/calls/{callid}")
     def v1_toky_call_detail(request: Request, callid: str):
         """Full detail: CDR + transcript + extract + any derived CS task / draft."""
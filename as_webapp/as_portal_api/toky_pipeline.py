@@ -0,0 +1,338 @@
+"""
+Staged Toky call pipeline.
+
+The old worker took one pending call at a time through download →
+Deepgram → Sonnet → DB writes, so a morning backlog drained at the speed
+of the slowest API call. Here each step is a stage with its own pool of
+workers and a bounded queue in front of it:
+
+    claim ─▶ [download] ─▶ [transcribe] ─▶ [extract] ─▶ [persist]
+
+- Pool sizes: TOKY_DOWNLOAD_WORKERS (4), TOKY_TRANSCRIBE_WORKERS (4),
+  TOKY_EXTRACT_WORKERS (3), TOKY_PERSIST_WORKERS (1 — SQLite has one
+  writer anyway).
+- Backpressure: every queue holds at most TOKY_STAGE_QUEUE (4) calls. A
+  full queue blocks the stage feeding it, and ultimately the claimer, so
+  calls stay 'pending' in toky_calls (where a restart won't lose them)
+  rather than piling up in memory.
+- Work runs in threads (the toky_service steps are blocking httpx /
+  sqlite); each DB-touching step opens its own connection.
+
+Calls come from toky_service.CALL_QUEUE (a lease-based job queue). While
+a call is anywhere in the pipeline its lease is renewed every third of
+TOKY_LEASE_SECONDS, so only a dead worker lets it lapse. A call that fails
+in any stage is counted against that stage and handed to fail_call(),
+which schedules a retry with backoff or, once out of attempts, leaves the
+call status='error'. Noise calls and recordings that can't be fetched end
+at the download stage, as before.
+
+metrics() reports, per stage: workers, busy, queued, processed, failed,
+throughput over the last minute and latency avg / p50 / p95 over the
+last LATENCY_WINDOW jobs. The worker logs it every
+TOKY_METRICS_LOG_SECONDS while there's traffic; /api/v1/toky/pipeline
+returns it.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from . import toky_service
+
+STAGES = ("download", "transcribe", "extract", "persist")
+DEFAULT_WORKERS = {"download": 4, "transcribe": 4, "extract": 3, "persist": 1}
+QUEUE_SIZE = int(os.getenv("TOKY_STAGE_QUEUE", "4"))
+POLL_SECONDS = 5
+METRICS_LOG_SECONDS = int(os.getenv("TOKY_METRICS_LOG_SECONDS", "60"))
+LATENCY_WINDOW = 200
+THROUGHPUT_WINDOW_S = 60
+
+
+def configured_workers() -> dict:
+    return {
+        stage: max(1, int(os.getenv(f"TOKY_{stage.upper()}_WORKERS", str(n))))
+        for stage, n in DEFAULT_WORKERS.items()
+    }
+
+
+def _percentile(ordered: list, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StageMetrics:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._finished_at: deque = deque()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        now = time.monotonic()
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+        self._latencies.append(seconds)
+        self._finished_at.append(now)
+        while self._finished_at and self._finished_at[0] < now - THROUGHPUT_WINDOW_S:
+            self._finished_at.popleft()
+
+    def snapshot(self, queued: int) -> dict:
+        now = time.monotonic()
+        recent = sum(1 for t in self._finished_at if t >= now - THROUGHPUT_WINDOW_S)
+        ordered = sorted(self._latencies)
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queued": queued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_minute": round(recent * 60 / THROUGHPUT_WINDOW_S, 1),
+            "latency_avg_s": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+            "latency_p50_s": round(_percentile(ordered, 0.50), 3),
+            "latency_p95_s": round(_percentile(ordered, 0.95), 3),
+        }
+
+
+class TokyPipeline:
+    """Drains toky_calls through the four stages until stop()."""
+
+    def __init__(self, db_path: str, workers: Optional[dict] = None,
+                 queue_size: int = QUEUE_SIZE,
+                 on_done: Optional[Callable[[dict], Awaitable[None]]] = None) -> None:
+        self.db_path = db_path
+        self.workers = workers or configured_workers()
+        self.on_done = on_done
+        self.queues = {stage: asyncio.Queue(maxsize=queue_size) for stage in STAGES}
+        self.stats = {stage: StageMetrics(self.workers[stage]) for stage in STAGES}
+        self.started_at = time.monotonic()
+        self._tasks: list = []
+        self._inflight: dict = {}   # callid -> Job, leases to keep alive
+        self.worker_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._steps = {
+            "download": self._download,
+            "transcribe": self._transcribe,
+            "extract": self._extract,
+            "persist": self._persist,
+        }
+
+    # ---- stage steps (blocking; run in threads) ----
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # Let concurrent writers wait instead of failing with "database is
+        # locked" — matters when a bulk backfill script is also writing.
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def _claim(self) -> Optional[tuple]:
+        conn = self._connect()
+        try:
+            return toky_service.claim_next_call(conn, self.worker_name)
+        finally:
+            conn.close()
+
+    def _download(self, job: dict) -> dict:
+        cdr = job["cdr"]
+        if toky_service.call_duration(cdr) < toky_service.NOISE_THRESHOLD_S:
+            conn = self._connect()
+            try:
+                job["summary"] = toky_service.save_noise_skip(conn, cdr["callid"])
+                toky_service.finish_call(conn, job["job"])
+            finally:
+                conn.close()
+            return job
+        mp3, failure = toky_service.fetch_audio(cdr)
+        if failure:
+            conn = self._connect()
+            try:
+                job["summary"] = toky_service.save_fetch_failure(conn, cdr["callid"], failure)
+                toky_service.finish_call(conn, job["job"])
+            finally:
+                conn.close()
+            return job
+        job["mp3"] = mp3
+        return job
+
+    def _transcribe(self, job: dict) -> dict:
+        cdr = job["cdr"]
+        text, dg_json = toky_service.transcribe(job["mp3"])
+        conn = self._connect()
+        try:
+            toky_service.save_transcript(conn, cdr["callid"], text, dg_json,
+                                         toky_service.call_duration(cdr))
+        finally:
+            conn.close()
+        job["transcript"] = text
+        return job
+
+    def _extract(self, job: dict) -> dict:
+        job["extract"], job["usage"] = toky_service.extract(job["transcript"], job["cdr"])
+        return job
+
+    def _persist(self, job: dict) -> dict:
+        conn = self._connect()
+        try:
+            job["summary"] = toky_service.save_extraction(
+                conn, job["cdr"]["callid"], job["extract"], job["usage"],
+            )
+            toky_service.finish_call(conn, job["job"])
+        finally:
+            conn.close()
+        return job
+
+    def _fail(self, job, error: str) -> str:
+        conn = self._connect()
+        try:
+            return toky_service.fail_call(conn, job, error)
+        finally:
+            conn.close()
+
+    def _heartbeat_all(self, jobs: list) -> None:
+        conn = self._connect()
+        try:
+            for job in jobs:
+                if not toky_service.CALL_QUEUE.heartbeat(conn, job):
+                    print(f"[Toky Pipeline] lease lost for {job.key}")
+        finally:
+            conn.close()
+
+    def _queue_counts(self) -> dict:
+        conn = self._connect()
+        try:
+            return toky_service.CALL_QUEUE.counts(conn)
+        finally:
+            conn.close()
+
+    # ---- loops ----
+
+    async def _claimer(self) -> None:
+        first = self.queues["download"]
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"[Toky Pipeline] claim failed: {e}")
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+            if claimed is None:
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+            cdr, lease = claimed
+            self._inflight[cdr["callid"]] = lease
+            await first.put({"cdr": cdr, "job": lease})
+
+    async def _heartbeats(self) -> None:
+        interval = max(1.0, toky_service.CALL_QUEUE.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if self._inflight:
+                try:
+                    await asyncio.to_thread(self._heartbeat_all, list(self._inflight.values()))
+                except Exception as e:
+                    print(f"[Toky Pipeline] heartbeat failed: {e}")
+
+    async def _worker(self, stage: str) -> None:
+        inbox = self.queues[stage]
+        index = STAGES.index(stage)
+        outbox = self.queues[STAGES[index + 1]] if index + 1 < len(STAGES) else None
+        stats = self.stats[stage]
+        step = self._steps[stage]
+        while True:
+            job = await inbox.get()
+            callid = job["cdr"]["callid"]
+            stats.busy += 1
+            t0 = time.monotonic()
+            try:
+                job = await asyncio.to_thread(step, job)
+            except Exception as e:
+                stats.record(time.monotonic() - t0, ok=False)
+                self._inflight.pop(callid, None)
+                try:
+                    outcome = await asyncio.to_thread(self._fail, job["job"], f"{stage}: {e}")
+                except Exception as fail_err:
+                    outcome = f"unrecorded ({fail_err})"
+                print(f"[Toky Pipeline] {stage} failed for {callid}: {e} -> {outcome}")
+                continue
+            finally:
+                stats.busy -= 1
+                inbox.task_done()
+            stats.record(time.monotonic() - t0, ok=True)
+
+            if "summary" in job or outbox is None:
+                self._inflight.pop(callid, None)
+                await self._finish(job.get("summary"))
+            else:
+                # Blocks while the next stage is saturated (backpressure)
+                await outbox.put(job)
+
+    async def _finish(self, summary: Optional[dict]) -> None:
+        if summary and self.on_done is not None:
+            try:
+                await self.on_done(summary)
+            except Exception as e:
+                print(f"[Toky Pipeline] on_done failed for {summary.get('callid')}: {e}")
+
+    async def _metrics_logger(self) -> None:
+        last = None
+        while True:
+            await asyncio.sleep(METRICS_LOG_SECONDS)
+            snapshot = self.metrics()["stages"]
+            counts = {s: (m["processed"], m["failed"], m["busy"], m["queued"]) for s, m in snapshot.items()}
+            if counts == last:
+                continue
+            last = counts
+            print("[Toky Pipeline] " + "  ".join(
+                f"{s}: {m['processed']} ok/{m['failed']} err, {m['per_minute']}/min, "
+                f"p50 {m['latency_p50_s']}s p95 {m['latency_p95_s']}s, "
+                f"busy {m['busy']}/{m['workers']}, queued {m['queued']}"
+                for s, m in snapshot.items()
+            ))
+
+    def start(self) -> None:
+        self._tasks.append(asyncio.create_task(self._claimer()))
+        self._tasks.append(asyncio.create_task(self._heartbeats()))
+        for stage in STAGES:
+            for _ in range(self.workers[stage]):
+                self._tasks.append(asyncio.create_task(self._worker(stage)))
+        if METRICS_LOG_SECONDS > 0:
+            self._tasks.append(asyncio.create_task(self._metrics_logger()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def idle(self) -> bool:
+        return all(q.empty() for q in self.queues.values()) and \
+            not any(m.busy for m in self.stats.values())
+
+    def metrics(self) -> dict:
+        try:
+            queue = self._queue_counts()
+        except sqlite3.Error:
+            queue = None
+        return {
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "queue": queue,
+            "stages": {stage: self.stats[stage].snapshot(self.queues[stage].qsize())
+                       for stage in STAGES},
+        }
+
+
+# The app's running pipeline, for /api/v1/toky/pipeline
+current: Optional[TokyPipeline] = None
+
+
+def metrics() -> Optional[dict]:
+    return current.metrics() if current is not None else None
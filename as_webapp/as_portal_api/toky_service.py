@@ -6,17 +6,31 @@ End-to-end flow per call:
     2. Background worker picks it up → downloads mp3 from record_url
     3. Deepgram Nova-3 (multichannel + diarize) → transcript + speakers
     4. Claude Sonnet 4.5 (tool-use) → structured extraction
-    5. Derived rows: cs_tasks (if customer_service_issue), staging_project_drafts
+    5. Derived rows: cs_tasks (if customer_service_issue), staging_project_drafts,
+       and the call's share of the /analytics aggregates (call_analytics.py)
     6. Optional Telegram ping when something needs Kenneth's eyes
 
 Keeps the same httpx/REST style as ai_service.py — no SDKs, small surface.
+
+process_call() runs those steps back to back for one call (backfill
+scripts). The app's worker runs the same steps as separate stages with
+their own worker pools (toky_pipeline.py): fetch_audio → transcribe →
+extract → save_extraction.
+
+Backends for steps 3 and 4 are picked by TOKY_TRANSCRIBE_BACKEND
+('deepgram' default, or 'stub') and TOKY_EXTRACT_BACKEND ('sonnet'
+default, or 'stub'). The stubs make no network calls: they sleep for
+TOKY_STUB_TRANSCRIBE_MS / TOKY_STUB_EXTRACT_MS and return canned output,
+so the pipeline can be load-tested offline (tools/bench_toky_pipeline.py).
 """
 from __future__ import annotations
 
 import json
 import logging
 import os
+import random
 import sqlite3
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -24,6 +38,10 @@ from typing import Any, Optional
 
 import httpx
 
+from tools.job_queue import Job, JobQueue, ensure_schema as ensure_job_schema
+
+from . import call_analytics, call_search
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,6 +71,33 @@ DEEPGRAM_PARAMS = {
 SONNET_MODEL = "claude-sonnet-4-5"
 NOISE_THRESHOLD_S = 4
 
+TRANSCRIBE_BACKEND = os.getenv("TOKY_TRANSCRIBE_BACKEND", "deepgram").strip().lower()
+EXTRACT_BACKEND = os.getenv("TOKY_EXTRACT_BACKEND", "sonnet").strip().lower()
+STUB_TRANSCRIBE_MS = int(os.getenv("TOKY_STUB_TRANSCRIBE_MS", "1500"))
+STUB_EXTRACT_MS = int(os.getenv("TOKY_STUB_EXTRACT_MS", "4000"))
+
+
+def _call_dead(conn: sqlite3.Connection, callid: str, payload: Any, error: str) -> None:
+    """CALL_QUEUE gave up on the call (failed or lease-expired too often)."""
+    conn.execute(
+        "UPDATE toky_calls SET status = 'error', error = ?, processed_at = ? "
+        "WHERE callid = ? AND status IN ('pending', 'processing')",
+        (error[:500], datetime.utcnow().isoformat(), callid),
+    )
+
+
+# Work queue for the worker (tools/job_queue.py). A claimed call is leased
+# for TOKY_LEASE_SECONDS (the pipeline heartbeats while it's in flight); a
+# worker that dies mid-call loses the lease and the call is picked up
+# again. Failures retry with backoff, then the call is left 'error'.
+CALL_QUEUE = JobQueue(
+    "toky",
+    lease_seconds=int(os.getenv("TOKY_LEASE_SECONDS", "600")),
+    max_attempts=int(os.getenv("TOKY_MAX_ATTEMPTS", "4")),
+    backoff_base=60.0,
+    on_dead=_call_dead,
+)
+
 # Mirrors routes.py._QUOTE_CATALOG — kept as a name list for the Sonnet prompt.
 _CATALOG_NAMES = [
     "Sofa", "Accent Chair", "Coffee Table", "End Table", "Console", "Bench",
@@ -277,7 +322,6 @@ def sonnet_extract(transcript: str, cdr_context: dict) -> tuple[dict, dict]:
         "content-type": "application/json",
     }
     # Anthropic 429 happens when we burst — retry with backoff.
-    import time
     for attempt in range(6):
         with httpx.Client(timeout=120.0) as c:
             r = c.post(ANTHROPIC_URL, headers=headers, json=payload)
@@ -299,6 +343,53 @@ def sonnet_extract(transcript: str, cdr_context: dict) -> tuple[dict, dict]:
     raise TokyServiceError(f"sonnet returned no tool_use block: {body}")
 
 
+# ---------------- stub backends ----------------
+
+def _stub_latency(ms: int) -> None:
+    # ±25% jitter so concurrent stages don't move in lockstep
+    time.sleep(ms / 1000.0 * random.uniform(0.75, 1.25))
+
+
+def stub_transcribe(mp3_path: Path) -> tuple[str, dict]:
+    """Offline stand-in for deepgram_transcribe: same return shape."""
+    _stub_latency(STUB_TRANSCRIBE_MS)
+    result = {
+        "metadata": {"channels": 2, "duration": 60.0, "stub": True},
+        "results": {"utterances": [
+            {"channel": 0, "speaker": 0, "transcript": "Astra Staging, this is Clara speaking."},
+            {"channel": 1, "speaker": 0, "transcript": f"Hi, I'm calling about staging ({mp3_path.name})."},
+        ]},
+    }
+    return _format_deepgram(result), result
+
+
+def stub_extract(transcript: str, cdr_context: dict) -> tuple[dict, dict]:
+    """Offline stand-in for sonnet_extract: a fixed sales lead."""
+    _stub_latency(STUB_EXTRACT_MS)
+    extract = {
+        "call_type": "sales_new_lead",
+        "confidence": 0.9,
+        "summary": "Stub extraction: caller asked about staging a condo.",
+        "customer": {"name": "Stub Caller", "phone": cdr_context.get("from") or ""},
+        "property": {"address": "1 Stub St, Toronto", "rooms_discussed": ["Living Room"]},
+        "suggested_quote_lines": [],
+        "sales_signal": {"outcome": "pending"},
+    }
+    return extract, {"input_tokens": len(transcript) // 4, "output_tokens": 200}
+
+
+def transcribe(mp3_path: Path) -> tuple[str, dict]:
+    if TRANSCRIBE_BACKEND == "stub":
+        return stub_transcribe(mp3_path)
+    return deepgram_transcribe(mp3_path)
+
+
+def extract(transcript: str, cdr_context: dict) -> tuple[dict, dict]:
+    if EXTRACT_BACKEND == "stub":
+        return stub_extract(transcript, cdr_context)
+    return sonnet_extract(transcript, cdr_context)
+
+
 # ---------------- DB helpers ----------------
 
 def ensure_tables(conn: sqlite3.Connection) -> None:
@@ -322,7 +413,12 @@ def ensure_tables(conn: sqlite3.Connection) -> None:
             processed_at TEXT
         )
     """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_toky_calls_status ON toky_calls(status)")
+    # /api/v1/toky/calls filters on status and sorts on received_at
+    conn.execute("DROP INDEX IF EXISTS idx_toky_calls_status")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_toky_calls_status_received "
+        "ON toky_calls(status, received_at)"
+    )
     conn.execute("CREATE INDEX IF NOT EXISTS idx_toky_calls_init ON toky_calls(init_dt)")
 
     conn.execute("""
@@ -389,6 +485,18 @@ def ensure_tables(conn: sqlite3.Connection) -> None:
     conn.execute("CREATE INDEX IF NOT EXISTS idx_drafts_status ON toky_staging_drafts(status)")
 
     conn.commit()
+    call_analytics.ensure_tables(conn)
+    call_search.ensure_tables(conn)
+
+    # Calls queued before the job queue existed (or left 'processing' by the
+    # old worker) get a job so the worker still picks them up.
+    ensure_job_schema(conn)
+    conn.execute("""
+        INSERT OR IGNORE INTO jobs (queue, key, payload)
+        SELECT ?, callid, 'null' FROM toky_calls
+        WHERE status IN ('pending', 'processing')
+    """, (CALL_QUEUE.name,))
+    conn.commit()
 
 
 def insert_cdr(conn: sqlite3.Connection, cdr: dict) -> str:
@@ -404,7 +512,7 @@ def insert_cdr(conn: sqlite3.Connection, cdr: dict) -> str:
     record_url = (cdr.get("record_url") or cdr.get("recording_url") or "")
     # CDR field names differ: webhook uses `from_number`/`agent`, /cdrs uses
     # `from`/`agent_id`. Accept either.
-    conn.execute("""
+    cur = conn.execute("""
         INSERT OR IGNORE INTO toky_calls (
             callid, direction, agent_id, from_number, to_number,
             duration_s, init_dt, end_dt, record_url, disposition_code,
@@ -423,28 +531,35 @@ def insert_cdr(conn: sqlite3.Connection, cdr: dict) -> str:
         cdr.get("disposition_code"),
         json.dumps(cdr),
     ))
-    conn.commit()
+    if cur.rowcount:
+        CALL_QUEUE.enqueue(conn, callid)   # commits the insert with it
+    else:
+        conn.commit()
     return callid
 
 
-def claim_next_pending(conn: sqlite3.Connection) -> Optional[dict]:
-    """Atomically claim the next pending call. Returns the CDR-ish row,
-    or None if the queue is empty."""
-    row = conn.execute(
-        "SELECT callid, raw_cdr_json, duration_s, record_url FROM toky_calls "
-        "WHERE status = 'pending' ORDER BY received_at ASC LIMIT 1"
-    ).fetchone()
-    if not row:
-        return None
-    # Mark as processing so a parallel worker doesn't double-process.
-    cur = conn.execute(
-        "UPDATE toky_calls SET status = 'processing' "
-        "WHERE callid = ? AND status = 'pending'",
-        (row[0],),
+def claim_next_call(conn: sqlite3.Connection, worker: str = "") -> Optional[tuple[dict, Job]]:
+    """Lease the next queued call and mark it 'processing'. Returns (the
+    CDR-ish row, its job) or None if nothing is due. The job must end in
+    finish_call() or fail_call()."""
+    while True:
+        job = CALL_QUEUE.claim(conn, worker)
+        if job is None:
+            return None
+        row = conn.execute(
+            "SELECT callid, raw_cdr_json, duration_s, record_url, status FROM toky_calls "
+            "WHERE callid = ?",
+            (job.key,),
+        ).fetchone()
+        if row is not None and row[4] in ("pending", "processing"):
+            break
+        # Call row deleted since, or finished outside the worker (e.g. the
+        # POC backfill import marked it done); nothing to do
+        CALL_QUEUE.complete(conn, job)
+    conn.execute(
+        "UPDATE toky_calls SET status = 'processing' WHERE callid = ?", (job.key,),
     )
     conn.commit()
-    if cur.rowcount == 0:
-        return None  # someone else got it
     try:
         cdr = json.loads(row[1] or "{}")
     except json.JSONDecodeError:
@@ -452,7 +567,25 @@ def claim_next_pending(conn: sqlite3.Connection) -> Optional[dict]:
     cdr["callid"] = row[0]
     cdr.setdefault("duration", row[2])
     cdr.setdefault("record_url", row[3])
-    return cdr
+    return cdr, job
+
+
+def finish_call(conn: sqlite3.Connection, job: Job) -> None:
+    CALL_QUEUE.complete(conn, job)
+
+
+def fail_call(conn: sqlite3.Connection, job: Job, error: str) -> str:
+    """Record a failed attempt on the call. Returns 'pending' when a retry
+    is scheduled (the call goes back to 'pending', error noted), 'dead'
+    when attempts are used up (_call_dead leaves the call 'error')."""
+    outcome = CALL_QUEUE.fail(conn, job, error)
+    if outcome == "pending":
+        conn.execute(
+            "UPDATE toky_calls SET status = 'pending', error = ? WHERE callid = ?",
+            (f"attempt {job.attempts} failed: {error}"[:500], job.key),
+        )
+        conn.commit()
+    return outcome
 
 
 def mark_done(conn: sqlite3.Connection, callid: str, status: str = "done", error: Optional[str] = None) -> None:
@@ -463,32 +596,35 @@ def mark_done(conn: sqlite3.Connection, callid: str, status: str = "done", error
     conn.commit()
 
 
-# ---------------- end-to-end per-call processing ----------------
+# ---------------- per-call steps ----------------
 
-def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
-    """Download → transcribe → extract → persist derived rows.
-    Returns a small summary dict (for logging/ping)."""
-    callid: str = cdr["callid"]
+def call_duration(cdr: dict) -> int:
     try:
-        duration = int(cdr.get("duration") or 0)
+        return int(cdr.get("duration") or 0)
     except (ValueError, TypeError):
-        duration = 0
+        return 0
 
-    # Short noise → mark done without burning Deepgram/Sonnet.
-    if duration < NOISE_THRESHOLD_S:
-        conn.execute("""
-            INSERT OR REPLACE INTO toky_extracts
-                (callid, call_type, confidence, summary, extract_json)
-            VALUES (?, 'voicemail_or_failed', 1.0, 'Too short to transcribe (<4s).', ?)
-        """, (callid, json.dumps({"auto_skipped": "noise"})))
-        mark_done(conn, callid, status="done")
-        return {"callid": callid, "call_type": "voicemail_or_failed", "skipped": True}
-
-    # 1. Resolve recording URL + download.
+
+def save_noise_skip(conn: sqlite3.Connection, callid: str) -> dict:
+    """Short noise → mark done without burning Deepgram/Sonnet."""
+    conn.execute("""
+        INSERT OR REPLACE INTO toky_extracts
+            (callid, call_type, confidence, summary, extract_json)
+        VALUES (?, 'voicemail_or_failed', 1.0, 'Too short to transcribe (<4s).', ?)
+    """, (callid, json.dumps({"auto_skipped": "noise"})))
+    call_analytics.record_call(conn, callid)
+    mark_done(conn, callid, status="done")
+    return {"callid": callid, "call_type": "voicemail_or_failed", "skipped": True}
+
+
+def fetch_audio(cdr: dict) -> tuple[Optional[Path], Optional[str]]:
+    """Resolve the recording URL and download it. Returns (mp3, None) or
+    (None, failure status) — 'no_recording' or 'download_err'."""
     # Prefer `record_url_raw` (direct S3) — the webhook's `record_url` points
     # at the app.toky.co HTML page, which Deepgram can't decode. Fall back to
     # GET /recordings/{callid} for list-originated CDRs that only have the
     # app URL.
+    callid: str = cdr["callid"]
     raw_url = cdr.get("record_url_raw")
     app_url = cdr.get("record_url")
     if raw_url and "tokystorage" in raw_url:
@@ -498,18 +634,29 @@ def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
     else:
         url = fetch_recording_url(callid)
     if not url:
-        mark_done(conn, callid, status="no_recording", error="recording url not available")
-        return {"callid": callid, "error": "no_recording"}
+        return None, "no_recording"
     mp3 = download_recording(callid, url)
     if not mp3:
-        mark_done(conn, callid, status="download_err", error="recording download failed")
-        return {"callid": callid, "error": "download_err"}
-
-    # 2. Deepgram — commit immediately so we don't hold the write lock
-    # across the ~5-15s Sonnet API call that follows. Parallel workers
-    # would otherwise hit "database is locked" on each other.
-    transcript_text, dg_json = deepgram_transcribe(mp3)
-    dg_duration = dg_json.get("metadata", {}).get("duration", duration)
+        return None, "download_err"
+    return mp3, None
+
+
+_FETCH_ERRORS = {
+    "no_recording": "recording url not available",
+    "download_err": "recording download failed",
+}
+
+
+def save_fetch_failure(conn: sqlite3.Connection, callid: str, status: str) -> dict:
+    mark_done(conn, callid, status=status, error=_FETCH_ERRORS[status])
+    return {"callid": callid, "error": status}
+
+
+def save_transcript(conn: sqlite3.Connection, callid: str, transcript_text: str,
+                    dg_json: dict, fallback_duration: int) -> None:
+    # Committed on its own so a failed extraction doesn't cost the
+    # transcript, and so the write lock isn't held across the Sonnet call.
+    dg_duration = dg_json.get("metadata", {}).get("duration", fallback_duration)
     conn.execute("""
         INSERT OR REPLACE INTO toky_transcripts
             (callid, transcript_text, deepgram_json, duration_s)
@@ -517,8 +664,10 @@ def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
     """, (callid, transcript_text, json.dumps(dg_json), float(dg_duration or 0)))
     conn.commit()
 
-    # 3. Sonnet extraction
-    extract, usage = sonnet_extract(transcript_text, cdr)
+
+def save_extraction(conn: sqlite3.Connection, callid: str, extract: dict, usage: dict) -> dict:
+    """Write the extraction, its derived rows, and mark the call done.
+    Returns the summary dict (for logging/ping)."""
     conn.execute("""
         INSERT OR REPLACE INTO toky_extracts
             (callid, call_type, confidence, summary, extract_json,
@@ -529,9 +678,9 @@ def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
         extract.get("summary"), json.dumps(extract),
         int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0),
     ))
+    call_analytics.record_call(conn, callid)
     conn.commit()
 
-    # 4. Derived rows
     _maybe_insert_cs_task(conn, callid, extract)
     _maybe_insert_staging_draft(conn, callid, extract)
 
@@ -545,6 +694,25 @@ def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
     }
 
 
+def process_call(conn: sqlite3.Connection, cdr: dict) -> dict:
+    """Download → transcribe → extract → persist derived rows, serially.
+    Returns a small summary dict (for logging/ping)."""
+    callid: str = cdr["callid"]
+    duration = call_duration(cdr)
+    if duration < NOISE_THRESHOLD_S:
+        return save_noise_skip(conn, callid)
+
+    mp3, failure = fetch_audio(cdr)
+    if failure:
+        return save_fetch_failure(conn, callid, failure)
+
+    transcript_text, dg_json = transcribe(mp3)
+    save_transcript(conn, callid, transcript_text, dg_json, duration)
+
+    extraction, usage = extract(transcript_text, cdr)
+    return save_extraction(conn, callid, extraction, usage)
+
+
 def _coerce_dict(v: Any) -> Optional[dict]:
     return v if isinstance(v, dict) else None
 
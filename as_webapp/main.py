@@ -26,6 +26,7 @@ from starlette.staticfiles import StaticFiles
 # Sub-app mounts (moved from main.py as part of Phase 2)
 from page.item_management import item_management_app_export
 from page.zoho_sync import zoho_sync_app_export
+from page import static_bundles
 
 # Background sync services (moved from main.py as part of Phase 3)
 from tools.zoho_sync.database import db as zoho_db
@@ -34,9 +35,11 @@ from tools.zoho_sync.image_downloader import image_downloader
 from tools.zoho_sync.sync_service import sync_service
 from tools.zoho_sync.write_service import write_service
 from tools.zoho_sync.page_sync_service import PageSyncService
+from tools.image_pipeline import image_pipeline
 
 from as_webapp.as_portal_api import routes as portal_api
 from as_webapp.as_portal_api import chat_routes
+from as_webapp.as_portal_api.chat_bus import bus as chat_bus
 from as_webapp.portal_web import routes as portal_web
 from as_webapp.portal_web import staging_task_board
 from as_webapp.portal_web import toky_call_intake
@@ -113,6 +116,10 @@ class ChatWidgetInjector:
 app.add_middleware(ChatWidgetInjector)
 
 
+# Fingerprinted CSS/JS bundles (page/static_bundles.py), served
+# precompressed with immutable cache headers
+static_bundles.mount(app)
+
 # Static mount — images, CSS, 3D models live in static/. Both servers serve
 # them; convenient for the portal designer UI that references /static/models/.
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -201,60 +208,31 @@ async def background_multi_report_sync():
 AUTO_SYNC_ENABLED = True
 
 
-def _toky_process_one_sync(db_path: str) -> dict | None:
-    """One iteration of the Toky worker, pure-sync so it runs cleanly in
-    `asyncio.to_thread`. Opens its own sqlite connection (SQLite disallows
-    cross-thread connection reuse). Returns the summary dict if a call was
-    processed, None if the queue was empty."""
-    import sqlite3 as _sqlite
-    from as_webapp.as_portal_api import toky_service
-    conn = _sqlite.connect(db_path, timeout=30)
-    # Let concurrent writers wait instead of failing with "database is
-    # locked" — matters when a bulk backfill script is also writing.
-    conn.execute("PRAGMA busy_timeout = 30000")
-    try:
-        cdr = toky_service.claim_next_pending(conn)
-        if not cdr:
-            return None
-        try:
-            return toky_service.process_call(conn, cdr)
-        except Exception as e:
-            toky_service.mark_done(
-                conn, cdr["callid"], status="error", error=str(e)[:500],
-            )
-            raise
-    finally:
-        conn.close()
+async def _on_toky_call_done(summary: dict) -> None:
+    await _maybe_ping_telegram(summary)
+    await _maybe_email_draft(summary)
+    print(f"[Toky Worker] {summary.get('callid')} "
+          f"type={summary.get('call_type')} "
+          f"cs={summary.get('cs_task', False)}")
 
 
 async def background_toky_worker():
-    """Drain toky_calls rows with status='pending': download → Deepgram →
-    Sonnet → write derived rows → optional Telegram ping. Runs forever."""
+    """Drain toky_calls rows with status='pending' through the staged
+    pipeline (toky_pipeline.py): download → Deepgram → Sonnet → write
+    derived rows, each stage with its own worker pool, then the optional
+    Telegram ping / email. Runs forever."""
+    from as_webapp.as_portal_api import toky_pipeline
     from as_webapp.as_portal_api.routes import ZOHO_DB_PATH
 
-    print("[Toky Worker] started")
-    while True:
-        try:
-            try:
-                summary = await asyncio.to_thread(_toky_process_one_sync, ZOHO_DB_PATH)
-            except Exception as e:
-                print(f"[Toky Worker] call failed: {e}")
-                await asyncio.sleep(3)
-                continue
-
-            if summary:
-                await _maybe_ping_telegram(summary)
-                await _maybe_email_draft(summary)
-                print(f"[Toky Worker] {summary.get('callid')} "
-                      f"type={summary.get('call_type')} "
-                      f"cs={summary.get('cs_task', False)}")
-            else:
-                await asyncio.sleep(5)
-        except asyncio.CancelledError:
-            break
-        except Exception as e:
-            print(f"[Toky Worker] loop error: {e}")
-            await asyncio.sleep(10)
+    pipeline = toky_pipeline.TokyPipeline(ZOHO_DB_PATH, on_done=_on_toky_call_done)
+    toky_pipeline.current = pipeline
+    pipeline.start()
+    print(f"[Toky Worker] started, stage workers {pipeline.workers}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pipeline.stop()
+        toky_pipeline.current = None
 
 
 async def _maybe_ping_telegram(summary: dict) -> None:
@@ -485,6 +463,9 @@ async def shutdown():
     if _page_sync_service:
         await _page_sync_service.close()
 
+    await chat_bus.close()
+    image_pipeline.shutdown()
+
     await zoho_db.disconnect()
     await zoho_api.close()
     await image_downloader.close()
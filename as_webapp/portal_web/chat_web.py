@@ -1340,17 +1340,22 @@ function closeModal(id) {
 // ---------------- SSE ----------------
 
 let sseRetryDelay = 1000;
+// Id of the last event seen; sent back on reconnect so the server replays
+// only what we missed (or tells us to refetch with a 'reset' event).
+let sseLastEventId = '';
 function connectSSE() {
   if (!token) return;
   if (sse) { try { sse.close(); } catch (e) {} }
   document.getElementById('conn').classList.add('show');
-  sse = new EventSource('/api/v1/chat/sse?token=' + encodeURIComponent(token));
+  sse = new EventSource('/api/v1/chat/sse?token=' + encodeURIComponent(token)
+    + (sseLastEventId ? '&last_event_id=' + encodeURIComponent(sseLastEventId) : ''));
   sse.addEventListener('hello', () => {
     sseRetryDelay = 1000;
     document.getElementById('conn').classList.remove('show');
   });
   sse.onmessage = (ev) => {
     document.getElementById('conn').classList.remove('show');
+    if (ev.lastEventId) sseLastEventId = ev.lastEventId;
     handleSSE(JSON.parse(ev.data));
   };
   sse.onerror = () => {
@@ -1407,6 +1412,10 @@ function handleSSE(ev) {
     }
   } else if (ev.type === 'conversation_created') {
     loadConversations();
+  } else if (ev.type === 'reset') {
+    // Gap too old to replay — refetch the list and the open thread.
+    loadConversations();
+    if (activeConvId != null) openConversation(activeConvId);
   } else if (ev.type === 'conversation_deleted') {
     const cid = (ev.data || {}).conversation_id;
     if (cid != null) {
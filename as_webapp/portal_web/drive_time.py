@@ -0,0 +1,216 @@
+"""
+Drive-time lookups (one-way minutes) for the Staging Task Board.
+
+`minutes_many(origin, destinations)` resolves a whole batch in one await:
+
+- Cache: answers live in data/drive_times.db keyed on the normalized
+  (origin, destination) pair, so "3600A Laird Rd, Mississauga, ON" and
+  "3600a laird rd,  mississauga, on" share a row. Rows older than
+  DRIVE_TIME_TTL_DAYS are refetched. Failures are not cached — a missing
+  key or a network blip shouldn't pin a destination to "unknown".
+- Batching: misses go out DESTINATIONS_PER_REQUEST at a time (the
+  Distance Matrix per-request cap for one origin), all batches
+  concurrently on one AsyncClient.
+- Single-flight: a pair already being fetched by another request is
+  awaited rather than fetched again, so two planners opening the same
+  week cost one lookup.
+
+Two backends, picked by DRIVE_TIME_BACKEND:
+
+  'google' (default) — Google Maps Distance Matrix, GOOGLE_PLACES_API_KEY.
+      Every answer is None when the key is missing.
+  'stub' — deterministic minutes derived from the address text, no
+      network. For local runs and tests.
+
+Callers treat None as "unknown" and fall back to their own estimate.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+CACHE_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "drive_times.db"
+TTL_SECONDS = int(os.getenv("DRIVE_TIME_TTL_DAYS", "30")) * 86400
+DESTINATIONS_PER_REQUEST = 25
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+
+def normalize_address(address: str) -> str:
+    """Cache key form: lower-case, single spaces, no space before commas."""
+    address = re.sub(r"\s+", " ", (address or "").strip().lower())
+    return re.sub(r"\s*,\s*", ", ", address).strip(" ,")
+
+
+class GoogleBackend:
+    """Distance Matrix over async httpx: one origin, up to
+    DESTINATIONS_PER_REQUEST destinations per call."""
+
+    def __init__(self) -> None:
+        self.api_key = os.getenv("GOOGLE_PLACES_API_KEY", "").strip()
+
+    async def matrix(self, client, origin: str, destinations: list[str]) -> list[Optional[int]]:
+        if not self.api_key:
+            return [None] * len(destinations)
+        try:
+            r = await client.get(DISTANCE_MATRIX_URL, params={
+                "origins": origin,
+                "destinations": "|".join(destinations),
+                "mode": "driving",
+                "units": "imperial",
+                "key": self.api_key,
+            })
+            data = r.json()
+        except Exception:
+            return [None] * len(destinations)
+        rows = (data or {}).get("rows") or []
+        elements = (rows[0].get("elements") or []) if rows else []
+        out: list[Optional[int]] = []
+        for i in range(len(destinations)):
+            el = elements[i] if i < len(elements) else {}
+            secs = (el.get("duration") or {}).get("value") if el.get("status") == "OK" else None
+            out.append(max(1, round(secs / 60)) if secs is not None else None)
+        return out
+
+
+class StubBackend:
+    """Offline stand-in: 10–69 minutes, stable per (origin, destination)."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def matrix(self, client, origin: str, destinations: list[str]) -> list[Optional[int]]:
+        self.calls += 1
+        out = []
+        for dest in destinations:
+            digest = hashlib.blake2b(
+                f"{normalize_address(origin)}|{normalize_address(dest)}".encode(), digest_size=4,
+            ).digest()
+            out.append(10 + int.from_bytes(digest, "big") % 60)
+        return out
+
+
+def _make_backend():
+    backend = os.getenv("DRIVE_TIME_BACKEND", "google").strip().lower()
+    if backend == "stub":
+        return StubBackend()
+    return GoogleBackend()
+
+
+class DriveTimeService:
+    def __init__(self, backend=None, path: Path = CACHE_DB_PATH) -> None:
+        self.backend = backend or _make_backend()
+        self._path = path
+        self._local = threading.local()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self._path), timeout=15, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS drive_times (
+                origin TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                minutes INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (origin, destination)
+            ) WITHOUT ROWID
+        """)
+
+    def _cached(self, origin: str, destinations: list[str]) -> dict[str, int]:
+        placeholders = ",".join("?" * len(destinations))
+        rows = self._conn().execute(
+            f"SELECT destination, minutes FROM drive_times "
+            f"WHERE origin = ? AND destination IN ({placeholders}) AND fetched_at >= ?",
+            (origin, *destinations, time.time() - TTL_SECONDS),
+        ).fetchall()
+        return dict(rows)
+
+    def _store(self, origin: str, found: dict[str, int]) -> None:
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR REPLACE INTO drive_times (origin, destination, minutes, fetched_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(origin, dest, minutes, now) for dest, minutes in found.items()],
+        )
+
+    async def minutes_many(self, origin: str, destinations: list[str]) -> dict[str, Optional[int]]:
+        """{destination: minutes or None} for every non-empty destination,
+        keyed by the destination exactly as passed in."""
+        origin_key = normalize_address(origin)
+        raw_by_key: dict[str, str] = {}
+        for dest in destinations:
+            key = normalize_address(dest)
+            if key:
+                raw_by_key.setdefault(key, dest)
+        if not origin_key or not raw_by_key:
+            return {dest: None for dest in destinations if dest}
+
+        found: dict[str, Optional[int]] = dict(self._cached(origin_key, list(raw_by_key)))
+        waiting: dict[str, asyncio.Future] = {}
+        to_fetch: list[str] = []
+        loop = asyncio.get_running_loop()
+        for key in raw_by_key:
+            if key in found:
+                continue
+            pending = self._inflight.get((origin_key, key))
+            if pending is not None:
+                waiting[key] = pending
+            else:
+                self._inflight[(origin_key, key)] = loop.create_future()
+                to_fetch.append(key)
+
+        if to_fetch:
+            fetched: dict[str, Optional[int]] = {}
+            try:
+                fetched = await self._fetch(origin, origin_key, [raw_by_key[k] for k in to_fetch], to_fetch)
+            finally:
+                # Waiters always get an answer — None if this fetch died.
+                for key in to_fetch:
+                    self._inflight.pop((origin_key, key)).set_result(fetched.get(key))
+            found.update(fetched)
+
+        for key, future in waiting.items():
+            found[key] = await asyncio.shield(future)
+
+        return {dest: found.get(normalize_address(dest)) for dest in destinations if dest}
+
+    async def _fetch(self, origin: str, origin_key: str, raw: list[str],
+                     keys: list[str]) -> dict[str, Optional[int]]:
+        import httpx
+
+        n = DESTINATIONS_PER_REQUEST
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            batches = await asyncio.gather(*(
+                self.backend.matrix(client, origin, raw[i:i + n]) for i in range(0, len(raw), n)
+            ))
+        fetched = dict(zip(keys, (m for batch in batches for m in batch)))
+        self._store(origin_key, {k: m for k, m in fetched.items() if m is not None})
+        return fetched
+
+
+_service: Optional[DriveTimeService] = None
+
+
+def get_service() -> DriveTimeService:
+    global _service
+    if _service is None:
+        _service = DriveTimeService()
+    return _service
+
+
+async def minutes_many(origin: str, destinations: list[str]) -> dict[str, Optional[int]]:
+    return await get_service().minutes_many(origin, destinations)
@@ -21,6 +21,7 @@ from page.signin import signin_page
 from page.portal import portal_page
 from tools.model_3d.api_routes import register_test_routes
 from tools.model_3d.inpainting import test_inpainting_page
+from tools.image_pipeline import AREA_ORIGINALS_DIR, AREA_RENDITIONS, rendition_filename
 from tools.user_db import (
     create_user, authenticate_user, get_user_by_session,
     create_session, delete_session, get_or_create_google_user,
@@ -612,6 +613,19 @@ def register(app, rt):
                         print(f"Deleted orphaned photo: {filename}")
                     except Exception as e:
                         print(f"Error deleting {filename}: {e}")
+                        continue
+                    # Its stored original and renditions (see upload_staging_photos)
+                    stem = filename[:-len('.jpg')]
+                    extras = glob.glob(os.path.join(AREA_ORIGINALS_DIR, glob.escape(stem) + '.*'))
+                    extras += [
+                        os.path.join(areas_dir, 'renditions', rendition_filename(stem, name))
+                        for name in AREA_RENDITIONS if name != 'full'
+                    ]
+                    for extra in extras:
+                        try:
+                            os.remove(extra)
+                        except FileNotFoundError:
+                            pass
 
             return JSONResponse({'success': True, 'deleted': deleted_count})
 
@@ -24,6 +24,7 @@ from datetime import date, datetime, timedelta
 import json
 import os
 import sqlite3
+import threading
 from urllib.parse import quote_plus, urlencode
 
 from fasthtml.common import (
@@ -34,6 +35,9 @@ from fasthtml.common import (
 from starlette.requests import Request
 from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse
 
+from as_webapp.portal_web import drive_time
+from page import static_bundles
+
 
 ZOHO_DB = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
@@ -135,25 +139,26 @@ def _fmt_time_short(s):
     return f"{h12}:{m:02d}{ampm}" if m else f"{h12}{ampm}"
 
 
+# Range and ordering run on the indexed _Coming_Staging_Destaging_Date_iso
+# generated column (YYYY-MM-DD, NULL when the MM/DD/YYYY text is empty or
+# malformed — see tools/zoho_sync/database.py ensure_iso_date_columns).
+# tools/check_board_query_plans.py asserts this never scans Staging_Report.
+_ALL_STAGINGS_SQL = """
+    SELECT *
+    FROM Staging_Report
+    WHERE _Coming_Staging_Destaging_Date_iso IS NOT NULL
+      AND (_sync_status IS NULL OR _sync_status != 'deleted')
+      AND Staging_Status IN ('Active', 'Inquired')
+    ORDER BY _Coming_Staging_Destaging_Date_iso ASC, CAST(ID AS INTEGER) ASC
+"""
+
+
 def _fetch_all_stagings():
     """Every Active + Inquired staging with a scheduled date, sorted
     chronologically. Filtering happens client-side.
     """
-    iso = ("substr(Coming_Staging_Destaging_Date, 7, 4) || '-' || "
-           "substr(Coming_Staging_Destaging_Date, 1, 2) || '-' || "
-           "substr(Coming_Staging_Destaging_Date, 4, 2)")
-
-    sql = f"""
-        SELECT *
-        FROM Staging_Report
-        WHERE (_sync_status IS NULL OR _sync_status != 'deleted')
-          AND (Staging_Status = 'Active' OR Staging_Status = 'Inquired')
-          AND Coming_Staging_Destaging_Date IS NOT NULL
-          AND Coming_Staging_Destaging_Date != ''
-        ORDER BY {iso} ASC, CAST(ID AS INTEGER) ASC
-    """
     with _conn() as c:
-        return c.execute(sql).fetchall()
+        return c.execute(_ALL_STAGINGS_SQL).fetchall()
 
 
 def _fetch_employees():
@@ -241,69 +246,20 @@ def _fetch_employee_roster():
     return _STAFF_ROSTER
 
 
-# ---------- Google Maps Distance Matrix (one-way drive minutes) ----------
+# ---------- Drive times (see drive_time.py) ----------
 
 _WAREHOUSE_ADDRESS = "3600A Laird Rd, Mississauga, ON"
 
 
-def _fetch_drive_minutes(origin, destination):
-    """One-way drive duration (minutes) from origin → destination via the
-    Google Maps Distance Matrix API. Returns None on any failure (no key,
-    network error, NOT_FOUND, ZERO_RESULTS, etc.) — callers fall back to a
-    flat 30-minute estimate so an offline failure doesn't block scheduling.
-    """
-    if not origin or not destination:
-        return None
-    key = os.getenv("GOOGLE_PLACES_API_KEY", "").strip()
-    if not key:
-        return None
-    try:
-        import httpx
-    except Exception:
-        return None
-    try:
-        with httpx.Client(timeout=10.0) as c:
-            r = c.get(
-                "https://maps.googleapis.com/maps/api/distancematrix/json",
-                params={
-                    "origins": origin,
-                    "destinations": destination,
-                    "mode": "driving",
-                    "units": "imperial",
-                    "key": key,
-                },
-            )
-            data = r.json()
-    except Exception:
-        return None
-    rows = (data or {}).get("rows") or []
-    if not rows:
-        return None
-    elements = rows[0].get("elements") or []
-    if not elements:
-        return None
-    el = elements[0]
-    if el.get("status") != "OK":
-        return None
-    secs = (el.get("duration") or {}).get("value")
-    if secs is None:
-        return None
-    return max(1, round(secs / 60))
-
-
 def _date_bounds(rows):
     """Earliest / latest scheduled date among the rows, padded so the
     calendar always renders a couple of weeks of context around the data
     (and so today is visible even if the dataset is empty)."""
     earliest, latest = None, None
-    for r in rows:
-        d = _parse_mdy(r["Coming_Staging_Destaging_Date"])
-        if not d:
-            continue
-        if earliest is None or d < earliest:
-            earliest = d
-        if latest is None or d > latest:
-            latest = d
+    if rows:
+        # _fetch_all_stagings returns rows ordered by the ISO date
+        earliest = date.fromisoformat(rows[0]["_Coming_Staging_Destaging_Date_iso"])
+        latest = date.fromisoformat(rows[-1]["_Coming_Staging_Destaging_Date_iso"])
     today = date.today()
     if earliest is None: earliest = today - timedelta(days=21)
     if latest   is None: latest   = today + timedelta(days=84)
@@ -375,8 +331,8 @@ _THEMES = [
 ]
 
 
-def _style_block():
-    return Style("""
+def _board_styles():
+    return """
     * { box-sizing: border-box; }
     html, body { margin: 0; padding: 0; height: 100%; }
     body {
@@ -1543,7 +1499,11 @@ def _style_block():
         .cal-view-day { min-height: auto; }
         .cal-view-day-head { border-bottom: 1px solid var(--border); padding-bottom: 4px; margin-bottom: 2px; }
     }
-    """)
+    """
+
+
+def _style_block():
+    return static_bundles.style_tag("staging_task_board.css")
 
 
 # -------------------- icons --------------------
@@ -2139,9 +2099,10 @@ def _build_row(row, serial):
     )
 
 
-def _build_table(grouped):
+def _build_table(grouped, row_html=None):
     # Date banners double as per-group column headers — first cell shows the
     # date instead of "Staging", the rest carry the column labels.
+    # row_html: optional ID -> pre-rendered <tr> markup (see _BoardCache).
     body = []
     for date_str, group in grouped:
         d = _parse_mdy(date_str)
@@ -2160,7 +2121,10 @@ def _build_table(grouped):
             cls="date-banner", **{"data-date": d_iso},
         ))
         for i, r in enumerate(group, start=1):
-            body.append(_build_row(r, i))
+            if row_html is not None:
+                body.append(NotStr(row_html[str(r["ID"])]))
+            else:
+                body.append(_build_row(r, i))
 
     # Empty-state row — shown by JS when all data rows are hidden
     body.append(Tr(
@@ -2388,15 +2352,22 @@ def _build_pre_staging_card(row):
     )
 
 
-def _build_calendar_view(rows):
+def _calendar_cards(row):
+    """The staging's own card plus its Design & Packing card, if any."""
+    if not row["Coming_Staging_Destaging_Date"]:
+        return []
+    pre = _build_pre_staging_card(row)
+    return [_build_calendar_card(row)] + ([pre] if pre is not None else [])
+
+
+def _build_calendar_view(rows, cards_html=None):
+    # cards_html: optional ID -> pre-rendered card markup (see _BoardCache).
     cards = []
     for r in rows:
-        if not r["Coming_Staging_Destaging_Date"]:
-            continue
-        cards.append(_build_calendar_card(r))
-        pre = _build_pre_staging_card(r)
-        if pre is not None:
-            cards.append(pre)
+        if cards_html is not None:
+            cards.append(NotStr(cards_html[str(r["ID"])]))
+        else:
+            cards.extend(_calendar_cards(r))
     kind_btns = []
     for slug, label in (("Consultation","Consultation"), ("Design","Design"),
                         ("Staging","Staging"), ("Destage","Destaging"),
@@ -2435,16 +2406,24 @@ def _client_script(employees, corpus, roster, date_min, date_max):
     date_min_iso = json.dumps(date_min.isoformat())
     date_max_iso = json.dumps(date_max.isoformat())
 
-    return Script(
+    return (
         # Embed data as JSON strings the JS reads at startup.
-        f"window.TB_EMPLOYEES = {employees_json};\n"
-        f"window.TB_CORPUS = {corpus_json};\n"
-        f"window.TB_ROSTER = {roster_json};\n"
-        f"window.TB_DATE_MIN = {date_min_iso};\n"
-        f"window.TB_DATE_MAX = {date_max_iso};\n"
-        # Main controller — uses template literals so keep regex-free and
-        # rely on dict-style keys sparingly.
-        r"""
+        Script(
+            f"window.TB_EMPLOYEES = {employees_json};\n"
+            f"window.TB_CORPUS = {corpus_json};\n"
+            f"window.TB_ROSTER = {roster_json};\n"
+            f"window.TB_DATE_MIN = {date_min_iso};\n"
+            f"window.TB_DATE_MAX = {date_max_iso};\n"
+        ),
+        # Main controller — static, so it's served as a cacheable bundle.
+        static_bundles.script_tag("staging_task_board.js"),
+    )
+
+
+def _controller_js():
+    # Uses template literals so keep regex-free and rely on dict-style
+    # keys sparingly.
+    return r"""
 (function() {
     const doc = document.documentElement;
     const K = { THEME:'tb_theme', MODE:'tb_mode', ME:'tb_me', RANGE:'tb_range', MY:'tb_mytasks', VIEW:'tb_view', ASSIGN:'tb_assign' };
@@ -3364,20 +3343,30 @@ def _client_script(employees, corpus, roster, date_min, date_max):
         renderDayCards();
         renderStaffStrip();
         openModal('day-detail');
-        fillMissingDriving(dIso);
+        fillMissingDriving([dIso], () => {
+            if (dIso === dayCurrent) {
+                renderDayCards();
+                renderStaffStrip();
+            }
+        });
     }
 
-    // POST any cards that haven't got a Driving_Time yet and refresh the
-    // detail view when the API returns. Pre-staging Design cards (sid ends
-    // in _dp) and synthetic kinds skip the call — they have no warehouse
-    // drive component.
-    function fillMissingDriving(dIso) {
-        const cards = cardsForDay(dIso).filter(c =>
+    // POST any cards on the given day(s) that haven't got a Driving_Time
+    // yet — one request for the lot — and call onFilled() if any came
+    // back. Pre-staging Design cards (sid ends in _dp) and synthetic kinds
+    // skip the call — they have no warehouse drive component. A sid is
+    // asked about once per page load, so an address the API can't resolve
+    // doesn't re-POST on every schedule re-render.
+    const drivingAsked = new Set();
+    function fillMissingDriving(dIsos, onFilled) {
+        const cards = [].concat(...dIsos.map(cardsForDay)).filter(c =>
             c.dataset.kind !== 'Design' &&
             !c.dataset.sid.includes('_') &&
+            !drivingAsked.has(c.dataset.sid) &&
             !(parseInt(c.dataset.driving || '0', 10) > 0)
         );
         if (!cards.length) return;
+        cards.forEach(c => drivingAsked.add(c.dataset.sid));
         const sids = cards.map(c => c.dataset.sid).join(',');
         const fd = new FormData();
         fd.append('sids', sids);
@@ -3393,10 +3382,7 @@ def _client_script(employees, corpus, roster, date_min, date_max):
                         touched = true;
                     }
                 });
-                if (touched && dIso === dayCurrent) {
-                    renderDayCards();
-                    renderStaffStrip();
-                }
+                if (touched) onFilled();
             })
             .catch(() => {});
     }
@@ -3872,6 +3858,16 @@ def _client_script(employees, corpus, roster, date_min, date_max):
         startD.setDate(startD.getDate() - 2);
         const days = 14;
 
+        // Whole visible range in one fill_driving round trip; re-render
+        // once the real drive blocks are known.
+        const visibleDays = [];
+        for (let i = 0; i < days; i++) {
+            const d = new Date(startD);
+            d.setDate(startD.getDate() + i);
+            visibleDays.push(iso(d));
+        }
+        fillMissingDriving(visibleDays, () => renderSchedule());
+
         const titleEl = document.getElementById('sched-title');
         if (titleEl) {
             const endD = new Date(startD);
@@ -4925,7 +4921,10 @@ def _client_script(employees, corpus, roster, date_min, date_max):
     });
 })();
 """
-    )
+
+
+static_bundles.register("staging_task_board.css", _board_styles)
+static_bundles.register("staging_task_board.js", _controller_js)
 
 
 # -------------------- page assembly --------------------
@@ -4945,7 +4944,7 @@ def _page_head(title):
     )
 
 
-def _full_page(title, body_children, extra_scripts=()):
+def _render_page(title, body_children, extra_scripts=()):
     doc = Html(
         _page_head(title),
         Body(*body_children, *extra_scripts),
@@ -4954,7 +4953,121 @@ def _full_page(title, body_children, extra_scripts=()):
     rendered = to_xml(doc)
     if not rendered.lstrip().lower().startswith("<!doctype"):
         rendered = "<!doctype html>\n" + rendered
-    return HTMLResponse(rendered)
+    return rendered
+
+
+def _full_page(title, body_children, extra_scripts=()):
+    return HTMLResponse(_render_page(title, body_children, extra_scripts))
+
+
+# -------------------- cached board view model --------------------
+
+def _build_board_page(rows, row_html=None, cards_html=None):
+    employees = _fetch_employees()
+    roster = _fetch_employee_roster()
+    corpus = _build_autocomplete_corpus(rows, employees)
+    grouped = _group_by_date(rows)
+    date_min, date_max = _date_bounds(rows)
+
+    table_view = _build_table(grouped, row_html)
+    cal_toolbar, cal_scroll, cal_source = _build_calendar_view(rows, cards_html)
+    sched_chips, sched_scroll = _build_schedule_view()
+
+    return _render_page(
+        "Staging Task Board",
+        [Div(
+            _toolbar(),
+            Div(
+                Div(
+                    Div(table_view, cls="scroll-area"),
+                    id="view-table", cls="view-pane",
+                    **{"data-view": "table"},
+                ),
+                Div(
+                    cal_toolbar, cal_scroll, cal_source,
+                    id="view-calendar", cls="view-pane",
+                    **{"data-view": "calendar"},
+                ),
+                Div(
+                    sched_chips, sched_scroll,
+                    id="view-schedule", cls="view-pane",
+                    **{"data-view": "schedule"},
+                ),
+                cls="view-area",
+            ),
+            _date_modal(),
+            _settings_modal(employees),
+            _day_detail_modal(),
+            _procedure_modal(),
+            cls="app-shell",
+        )],
+        extra_scripts=[
+            Script(src="/static/portal_modal.js", defer=True),
+            Script(src="/static/staging_edit_modal.js", defer=True),
+            *_client_script(employees, corpus, roster, date_min, date_max),
+        ],
+    )
+
+
+class _BoardCache:
+    """Rendered task board, rebuilt only when zoho_sync.db changes.
+
+    The page is keyed on PRAGMA data_version of a long-lived connection,
+    which moves whenever any other connection commits — set_date,
+    save_assignment and the staging modal save here, the portal API, Zoho
+    sync runs — plus today's date. On a rebuild, rows are re-fetched but a
+    row's <tr> and calendar cards are only re-rendered when its column
+    values, its serial within the day or its "is today" state changed;
+    everything else is reused as markup. Rendering a row is ~100 FastHTML
+    nodes, so this is most of the cost of a page load."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watch = None
+        self._key = None
+        self._html = None
+        # ID -> (fragment key, table row markup, calendar cards markup)
+        self._fragments = {}
+
+    def _data_version(self):
+        if self._watch is None:
+            self._watch = sqlite3.connect(ZOHO_DB, check_same_thread=False)
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def page(self):
+        with self._lock:
+            key = (self._data_version(), date.today())
+            if key != self._key:
+                self._html = self._build()
+                self._key = key
+            return self._html
+
+    def _build(self):
+        rows = _fetch_all_stagings()
+        today = date.today()
+        fragments = {}
+        for date_str, group in _group_by_date(rows):
+            is_today = _parse_mdy(date_str) == today
+            for serial, r in enumerate(group, start=1):
+                rid = str(r["ID"])
+                fkey = (tuple(r), serial, is_today)
+                cached = self._fragments.get(rid)
+                if cached is None or cached[0] != fkey:
+                    cached = (
+                        fkey,
+                        to_xml(_build_row(r, serial)),
+                        "".join(to_xml(card) for card in _calendar_cards(r)),
+                    )
+                fragments[rid] = cached
+        self._fragments = fragments
+        return _build_board_page(
+            rows,
+            row_html={rid: f[1] for rid, f in fragments.items()},
+            cards_html={rid: f[2] for rid, f in fragments.items()},
+        )
+
+
+_board_cache = _BoardCache()
 
 
 # -------------------- portal staging modal --------------------
@@ -5132,51 +5245,7 @@ def register(rt):
         user = get_user_by_session(token) if token else None
         if not user:
             return RedirectResponse("/signin", status_code=302)
-        rows = _fetch_all_stagings()
-        employees = _fetch_employees()
-        roster = _fetch_employee_roster()
-        corpus = _build_autocomplete_corpus(rows, employees)
-        grouped = _group_by_date(rows)
-        date_min, date_max = _date_bounds(rows)
-
-        table_view = _build_table(grouped)
-        cal_toolbar, cal_scroll, cal_source = _build_calendar_view(rows)
-        sched_chips, sched_scroll = _build_schedule_view()
-
-        return _full_page(
-            "Staging Task Board",
-            [Div(
-                _toolbar(),
-                Div(
-                    Div(
-                        Div(table_view, cls="scroll-area"),
-                        id="view-table", cls="view-pane",
-                        **{"data-view": "table"},
-                    ),
-                    Div(
-                        cal_toolbar, cal_scroll, cal_source,
-                        id="view-calendar", cls="view-pane",
-                        **{"data-view": "calendar"},
-                    ),
-                    Div(
-                        sched_chips, sched_scroll,
-                        id="view-schedule", cls="view-pane",
-                        **{"data-view": "schedule"},
-                    ),
-                    cls="view-area",
-                ),
-                _date_modal(),
-                _settings_modal(employees),
-                _day_detail_modal(),
-                _procedure_modal(),
-                cls="app-shell",
-            )],
-            extra_scripts=[
-                Script(src="/static/portal_modal.js", defer=True),
-                Script(src="/static/staging_edit_modal.js", defer=True),
-                _client_script(employees, corpus, roster, date_min, date_max),
-            ],
-        )
+        return HTMLResponse(_board_cache.page())
 
     @rt("/staging_task_board/set_date", methods=["POST"])
     async def set_date(request: Request):
@@ -5201,9 +5270,11 @@ def register(rt):
 
     @rt("/staging_task_board/fill_driving", methods=["POST"])
     async def fill_driving(request: Request):
-        """Fill missing Driving_Time on the requested staging IDs by hitting
-        Google Distance Matrix. Writes back to local Staging_Report (not
-        pushed to Zoho per current read-only mode). Returns a per-sid
+        """Fill missing Driving_Time on the requested staging IDs with one
+        async drive_time.minutes_many call for the whole batch (cache hits
+        skip the API; misses go 25 per Distance Matrix request). Writes
+        back to local Staging_Report (not pushed to Zoho per current
+        read-only mode). Returns a per-sid
         minutes map; null means no API key, no address, or API failure —
         client falls back to a 30-minute estimate."""
         form = await request.form()
@@ -5212,6 +5283,7 @@ def register(rt):
         if not sids:
             return JSONResponse({"results": {}})
         out: dict = {}
+        missing: dict = {}   # sid -> address still needing a lookup
         with _conn() as c:
             placeholders = ",".join(["?"] * len(sids))
             rows = c.execute(
@@ -5219,29 +5291,33 @@ def register(rt):
                 f"WHERE ID IN ({placeholders})",
                 sids,
             ).fetchall()
-            for r in rows:
-                rid = str(r["ID"])
-                existing = (r["Driving_Time"] or "").strip()
-                if existing:
-                    try:
-                        out[rid] = int(existing)
-                        continue
-                    except Exception:
-                        pass
-                addr = _parse_link(r["Staging_Address"])
-                if not addr:
-                    out[rid] = None
+        for r in rows:
+            rid = str(r["ID"])
+            existing = (r["Driving_Time"] or "").strip()
+            if existing:
+                try:
+                    out[rid] = int(existing)
                     continue
-                mins = _fetch_drive_minutes(_WAREHOUSE_ADDRESS, addr)
-                if mins is None:
-                    out[rid] = None
-                    continue
-                c.execute(
+                except Exception:
+                    pass
+            addr = _parse_link(r["Staging_Address"])
+            out[rid] = None
+            if addr:
+                missing[rid] = addr
+        if not missing:
+            return JSONResponse({"results": out})
+
+        minutes = await drive_time.minutes_many(_WAREHOUSE_ADDRESS, list(missing.values()))
+        found = {rid: minutes.get(addr) for rid, addr in missing.items()}
+        found = {rid: mins for rid, mins in found.items() if mins is not None}
+        if found:
+            with _conn() as c:
+                c.executemany(
                     "UPDATE Staging_Report SET Driving_Time = ? WHERE ID = ?",
-                    (str(mins), rid),
+                    [(str(mins), rid) for rid, mins in found.items()],
                 )
-                out[rid] = mins
-            c.commit()
+                c.commit()
+        out.update(found)
         return JSONResponse({"results": out})
 
     @rt("/staging_task_board/save_assignment", methods=["POST"])
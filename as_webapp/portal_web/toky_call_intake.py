@@ -2,7 +2,8 @@
 Call Intake — portal page showing structured extracts from Toky calls.
 
 Two views:
-  /calls             : list of calls (filter: all / cs / drafts / noise)
+  /calls             : list of calls (filter: all / cs / drafts / noise;
+                       ?q= full-text search via call_search, best match first)
   /calls/{callid}    : full detail (transcript + extract + actions)
 
 POST handlers to flip CS task / draft status:
@@ -12,7 +13,8 @@ POST handlers to flip CS task / draft status:
   /calls/draft/{id}/reject
 
 Analytics:
-  /analytics         : Opus Workstream A report + per-type stats
+  /analytics         : live per-type / agent / week / outcome / objection
+                       stats (call_analytics aggregates) + Opus reports
 
 Legacy 301 redirects kept for /toky_call_intake, /toky_analytics, /staff.
 
@@ -25,6 +27,7 @@ import json
 import os
 import sqlite3
 from datetime import datetime
+from urllib.parse import quote_plus
 
 from fasthtml.common import (
     A, Body, Button, Div, Form, H1, H2, H3, Head, Html, Input, Label,
@@ -39,6 +42,8 @@ from starlette.responses import HTMLResponse, RedirectResponse
 # (a separate auth namespace).
 from tools.user_db import get_user_by_session
 
+from as_webapp.as_portal_api import call_analytics, call_search
+
 SESSION_COOKIE_NAME = "astra_session"
 
 ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -124,6 +129,10 @@ main { max-width:1200px; margin:20px auto; padding:0 16px; }
   font-size:12px; color:var(--muted); margin-right:4px; }
 .empty { text-align:center; padding:40px; color:var(--muted); }
 .toolbar { display:flex; gap:8px; align-items:center; margin-bottom:12px; flex-wrap:wrap; }
+.search-input { flex:1; min-width:240px; padding:6px 10px; border:1px solid var(--border);
+  border-radius:6px; font-size:14px; }
+.snippet { margin-top:6px; font-size:12.5px; color:var(--muted); }
+mark { background:#fef08a; color:var(--text); padding:0 1px; border-radius:2px; }
 """
 
 
@@ -192,14 +201,20 @@ def _fmt_dur(sec) -> str:
     return f"{s // 60}:{s % 60:02d}"
 
 
+# Card columns derived per call, shared by the list and the search results
+_CARD_COLUMNS = """
+    c.status AS proc_status,
+    (SELECT COUNT(*) FROM toky_cs_tasks t WHERE t.callid = c.callid AND t.status = 'open') AS open_cs,
+    (SELECT COUNT(*) FROM toky_staging_drafts d WHERE d.callid = c.callid AND d.status = 'draft') AS open_draft
+"""
+
+
 def _fetch_list(view: str, limit: int = 200) -> list[dict]:
     clause, params = _filter_clause(view)
     q = f"""
         SELECT c.callid, c.direction, c.agent_id, c.from_number, c.to_number,
-               c.duration_s, c.init_dt, c.status AS proc_status,
-               e.call_type, e.confidence, e.summary,
-               (SELECT COUNT(*) FROM toky_cs_tasks t WHERE t.callid = c.callid AND t.status = 'open') AS open_cs,
-               (SELECT COUNT(*) FROM toky_staging_drafts d WHERE d.callid = c.callid AND d.status = 'draft') AS open_draft
+               c.duration_s, c.init_dt, e.call_type, e.confidence, e.summary,
+               {_CARD_COLUMNS}
         FROM toky_calls c
         LEFT JOIN toky_extracts e ON e.callid = c.callid
         WHERE 1 = 1 {clause}
@@ -212,6 +227,17 @@ def _fetch_list(view: str, limit: int = 200) -> list[dict]:
     return [dict(r) for r in rows]
 
 
+def _search_list(view: str, q: str, limit: int = 100) -> list[dict]:
+    """Ranked full-text hits (call_search) within the current view."""
+    clause, params = _filter_clause(view)
+    with _conn() as conn:
+        try:
+            return call_search.search(conn, q, limit=limit, where=clause, params=tuple(params),
+                                      columns=_CARD_COLUMNS)
+        except sqlite3.OperationalError:
+            return []
+
+
 def _fetch_counts() -> dict:
     """Header counts for the nav tabs."""
     with _conn() as conn:
@@ -259,6 +285,7 @@ def _render_card(row: dict):
                 cls="call-meta-row",
             ),
             Div(summary[:260] + ("…" if len(summary) > 260 else ""), cls="summary"),
+            Div(NotStr(row["snippet_html"]), cls="snippet") if row.get("snippet_html") else "",
             cls="call-head",
         ),
         Span("›", cls="arrow", style="font-size:24px;"),
@@ -275,18 +302,33 @@ _ANALYTICS_VIEWS = {
 }
 
 
+# path -> (mtime, html); the reports only change when a script reruns.
+_report_cache: dict = {}
+
+
 def _render_analytics_report(view: str = "all") -> str:
+    fname, runner = _ANALYTICS_VIEWS.get(view, _ANALYTICS_VIEWS["all"])
+    path = os.path.join(ROOT, "tools", "toky_poc", "out", fname)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return f"<p>No report yet for this view. Run <code>{runner}</code>.</p>"
+    cached = _report_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as fh:
+        html = _markdown_to_html(fh.read())
+    _report_cache[path] = (mtime, html)
+    return html
+
+
+def _markdown_to_html(md: str) -> str:
     """Minimal markdown → HTML converter for the analytics report.
     Supports: # / ## / ### headings, **bold**, tables, ordered/unordered lists,
     blockquotes, inline code. Anything fancier and we'd add a real lib."""
     import html as _html
     import re
 
-    fname, runner = _ANALYTICS_VIEWS.get(view, _ANALYTICS_VIEWS["all"])
-    path = os.path.join(ROOT, "tools", "toky_poc", "out", fname)
-    if not os.path.exists(path):
-        return f"<p>No report yet for this view. Run <code>{runner}</code>.</p>"
-    md = open(path).read()
     lines = md.split("\n")
     out: list[str] = []
     in_ul = False
@@ -384,6 +426,67 @@ def _render_analytics_report(view: str = "all") -> str:
     return "\n".join(out)
 
 
+def _pct(value) -> str:
+    return "—" if value is None else f"{value * 100:.0f}%"
+
+
+_DIM_TITLES = {
+    "type": "By call type",
+    "agent": "By agent",
+    "outcome": "By outcome",
+    "objection": "Objections raised",
+    "week": "By week (last 12)",
+}
+
+
+def _stats_table(dim: str, rows: list[dict]):
+    def label(key: str) -> str:
+        if dim == "week" and key != "unknown":
+            return f"w/c {_fmt_dt(key)[:6]}"
+        return (key or "—").replace("_", " ")
+
+    return Div(
+        H3(_DIM_TITLES[dim]),
+        Div(Table(
+            Thead(Tr(Th(""), Th("Calls"), Th("Avg length"), Th("Won / lost / pending"),
+                     Th("Win rate"), Th("Next step"))),
+            Tbody(*[
+                Tr(
+                    Td(label(r["key"])),
+                    Td(str(r["calls"])),
+                    Td(_fmt_dur(r["avg_duration_s"])),
+                    Td(f"{r['won']} / {r['lost']} / {r['pending']}"),
+                    Td(_pct(r["win_rate"])),
+                    Td(_pct(r["next_step_rate"])),
+                )
+                for r in rows
+            ]),
+        ), cls="tablewrap"),
+    )
+
+
+def _analytics_dashboard():
+    """Aggregate tables from call_analytics — kept current per call by the
+    Toky worker, so this is one small-table scan per page view."""
+    try:
+        with _conn() as conn:
+            stats = call_analytics.overview(conn)
+    except sqlite3.OperationalError:
+        stats = {}
+    total = (stats.get("total") or [None])[0]
+    if not total:
+        return Div(P("No analysed calls yet.", cls="meta"), cls="section report"), 0
+    stats["week"] = stats.get("week", [])[:12]
+    summary = P(
+        f"{total['calls']} calls analysed · avg {_fmt_dur(total['avg_duration_s'])} · "
+        f"win rate {_pct(total['win_rate'])} of {total['sales']} sales calls · "
+        f"next step committed on {_pct(total['next_step_rate'])}",
+        cls="meta",
+    )
+    tables = [_stats_table(dim, stats[dim]) for dim in _DIM_TITLES if stats.get(dim)]
+    return Div(summary, *tables, cls="section report"), total["calls"]
+
+
 def register(rt):
     # /staff removed — the ops home is now at / (staging_task_board).
     # Keep a legacy redirect so old bookmarks don't 404.
@@ -412,20 +515,32 @@ def register(rt):
         if view not in {v for v, _ in _VIEWS}:
             view = "real"
 
-        rows = _fetch_list(view)
+        q = (request.query_params.get("q") or "").strip()
+        rows = _search_list(view, q) if q else _fetch_list(view)
         counts = _fetch_counts()
+        q_param = f"&q={quote_plus(q)}" if q else ""
 
         nav = Div(
             *[A(
                 f"{label} ",
                 Span(f"({counts.get(vid, 0)})", cls="meta"),
-                href=f"/calls?view={vid}",
+                href=f"/calls?view={vid}{q_param}",
                 cls=("active" if vid == view else ""),
             ) for vid, label in _VIEWS],
             cls="nav",
         )
+        search_box = Form(
+            Input(type="search", name="q", value=q, cls="search-input",
+                  placeholder="Search transcripts, summaries, phone numbers…"),
+            Input(type="hidden", name="view", value=view),
+            Button("Search", type="submit", cls="btn"),
+            A("Clear", href=f"/calls?view={view}", cls="meta") if q else "",
+            method="get", action="/calls", cls="toolbar",
+        )
 
-        if not rows:
+        if q and not rows:
+            body = Div(P(f"No calls in this view match “{q}”."), cls="empty section")
+        elif not rows:
             body = Div(
                 P("No calls match this filter yet."),
                 P("Once the Toky webhook is registered, incoming calls will appear here within ~15 seconds of hanging up.",
@@ -435,7 +550,7 @@ def register(rt):
         else:
             body = Div(*[_render_card(r) for r in rows])
 
-        return _page("Call Intake", nav, body)
+        return _page("Call Intake", nav, search_box, body)
 
     @rt("/calls/{callid}")
     def intake_detail(request: Request, callid: str):
@@ -628,7 +743,8 @@ def register(rt):
 
     @rt("/analytics")
     def analytics(request: Request):
-        """Render the Opus analytics report. Three views via ?view=all|wins|emails."""
+        """Live call stats from the call_analytics aggregates, then the
+        Opus analytics report. Three report views via ?view=all|wins|emails."""
         user = _current_user(request)
         if not user:
             return RedirectResponse("/signin", status_code=302)
@@ -637,29 +753,18 @@ def register(rt):
         if view not in _ANALYTICS_VIEWS:
             view = "all"
 
-        # Rough stats strip at the top
+        dashboard, analysed = _analytics_dashboard()
         with _conn() as conn:
-            total = conn.execute("SELECT COUNT(*) FROM toky_calls").fetchone()[0]
-            by_type_rows = conn.execute(
-                "SELECT call_type, COUNT(*) FROM toky_extracts GROUP BY call_type ORDER BY 2 DESC"
-            ).fetchall()
             cs_open = conn.execute("SELECT COUNT(*) FROM toky_cs_tasks WHERE status='open'").fetchone()[0]
             drafts_pending = conn.execute("SELECT COUNT(*) FROM toky_staging_drafts WHERE status='draft'").fetchone()[0]
 
         stats = Div(
             Div(
-                Div(Span(f"{total}"), " calls indexed", cls="stat"),
+                Div(Span(f"{analysed}"), " calls analysed", cls="stat"),
                 Div(Span(f"{cs_open}"), " CS open", cls="stat"),
                 Div(Span(f"{drafts_pending}"), " drafts to review", cls="stat"),
                 cls="stats-row",
             ),
-            Div(
-                *[Span(
-                    f"{(ct or '—').replace('_',' ')}: ", Span(str(n), cls="strong"),
-                    cls="pill",
-                ) for ct, n in by_type_rows],
-                style="margin-top:8px;",
-            ),
             cls="section",
         )
 
@@ -707,6 +812,7 @@ def register(rt):
             """),
             body,
             stats,
+            dashboard,
             tabs,
             Div(NotStr(report_html), cls="section report"),
         )
@@ -23,19 +23,28 @@ from page.reserve import reserve_page
 from page.design import design_page
 from page.areas import AREAS, AREA_PAGE_FUNCTIONS
 from page.blog_listing import blog_listing_page, load_blog_metadata
+from page import page_cache, static_bundles
 from starlette.staticfiles import StaticFiles
 from starlette.responses import Response, JSONResponse, RedirectResponse
 import sqlite3
-from tools.instagram import get_cached_posts
+from tools.instagram import (
+    add_refresh_listener as add_instagram_refresh_listener,
+    image_id as instagram_image_id,
+    lookup_image_url,
+)
+from tools.image_cache import LRUImageStore
+from tools.image_pipeline import AREA_ORIGINALS_DIR, AREA_RENDITIONS, image_pipeline, render_area_photo, rendition_filename
 from tools.google_reviews import fetch_google_reviews
+from tools.google_places_api import add_refresh_listener as add_reviews_refresh_listener
 from tools.email_service import send_inquiry_emails
 # tools.user_db imports not needed here; Stripe callbacks that still touch
 # the customer DB are imported locally where used.
 from starlette.requests import Request
+import asyncio
 import httpx
-import hashlib
 import json
 import os
+from pathlib import Path
 import stripe
 import jwt
 from dotenv import load_dotenv
@@ -53,10 +62,25 @@ GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
 # Session cookie name
 SESSION_COOKIE_NAME = 'astra_session'
 
-app, rt = fast_app(live=True)
+app, rt = fast_app(live=True, on_shutdown=[image_pipeline.shutdown])
+
+# Proxied Instagram image bodies (LRU, byte-budgeted in memory and on disk)
+# and the in-flight upstream downloads, keyed by image id
+_image_store = LRUImageStore(
+    Path(__file__).parent / "data" / "instagram_images",
+    memory_bytes=int(os.getenv('INSTAGRAM_IMAGE_MEMORY_MB', '32')) * 1024 * 1024,
+    disk_bytes=int(os.getenv('INSTAGRAM_IMAGE_DISK_MB', '256')) * 1024 * 1024,
+)
+_image_fetches = {}
+
+# Rendered marketing pages (page/page_cache.py) go stale when the Instagram
+# or Google reviews data behind them refreshes
+add_instagram_refresh_listener(page_cache.clear)
+add_reviews_refresh_listener(page_cache.clear)
 
-# Cache for proxied images
-_image_cache = {}
+# Fingerprinted CSS/JS bundles (page/static_bundles.py), served
+# precompressed with immutable cache headers
+static_bundles.mount(app)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -85,31 +109,9 @@ def zoho_usage():
     })
 
 
-@rt('/api/instagram-image/{image_id}')
-async def instagram_image_proxy(image_id: str):
-    """Proxy Instagram images to avoid CORS issues"""
-    # Get all cached posts and find the matching image
-    posts = get_cached_posts()
-
-    for post in posts:
-        # Create a hash of the image URL to match
-        url_hash = hashlib.md5(post.get('image_url', '').encode()).hexdigest()[:16]
-        if url_hash == image_id:
-            image_url = post.get('image_url')
-            break
-    else:
-        return Response(content=b'Image not found', status_code=404)
-
-    # Check cache first
-    if image_id in _image_cache:
-        cached = _image_cache[image_id]
-        return Response(
-            content=cached['data'],
-            media_type=cached['content_type'],
-            headers={'Cache-Control': 'public, max-age=86400'}
-        )
-
-    # Fetch the image from Instagram
+async def _fetch_instagram_image(image_id: str, image_url: str):
+    """Download one image from Instagram into the store. Returns the
+    CachedImage, or an error Response."""
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -121,32 +123,45 @@ async def instagram_image_proxy(image_id: str):
         async with httpx.AsyncClient() as client:
             response = await client.get(image_url, headers=headers, timeout=10.0, follow_redirects=True)
 
-            if response.status_code == 200:
-                content_type = response.headers.get('content-type', 'image/jpeg')
-                image_data = response.content
-
-                # Cache the image
-                _image_cache[image_id] = {
-                    'data': image_data,
-                    'content_type': content_type
-                }
-
-                return Response(
-                    content=image_data,
-                    media_type=content_type,
-                    headers={'Cache-Control': 'public, max-age=86400'}
-                )
-            else:
-                return Response(content=b'Failed to fetch image', status_code=502)
+        if response.status_code != 200:
+            return Response(content=b'Failed to fetch image', status_code=502)
+        content_type = response.headers.get('content-type', 'image/jpeg')
+        return _image_store.put(image_id, response.content, content_type)
     except Exception as e:
         print(f"Error proxying image: {e}")
         return Response(content=b'Error fetching image', status_code=500)
 
 
+@rt('/api/instagram-image/{image_id}')
+async def instagram_image_proxy(image_id: str, request: Request):
+    """Proxy Instagram images to avoid CORS issues"""
+    cached = _image_store.get(image_id)
+    if cached is None:
+        image_url = await asyncio.to_thread(lookup_image_url, image_id)
+        if image_url is None:
+            return Response(content=b'Image not found', status_code=404)
+
+        # Single-flight: a homepage burst asks for the same images at once;
+        # only the first request downloads, the rest await its result.
+        pending = _image_fetches.get(image_id)
+        if pending is None:
+            pending = asyncio.ensure_future(_fetch_instagram_image(image_id, image_url))
+            _image_fetches[image_id] = pending
+            pending.add_done_callback(lambda _: _image_fetches.pop(image_id, None))
+        cached = await asyncio.shield(pending)
+        if isinstance(cached, Response):
+            return cached
+
+    headers = {'Cache-Control': 'public, max-age=86400', 'ETag': cached.etag}
+    if_none_match = request.headers.get('if-none-match', '')
+    if cached.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.data, media_type=cached.content_type, headers=headers)
+
+
 def get_proxied_image_url(image_url: str) -> str:
     """Generate a proxied URL for an Instagram image"""
-    url_hash = hashlib.md5(image_url.encode()).hexdigest()[:16]
-    return f"/api/instagram-image/{url_hash}"
+    return f"/api/instagram-image/{instagram_image_id(image_url)}"
 
 
 @rt('/api/contact', methods=['POST'])
@@ -204,65 +219,131 @@ async def contact_api(request: Request):
 
 # /api/save-default-rotation + /api/get-default-rotation moved to as_webapp/portal_web/routes.py
 
-@rt('/api/staging-photos', methods=['POST'])
-async def upload_staging_photos(request: Request):
-    """Upload and compress staging area photos"""
-    import base64
-    import io
-    import uuid
-    import os
-    from PIL import Image
+AREA_PHOTOS_DIR = Path('static/images/areas')
+AREA_RENDITIONS_DIR = AREA_PHOTOS_DIR / 'renditions'
 
-    try:
-        data = await request.json()
-        area = data.get('area', 'unknown')
-        photos = data.get('photos', [])  # List of base64 images
 
-        if not photos:
-            return JSONResponse({'success': False, 'error': 'No photos provided'}, status_code=400)
+def _move_legacy_area_originals() -> None:
+    """Originals used to be kept (publicly served) under the photos dir."""
+    legacy = AREA_PHOTOS_DIR / 'originals'
+    if not legacy.is_dir():
+        return
+    AREA_ORIGINALS_DIR.mkdir(parents=True, exist_ok=True)
+    for path in legacy.iterdir():
+        os.replace(path, AREA_ORIGINALS_DIR / path.name)
+    legacy.rmdir()
 
-        saved_urls = []
-        target_size = (1920, 1440)  # Target dimensions
-        save_dir = 'static/images/areas'
 
-        # Ensure directory exists
-        os.makedirs(save_dir, exist_ok=True)
+_move_legacy_area_originals()
 
-        for i, photo_data in enumerate(photos):
-            try:
-                # Remove data URL prefix if present
-                if ',' in photo_data:
-                    photo_data = photo_data.split(',')[1]
 
-                # Decode base64
-                image_bytes = base64.b64decode(photo_data)
-                image = Image.open(io.BytesIO(image_bytes))
+def _store_area_original(source, stem: str) -> tuple:
+    """Durably store one uploaded photo as AREA_ORIGINALS_DIR/<stem><ext>,
+    outside static/ since it still carries its EXIF (GPS included).
+    Nothing is published yet: the image pool writes the EXIF-free
+    compressed JPEG at the public path (<stem>.jpg) with the renditions.
+    `source` is an upload's file object or a (data-URL) base64 string.
+    Runs in a worker thread. Returns (original path, public path)."""
+    import base64
+    import shutil
+    from PIL import Image
 
-                # Convert to RGB if necessary (for PNG with transparency)
-                if image.mode in ('RGBA', 'P'):
-                    image = image.convert('RGB')
+    AREA_ORIGINALS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = AREA_ORIGINALS_DIR / f".{stem}.part"
+    with open(tmp, 'wb') as out:
+        if isinstance(source, str):
+            out.write(base64.b64decode(source.split(',', 1)[-1]))
+        else:
+            source.seek(0)
+            shutil.copyfileobj(source, out, 1024 * 1024)
+        out.flush()
+        os.fsync(out.fileno())
+    try:
+        with Image.open(tmp) as probe:
+            ext = '.' + (probe.format or 'jpg').lower().replace('jpeg', 'jpg')
+    except Exception:
+        tmp.unlink()
+        raise
+    original = AREA_ORIGINALS_DIR / f"{stem}{ext}"
+    os.replace(tmp, original)
+    dir_fd = os.open(AREA_ORIGINALS_DIR, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
 
-                # Resize maintaining aspect ratio, fitting within target size
-                image.thumbnail(target_size, Image.Resampling.LANCZOS)
+    return original, AREA_PHOTOS_DIR / f"{stem}.jpg"
 
-                # Generate unique filename
-                filename = f"{area}_{uuid.uuid4().hex[:8]}.jpg"
-                filepath = os.path.join(save_dir, filename)
 
-                # Save with compression
-                image.save(filepath, 'JPEG', quality=85, optimize=True)
+async def _accept_area_photos(area, sources) -> JSONResponse:
+    """Store each source's original, queue its renditions, and answer."""
+    import re
+    import uuid
+    import anyio
+
+    if not sources:
+        return JSONResponse({'success': False, 'error': 'No photos provided'}, status_code=400)
+    if not image_pipeline.has_capacity(len(sources)):
+        return JSONResponse(
+            {'success': False, 'error': 'Photo processing is busy, please retry'},
+            status_code=503, headers={'Retry-After': '5'},
+        )
+
+    area_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', str(area))[:40] or 'unknown'
+    photos = []
+    busy = False
+    for i, source in enumerate(sources):
+        stem = f"{area_slug}_{uuid.uuid4().hex[:8]}"
+        try:
+            original, public = await anyio.to_thread.run_sync(_store_area_original, source, stem)
+        except Exception as e:
+            print(f"Error processing photo {i}: {e}")
+            continue
+
+        if not image_pipeline.try_submit(
+            render_area_photo, str(original), str(public), str(AREA_RENDITIONS_DIR), stem,
+        ):
+            # Filled up since the capacity check: its URL would never resolve
+            print(f"Image pool full; dropping photo {i} ({stem})")
+            busy = True
+            original.unlink(missing_ok=True)
+            continue
+        photos.append({
+            'url': f'/{public}',
+            'renditions': {
+                name: f'/{AREA_RENDITIONS_DIR / rendition_filename(stem, name)}'
+                for name in AREA_RENDITIONS if name != 'full'
+            },
+        })
+
+    if photos:
+        return JSONResponse({'success': True, 'urls': [p['url'] for p in photos], 'photos': photos})
+    if busy:
+        return JSONResponse(
+            {'success': False, 'error': 'Photo processing is busy, please retry'},
+            status_code=503, headers={'Retry-After': '5'},
+        )
+    return JSONResponse({'success': False, 'error': 'Failed to process photos'}, status_code=500)
 
-                # Return URL path
-                saved_urls.append(f'/static/images/areas/{filename}')
 
-            except Exception as e:
-                print(f"Error processing photo {i}: {e}")
-                continue
+@rt('/api/staging-photos', methods=['POST'])
+async def upload_staging_photos(request: Request):
+    """Upload staging area photos.
+
+    Accepts multipart/form-data (`area` plus one or more `photos` files,
+    spooled to disk by the form parser as they stream in) or the legacy JSON
+    body with base64 `photos`. Responds once the originals are on disk
+    (outside static/); the compressed 1920px JPEG at each URL and the
+    renditions (1280, 480, WebP) are published afterwards by the image pool
+    from a single decode, so a URL may 404 for a moment after upload."""
+    try:
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            async with request.form() as form:
+                uploads = [f for f in form.getlist('photos') if hasattr(f, 'file')]
+                return await _accept_area_photos(form.get('area') or 'unknown', [u.file for u in uploads])
 
-        if saved_urls:
-            return JSONResponse({'success': True, 'urls': saved_urls})
-        else:
-            return JSONResponse({'success': False, 'error': 'Failed to process photos'}, status_code=500)
+        data = await request.json()
+        return await _accept_area_photos(data.get('area', 'unknown'), data.get('photos', []))
 
     except Exception as e:
         print(f"Photo upload error: {e}")
@@ -416,7 +497,19 @@ DEBUG_LOG_FILE = Path(__file__).parent / "data" / "client_debug.log"
 # ROUTES
 # =============================================================================
 
-@rt('/gallery')
+# Public pages that depend only on code and cached data files: served from
+# the rendered-HTML cache, and prerendered by tools/export_static_site.py
+MARKETING_PATHS = []
+
+
+def marketing_route(path):
+    def register(page_func):
+        MARKETING_PATHS.append(path)
+        return rt(path)(page_cache.cached(page_func))
+    return register
+
+
+@marketing_route('/gallery')
 def gallery():
     """Gallery page with Portfolio, Before/After, and Instagram sections"""
     content = Div(
@@ -440,7 +533,7 @@ def gallery():
     )
 
 
-@rt('/staging-pricing')
+@marketing_route('/staging-pricing')
 def staging_pricing():
     """Staging Pricing page with pricing packages, why astra, portfolio and instagram"""
     content = Div(
@@ -636,7 +729,7 @@ def get_about_page_styles():
     """
 
 
-@rt('/about-us')
+@marketing_route('/about-us')
 def about_us():
     """About page with company story, commitment, and why choose us"""
     content = Div(
@@ -663,19 +756,19 @@ def about_us():
 # SERVICE PAGES
 # =============================================================================
 
-@rt('/home-staging-services/')
+@marketing_route('/home-staging-services/')
 def home_staging_services():
     """Home Staging Services page"""
     return home_staging_services_page()
 
 
-@rt('/real-estate-staging/')
+@marketing_route('/real-estate-staging/')
 def real_estate_staging():
     """Real Estate Staging page"""
     return real_estate_staging_page()
 
 
-@rt('/our-differences/')
+@marketing_route('/our-differences/')
 def our_differences():
     """Our Differences page"""
     return our_differences_page()
@@ -724,14 +817,14 @@ def design(req: Request):
 for city_name, url_slug in AREAS:
     route_path = f"/home-staging-services-in-{url_slug}/"
     page_func = AREA_PAGE_FUNCTIONS[url_slug]
-    rt(route_path)(page_func)
+    marketing_route(route_path)(page_func)
 
 
 # =============================================================================
 # BLOG ROUTES
 # =============================================================================
 
-@rt('/blog/')
+@marketing_route('/blog/')
 def blog():
     """Blog listing page"""
     return blog_listing_page()
@@ -758,7 +851,7 @@ def register_blog_routes():
             page_func = getattr(module, func_name)
 
             # Register the route
-            rt(f"/{seo_url}/")(page_func)
+            marketing_route(f"/{seo_url}/")(page_func)
         except (ImportError, AttributeError) as e:
             print(f"Warning: Could not load blog post {slug}: {e}")
 
@@ -766,7 +859,7 @@ def register_blog_routes():
 register_blog_routes()
 
 
-@rt('/')
+@marketing_route('/')
 def home():
     """Home page with hero banner"""
     content = Div(
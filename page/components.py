@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from fasthtml.common import *
+from page import static_bundles
 from page.footer import comprehensive_footer, get_footer_styles
 
 # Define SVG elements (not included in fasthtml.common)
@@ -2671,8 +2672,12 @@ def get_floating_elements_script():
 def create_page(title, content, additional_styles="", additional_scripts="",
                 description="Astra Staging - Professional Home Staging Services",
                 keywords="home staging, furniture staging, real estate staging",
-                is_homepage=False, hide_floating_buttons=False):
-    """Create a page with the shared layout and styles"""
+                is_homepage=False, hide_floating_buttons=False, style_bundles=()):
+    """Create a page with the shared layout and styles.
+
+    Shared CSS/JS are linked from static bundles (see page/static_bundles.py);
+    style_bundles names extra registered CSS bundles to link after site.css.
+    """
 
     # Inline script to prevent theme flash - runs immediately
     theme_init_script = """
@@ -2748,8 +2753,8 @@ def create_page(title, content, additional_styles="", additional_scripts="",
     });
     """
 
-    # Combine all scripts
-    all_scripts = get_shared_scripts() + get_floating_elements_script() + homepage_scroll_script + (str(additional_scripts) if additional_scripts else "")
+    # Page-specific scripts; the shared ones come from the site.js bundle
+    page_scripts = homepage_scroll_script + (str(additional_scripts) if additional_scripts else "")
 
     # Google Maps Places script for address autocomplete
     google_maps_script = f'https://maps.googleapis.com/maps/api/js?key={GOOGLE_PLACES_API_KEY}&libraries=places'
@@ -2763,7 +2768,9 @@ def create_page(title, content, additional_styles="", additional_scripts="",
             Meta(name='keywords', content=keywords),
             Link(href='https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Montserrat:wght@300;400;500&family=Barlow+Condensed:wght@400;500;600;700&display=swap', rel='stylesheet'),
             Link(rel='icon', type='image/x-icon', href='/static/images/favicon.ico'),
-            Style(get_shared_styles() + get_footer_styles() + additional_styles),
+            static_bundles.style_tag("site.css"),
+            *[static_bundles.style_tag(name) for name in style_bundles],
+            Style(additional_styles) if additional_styles else None,
             Script(src=google_maps_script, defer=True, **{"async": True}),
             NotStr(theme_init_script)
         ),
@@ -2776,7 +2783,12 @@ def create_page(title, content, additional_styles="", additional_scripts="",
             whatsapp_button(),
             floating_buttons() if not hide_floating_buttons else None,
             general_inquiry_modal() if not hide_floating_buttons else None,
-            Script(all_scripts),
+            static_bundles.script_tag("site.js"),
+            Script(page_scripts),
             cls="page-wrapper"
         )
     )
+
+
+static_bundles.register("site.css", lambda: get_shared_styles() + get_footer_styles())
+static_bundles.register("site.js", lambda: get_shared_scripts() + get_floating_elements_script())
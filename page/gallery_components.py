@@ -1,14 +1,12 @@
 from fasthtml.common import *
 import os
 import glob as glob_module
-import hashlib
-from tools.instagram import get_cached_posts
+from tools.instagram import get_cached_posts, image_id
 
 
 def get_proxied_image_url(image_url: str) -> str:
     """Generate a proxied URL for an Instagram image"""
-    url_hash = hashlib.md5(image_url.encode()).hexdigest()[:16]
-    return f"/api/instagram-image/{url_hash}"
+    return f"/api/instagram-image/{image_id(image_url)}"
 
 
 def get_portfolio_images():
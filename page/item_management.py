@@ -3,10 +3,11 @@ from monsterui.all import *
 import os
 import sqlite3
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import json
 from starlette.responses import JSONResponse
 from tools.zoho_sync.write_service import write_service
+from tools import item_search
 
 # Database path
 ZOHO_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "zoho_sync.db")
@@ -494,37 +495,40 @@ def get_db_connection():
     return conn
 
 
-def get_items_grouped() -> Dict[str, List[sqlite3.Row]]:
-    """Get all items grouped by Item_Name"""
+def get_items_page(filter_name: str = "", filter_type: str = "All", filter_location: str = "All",
+                   filter_3d: str = "All", page: int = 1) -> Tuple[Dict[str, List[sqlite3.Row]], bool, Optional[Dict]]:
+    """One page of items grouped by Item_Name, whether more pages follow,
+    and the filter dropdown counts (see tools/item_search.py). Counts are
+    only computed for the first page; later pages just append cards."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get all items ordered by Item_Name, Current_Location, and Barcode
-        cursor.execute("""
-            SELECT * FROM Item_Report
-            WHERE Item_Name IS NOT NULL AND Item_Name != ''
-            ORDER BY Item_Name,
-                     CASE WHEN Current_Location LIKE '%3600 Warehouse%' THEN 0 ELSE 1 END,
-                     Current_Location,
-                     Barcode
-        """)
-
-        items = cursor.fetchall()
+        if not item_search.ensure_index(conn):
+            # Table doesn't exist yet
+            return {}, False, {"item_types": [], "type_total": 0, "locations": [], "loc_total": 0,
+                               "has_3d": 0, "no_3d": 0, "d3_total": 0}
+        grouped_items, has_more = item_search.page_of_items(
+            conn, filter_name, filter_type, filter_location, filter_3d, page)
+        counts = (item_search.facet_counts(conn, filter_name, filter_type, filter_location, filter_3d)
+                  if page == 1 else None)
+    finally:
         conn.close()
+    return grouped_items, has_more, counts
 
-        # Group by Item_Name
-        grouped_items = {}
-        for item in items:
-            item_name = item['Item_Name']
-            if item_name not in grouped_items:
-                grouped_items[item_name] = []
-            grouped_items[item_name].append(item)
-    except sqlite3.OperationalError:
-        # Table doesn't exist yet
-        return {}
 
-    return grouped_items
+def item_cards(grouped_items: Dict[str, List[sqlite3.Row]], has_more: bool, page: int) -> list:
+    """Cards for one page, plus a sentinel that loads the next page when it scrolls into view"""
+    cards = [create_item_card(name, items) for name, items in grouped_items.items()]
+    if has_more:
+        cards.append(Div(
+            "Loading more items...",
+            hx_get="/item_management/filter_items",
+            hx_trigger="revealed",
+            hx_swap="outerHTML",
+            hx_include="#filter_name, #filter_type, #filter_location, #filter_3d",
+            hx_vals=json.dumps({"page": page + 1}),
+            style="grid-column: 1 / -1; text-align: center; padding: 20px; color: var(--color-secondary);"
+        ))
+    return cards
 
 
 def parse_location(location_str: str) -> str:
@@ -746,59 +750,14 @@ def create_item_card(item_name: str, items: List[sqlite3.Row]) -> Div:
 async def get(request):
     """Main page handler"""
 
-    # Get all grouped items
-    grouped_items = get_items_grouped()
-
-    # Get unique item types and locations for filters with counts
-    item_types_with_counts = []
-    locations_with_counts = []
-    total_count = 0
-    has_3d_count = 0
-    no_3d_count = 0
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Total count
-        cursor.execute("SELECT COUNT(*) FROM Item_Report WHERE Item_Name IS NOT NULL AND Item_Name != ''")
-        total_count = cursor.fetchone()[0]
-
-        # Item types with counts
-        cursor.execute("""
-            SELECT Item_Type, COUNT(*) as cnt
-            FROM Item_Report
-            WHERE Item_Type IS NOT NULL AND Item_Name IS NOT NULL AND Item_Name != ''
-            GROUP BY Item_Type
-            ORDER BY Item_Type
-        """)
-        item_types_with_counts = [(row[0], row[1]) for row in cursor.fetchall()]
-
-        # Locations with counts
-        cursor.execute("""
-            SELECT Current_Location, COUNT(*) as cnt
-            FROM Item_Report
-            WHERE Current_Location IS NOT NULL AND Item_Name IS NOT NULL AND Item_Name != ''
-            GROUP BY Current_Location
-            ORDER BY Current_Location
-        """)
-        location_counts = {}
-        for row in cursor.fetchall():
-            parsed_location = parse_location(row[0])
-            if parsed_location in location_counts:
-                location_counts[parsed_location] += row[1]
-            else:
-                location_counts[parsed_location] = row[1]
-        locations_with_counts = sorted(location_counts.items(), key=lambda x: x[0])
-
-        # 3D model counts
-        cursor.execute("SELECT COUNT(*) FROM Item_Report WHERE Model_3D IS NOT NULL AND Model_3D != '' AND Item_Name IS NOT NULL AND Item_Name != ''")
-        has_3d_count = cursor.fetchone()[0]
-        no_3d_count = total_count - has_3d_count
+    grouped_items, has_more, counts = get_items_page()
 
-        conn.close()
-    except sqlite3.OperationalError:
-        # Table doesn't exist yet
-        pass
+    # Filter options with counts
+    total_count = counts["d3_total"]
+    item_types_with_counts = counts["item_types"]
+    locations_with_counts = counts["locations"]
+    has_3d_count = counts["has_3d"]
+    no_3d_count = counts["no_3d"]
 
     return [
         Title("Item Management"),
@@ -909,7 +868,7 @@ async def get(request):
             # Items container
             Div(
                 Grid(
-                    *[create_item_card(name, items) for name, items in grouped_items.items()],
+                    *item_cards(grouped_items, has_more, 1),
                     cols_xl=3, cols_lg=3, cols_md=2, cols_sm=1,  # Responsive columns
                     cls="gap-4"
                 ) if grouped_items else Div(
@@ -2490,136 +2449,15 @@ async def get(request):
     ]
 
 
-def build_filter_conditions(filter_name: str, filter_type: str, filter_location: str, filter_3d: str):
-    """Build SQL WHERE conditions based on filters"""
-    conditions = ["Item_Name IS NOT NULL AND Item_Name != ''"]
-    params = []
-
-    if filter_name:
-        conditions.append("(Item_Name LIKE ? OR Barcode LIKE ?)")
-        params.extend([f"%{filter_name}%", f"%{filter_name}%"])
-
-    if filter_type != "All":
-        conditions.append("Item_Type = ?")
-        params.append(filter_type)
-
-    if filter_location != "All":
-        conditions.append("Current_Location LIKE ?")
-        params.append(f"%{filter_location}%")
-
-    if filter_3d == "Yes":
-        conditions.append("Model_3D IS NOT NULL AND Model_3D != ''")
-    elif filter_3d == "No":
-        conditions.append("(Model_3D IS NULL OR Model_3D = '')")
-
-    return " AND ".join(conditions), params
-
-
-def get_dynamic_filter_counts(cursor, filter_name: str, filter_type: str, filter_location: str, filter_3d: str):
-    """Get counts for each filter option based on current selections (excluding that filter)"""
-
-    # Base condition (always applied)
-    base_cond = "Item_Name IS NOT NULL AND Item_Name != ''"
-
-    # Build conditions for each filter combination
-    def build_cond(exclude_filter):
-        conds = [base_cond]
-        params = []
-        if filter_name:
-            conds.append("(Item_Name LIKE ? OR Barcode LIKE ?)")
-            params.extend([f"%{filter_name}%", f"%{filter_name}%"])
-        if exclude_filter != "type" and filter_type != "All":
-            conds.append("Item_Type = ?")
-            params.append(filter_type)
-        if exclude_filter != "location" and filter_location != "All":
-            conds.append("Current_Location LIKE ?")
-            params.append(f"%{filter_location}%")
-        if exclude_filter != "3d":
-            if filter_3d == "Yes":
-                conds.append("Model_3D IS NOT NULL AND Model_3D != ''")
-            elif filter_3d == "No":
-                conds.append("(Model_3D IS NULL OR Model_3D = '')")
-        return " AND ".join(conds), params
-
-    # Get item type counts (excluding type filter)
-    type_cond, type_params = build_cond("type")
-    cursor.execute(f"""
-        SELECT Item_Type, COUNT(*) as cnt
-        FROM Item_Report
-        WHERE {type_cond} AND Item_Type IS NOT NULL
-        GROUP BY Item_Type
-        ORDER BY Item_Type
-    """, type_params)
-    item_types_with_counts = [(row[0], row[1]) for row in cursor.fetchall()]
-    type_total = sum(c for _, c in item_types_with_counts)
-
-    # Get location counts (excluding location filter)
-    loc_cond, loc_params = build_cond("location")
-    cursor.execute(f"""
-        SELECT Current_Location, COUNT(*) as cnt
-        FROM Item_Report
-        WHERE {loc_cond} AND Current_Location IS NOT NULL
-        GROUP BY Current_Location
-    """, loc_params)
-    location_counts = {}
-    for row in cursor.fetchall():
-        parsed_location = parse_location(row[0])
-        location_counts[parsed_location] = location_counts.get(parsed_location, 0) + row[1]
-    locations_with_counts = sorted(location_counts.items(), key=lambda x: x[0])
-    loc_total = sum(c for _, c in locations_with_counts)
-
-    # Get 3D model counts (excluding 3d filter)
-    d3_cond, d3_params = build_cond("3d")
-    cursor.execute(f"SELECT COUNT(*) FROM Item_Report WHERE {d3_cond}", d3_params)
-    d3_total = cursor.fetchone()[0]
-    cursor.execute(f"SELECT COUNT(*) FROM Item_Report WHERE {d3_cond} AND Model_3D IS NOT NULL AND Model_3D != ''", d3_params)
-    has_3d_count = cursor.fetchone()[0]
-    no_3d_count = d3_total - has_3d_count
-
-    return {
-        "item_types": item_types_with_counts,
-        "type_total": type_total,
-        "locations": locations_with_counts,
-        "loc_total": loc_total,
-        "has_3d": has_3d_count,
-        "no_3d": no_3d_count,
-        "d3_total": d3_total,
-    }
-
-
 @rt("/filter_items")
-def filter_items(filter_name: str = "", filter_type: str = "All", filter_location: str = "All", filter_3d: str = "All"):
-    """Filter items based on criteria and return updated filter counts"""
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Build query with all filters
-    conditions, params = build_filter_conditions(filter_name, filter_type, filter_location, filter_3d)
-    query = f"""
-        SELECT * FROM Item_Report
-        WHERE {conditions}
-        ORDER BY Item_Name,
-                 CASE WHEN Current_Location LIKE '%3600 Warehouse%' THEN 0 ELSE 1 END,
-                 Current_Location,
-                 Barcode
-    """
-
-    cursor.execute(query, params)
-    items = cursor.fetchall()
+def filter_items(filter_name: str = "", filter_type: str = "All", filter_location: str = "All", filter_3d: str = "All", page: int = 1):
+    """Filter items based on criteria and return updated filter counts.
+    Pages after the first (requested by the scroll sentinel) return just their cards."""
 
-    # Get dynamic filter counts
-    counts = get_dynamic_filter_counts(cursor, filter_name, filter_type, filter_location, filter_3d)
-
-    conn.close()
-
-    # Group filtered items
-    grouped_items = {}
-    for item in items:
-        item_name = item['Item_Name']
-        if item_name not in grouped_items:
-            grouped_items[item_name] = []
-        grouped_items[item_name].append(item)
+    page = max(1, page)
+    grouped_items, has_more, counts = get_items_page(filter_name, filter_type, filter_location, filter_3d, page)
+    if page > 1:
+        return tuple(item_cards(grouped_items, has_more, page))
 
     # Build updated filter dropdowns with hx-swap-oob
     type_options = f'<option value="All" {"selected" if filter_type == "All" else ""}>All ({counts["type_total"]})</option>'
@@ -2636,7 +2474,7 @@ def filter_items(filter_name: str = "", filter_type: str = "All", filter_locatio
     return Div(
         # Main content
         Grid(
-            *[create_item_card(name, items) for name, items in grouped_items.items()],
+            *item_cards(grouped_items, has_more, page),
             cols_xl=3, cols_lg=3, cols_md=2, cols_sm=1,
             cls="gap-4"
         ),
@@ -0,0 +1,93 @@
+"""
+Rendered-HTML cache for the public marketing routes.
+
+    rt('/gallery')(page_cache.cached(gallery))
+
+The first hit for a path renders the page through FastHTML as usual and
+keeps the response body; later hits return those bytes without building
+the FT tree at all. Every response carries a content-hash ETag, and a
+matching If-None-Match is answered with 304.
+
+Invalidation:
+- The Instagram post cache and the Google reviews cache call clear() when
+  they refresh (their add_refresh_listener hooks).
+- Entries expire after PAGE_CACHE_TTL_SECONDS (default 1 hour, the max
+  age of both sources). Hits never touch the sources, so without this the
+  refreshers would never get the chance to run.
+- The cache is per-process memory, so a deploy (restart) starts empty.
+
+A render that straddles a clear() is served but not stored, so a page
+built from pre-refresh data can't outlive the refresh.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from fasthtml.core import _resp
+from starlette.requests import Request
+from starlette.responses import Response
+
+TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", "3600"))
+ENABLED = os.getenv("PAGE_CACHE_DISABLED", "").strip() != "1"
+
+_lock = threading.Lock()
+_entries: dict = {}   # path -> (body, etag, expires_at)
+_generation = 0
+
+
+def clear() -> None:
+    global _generation
+    with _lock:
+        _entries.clear()
+        _generation += 1
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def _etag_matches(req: Request, etag: str) -> bool:
+    header = req.headers.get("if-none-match", "")
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+def _respond(req: Request, body: bytes, etag: str) -> Response:
+    # no-cache: browsers may keep the page but must revalidate (cheap 304)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(req, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
+
+def cached(page_func):
+    """Wrap a no-argument page function as a cached route handler."""
+
+    def handler(req: Request):
+        key = req.url.path
+        now = time.monotonic()
+        with _lock:
+            entry = _entries.get(key) if ENABLED else None
+            generation = _generation
+        if entry is not None and entry[2] > now:
+            return _respond(req, entry[0], entry[1])
+
+        rendered = _resp(req, page_func())
+        if rendered.status_code != 200:
+            return rendered
+        body = bytes(rendered.body)
+        etag = _etag(body)
+        with _lock:
+            if ENABLED and generation == _generation:
+                _entries[key] = (body, etag, now + TTL_SECONDS)
+        return _respond(req, body, etag)
+
+    handler.__name__ = page_func.__name__
+    handler.__qualname__ = page_func.__qualname__
+    handler.__doc__ = page_func.__doc__
+    return handler
+
+
+def stats() -> dict:
+    with _lock:
+        return {"entries": len(_entries), "generation": _generation}
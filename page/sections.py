@@ -4,14 +4,12 @@ All sections follow mobile-first responsive design.
 """
 from fasthtml.common import *
 from tools.google_reviews import fetch_google_reviews
-from tools.instagram import get_cached_posts
-import hashlib
+from tools.instagram import get_cached_posts, image_id
 
 
 def get_proxied_image_url(image_url: str) -> str:
     """Generate a proxied URL for an Instagram image"""
-    url_hash = hashlib.md5(image_url.encode()).hexdigest()[:16]
-    return f"/api/instagram-image/{url_hash}"
+    return f"/api/instagram-image/{image_id(image_url)}"
 
 
 # =============================================================================
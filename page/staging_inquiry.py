@@ -3,6 +3,7 @@ Staging Inquiry page for Astra Staging website.
 - /staging-inquiry/
 """
 from fasthtml.common import *
+from page import static_bundles
 from page.components import create_page
 from page.sections import reviews_section, trusted_by_section
 
@@ -1014,7 +1015,52 @@ def property_type_selector():
             ),
             cls="container"
         ),
-        Script("""
+        static_bundles.script_tag("staging_inquiry.js"),
+        # Mask Drawing Modal
+        Div(
+            Div(
+                H3("Remove Furniture from Room"),
+                P("Draw around specific items to remove, or click Process without drawing to remove all furniture automatically.", style="margin: 10px 0; color: #666; font-size: 14px;"),
+                P("Tip: Wall art/paintings are preserved by default. Draw around them if you want them removed.", style="margin: 0 0 10px 0; color: #999; font-size: 12px; font-style: italic;"),
+                Div(
+                    NotStr('<canvas id="mask-canvas"></canvas>'),
+                    cls="mask-canvas-container"
+                ),
+                Div(
+                    Button("Clear", id="mask-clear", cls="mask-btn mask-btn-secondary"),
+                    Button("Cancel", id="mask-cancel", cls="mask-btn mask-btn-secondary"),
+                    Button("Process", id="mask-process", cls="mask-btn mask-btn-primary"),
+                    cls="mask-actions"
+                ),
+                cls="mask-modal-content"
+            ),
+            id="mask-drawing-modal",
+            cls="mask-drawing-modal"
+        ),
+        # Empty Room Loading Modal
+        Div(
+            Div(
+                H3("Removing Furniture..."),
+                Div(
+                    NotStr(
+                        '<div class="loading-spinner"></div>'
+                    ),
+                    cls="loading-spinner-container"
+                ),
+                Div("Initializing...", id="empty-room-status", cls="empty-room-status"),
+                Div("Time elapsed: 0s", id="empty-room-timer", cls="empty-room-timer"),
+                cls="empty-room-modal-content"
+            ),
+            id="empty-room-modal",
+            cls="empty-room-modal"
+        ),
+        cls="property-type-section"
+    )
+
+
+def get_property_selector_script():
+    """JS for property type selector, served as the staging_inquiry.js bundle"""
+    return """
             // Haptic feedback (vibration) for mobile
             function hapticFeedback() {
                 if ('vibrate' in navigator) {
@@ -6145,47 +6191,7 @@ def property_type_selector():
                 };  // End of mask-process onclick handler
             }  // End of setupMaskDrawing function
 
-        """),
-        # Mask Drawing Modal
-        Div(
-            Div(
-                H3("Remove Furniture from Room"),
-                P("Draw around specific items to remove, or click Process without drawing to remove all furniture automatically.", style="margin: 10px 0; color: #666; font-size: 14px;"),
-                P("Tip: Wall art/paintings are preserved by default. Draw around them if you want them removed.", style="margin: 0 0 10px 0; color: #999; font-size: 12px; font-style: italic;"),
-                Div(
-                    NotStr('<canvas id="mask-canvas"></canvas>'),
-                    cls="mask-canvas-container"
-                ),
-                Div(
-                    Button("Clear", id="mask-clear", cls="mask-btn mask-btn-secondary"),
-                    Button("Cancel", id="mask-cancel", cls="mask-btn mask-btn-secondary"),
-                    Button("Process", id="mask-process", cls="mask-btn mask-btn-primary"),
-                    cls="mask-actions"
-                ),
-                cls="mask-modal-content"
-            ),
-            id="mask-drawing-modal",
-            cls="mask-drawing-modal"
-        ),
-        # Empty Room Loading Modal
-        Div(
-            Div(
-                H3("Removing Furniture..."),
-                Div(
-                    NotStr(
-                        '<div class="loading-spinner"></div>'
-                    ),
-                    cls="loading-spinner-container"
-                ),
-                Div("Initializing...", id="empty-room-status", cls="empty-room-status"),
-                Div("Time elapsed: 0s", id="empty-room-timer", cls="empty-room-timer"),
-                cls="empty-room-modal-content"
-            ),
-            id="empty-room-modal",
-            cls="empty-room-modal"
-        ),
-        cls="property-type-section"
-    )
+        """
 
 
 def get_property_selector_styles():
@@ -9219,13 +9225,15 @@ def staging_inquiry_page():
         cls="staging-inquiry-content"
     )
 
-    additional_styles = get_property_selector_styles()
-
     return create_page(
         "Get a Quote | Astra Staging",
         content,
-        additional_styles=additional_styles,
+        style_bundles=("staging_inquiry.css",),
         description="Get an instant staging quote from Astra Staging. Fill out our form with your property details and receive a customized quote within 24 hours.",
         keywords="staging quote, home staging price, staging cost estimate, GTA staging services",
         hide_floating_buttons=True
     )
+
+
+static_bundles.register("staging_inquiry.css", get_property_selector_styles)
+static_bundles.register("staging_inquiry.js", get_property_selector_script)
@@ -0,0 +1,177 @@
+"""
+Fingerprinted static bundles for the CSS/JS pages used to inline.
+
+Modules register the blocks they used to paste into every response:
+
+    static_bundles.register("site.css", lambda: get_shared_styles() + ...)
+
+and emit tags for them instead:
+
+    static_bundles.style_tag("site.css")    # <link rel="stylesheet" href=...>
+    static_bundles.script_tag("site.js")    # <script src=...></script>
+
+Each bundle is written once to static/bundles/<name>.<hash>.<ext> (hash of
+the content, so the URL changes exactly when the content does) alongside
+.gz and .br variants. BundleFiles serves them with the best encoding the
+client accepts and an immutable one-year cache header.
+
+Build step: `python3 tools/build_static_bundles.py` writes every bundle plus
+static/bundles/manifest.json and prunes stale fingerprints. Servers call
+mount(app) at startup, which builds them too; a bundle that's asked for
+before that is built on first use.
+
+STATIC_BUNDLES_INLINE=1 switches the tags back to inline <style>/<script>
+(debugging, and the before/after numbers in tools/bench_page_size.py).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+import anyio
+from fasthtml.common import Link, Script, Style
+from starlette.datastructures import Headers
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz variants are written
+    brotli = None
+
+BUNDLE_DIR = Path(__file__).resolve().parents[1] / "static" / "bundles"
+URL_PREFIX = "/static/bundles"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+INLINE = os.getenv("STATIC_BUNDLES_INLINE", "").strip() == "1"
+
+_producers: dict[str, Callable[[], str]] = {}
+_urls: dict[str, str] = {}       # name -> fingerprinted URL, once built
+_contents: dict[str, str] = {}   # name -> content, for inline mode
+
+
+def register(name: str, producer: Callable[[], str]) -> None:
+    """Declare a bundle. `name` is '<stem>.<css|js>'; `producer` returns its
+    full text and must not depend on the request."""
+    _producers[name] = producer
+    _urls.pop(name, None)
+    _contents.pop(name, None)
+
+
+def content(name: str) -> str:
+    if name not in _contents:
+        _contents[name] = _producers[name]()
+    return _contents[name]
+
+
+def _fingerprinted(name: str, text: str) -> str:
+    stem, ext = name.rsplit(".", 1)
+    digest = hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+    return f"{stem}.{digest}.{ext}"
+
+
+def _write(path: Path, data: bytes) -> None:
+    if path.exists():
+        return
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    os.fchmod(fd, 0o644)  # mkstemp's 0600 would survive the rename; nginx serves these
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _build_one(name: str) -> str:
+    text = content(name)
+    filename = _fingerprinted(name, text)
+    data = text.encode()
+    BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+    _write(BUNDLE_DIR / filename, data)
+    _write(BUNDLE_DIR / (filename + ".gz"), gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(BUNDLE_DIR / (filename + ".br"), brotli.compress(data, quality=11))
+    _urls[name] = f"{URL_PREFIX}/{filename}"
+    return filename
+
+
+def bundle_url(name: str) -> str:
+    if name not in _urls:
+        _build_one(name)
+    return _urls[name]
+
+
+def build_all(prune: bool = False) -> dict:
+    """Write every registered bundle; returns {name: filename}. With
+    prune, delete other fingerprints of these bundles and rewrite
+    manifest.json."""
+    manifest = {name: _build_one(name) for name in sorted(_producers)}
+    if prune:
+        keep = set(manifest.values())
+        for path in BUNDLE_DIR.iterdir():
+            base = path.name.removesuffix(".gz").removesuffix(".br")
+            parts = base.split(".")
+            if len(parts) == 3 and f"{parts[0]}.{parts[2]}" in manifest and base not in keep:
+                path.unlink()
+        (BUNDLE_DIR / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+
+def style_tag(name: str):
+    if INLINE:
+        return Style(content(name))
+    return Link(rel="stylesheet", href=bundle_url(name))
+
+
+def script_tag(name: str):
+    if INLINE:
+        return Script(content(name))
+    return Script(src=bundle_url(name))
+
+
+class BundleFiles(StaticFiles):
+    """StaticFiles for BUNDLE_DIR: serves the precompressed .br / .gz twin
+    when the client accepts it, and marks everything immutable — the
+    filename changes whenever the content does."""
+
+    def __init__(self) -> None:
+        BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+        super().__init__(directory=str(BUNDLE_DIR))
+
+    async def get_response(self, path, scope):
+        accepted = {
+            token.split(";")[0].strip()
+            for token in Headers(scope=scope).get("accept-encoding", "").split(",")
+        }
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = self.file_response(full_path, stat_result, scope)
+                response.headers["content-type"] = _media_type(path)
+                response.headers["content-encoding"] = encoding
+                break
+        else:
+            response = await super().get_response(path, scope)
+        response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def mount(app) -> None:
+    """Build every registered bundle and serve BUNDLE_DIR at URL_PREFIX.
+    Inserted ahead of all other routes: fast_app's catch-all
+    /{fname:path}.{ext:static} route would otherwise answer .css/.js
+    requests first, without the encodings or cache headers."""
+    build_all()
+    app.router.routes.insert(0, Mount(URL_PREFIX, app=BundleFiles(), name="static_bundles"))
+
+
+def _media_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return media_type + "; charset=utf-8" if media_type.startswith("text/") else media_type
+
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Index existing Toky calls into the call search index (as_portal_api/call_search.py).
+
+New and changed calls are indexed by triggers as they're written; this is
+for the calls that were already in zoho_sync.db when the index was created
+(or to rebuild it). Works through toky_calls by rowid, one short
+transaction per batch with a pause between, so the Toky worker and the
+portal keep writing while it runs. Safe to stop and rerun — pass the last
+rowid it printed as --after to pick up from there.
+
+    python3 tools/backfill_call_search.py [--db data/zoho_sync.db]
+        [--batch 200] [--pause 0.05] [--after 0] [--optimize]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from as_webapp.as_portal_api import call_search, toky_service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=os.path.join(ROOT, "data", "zoho_sync.db"))
+    parser.add_argument("--batch", type=int, default=200, help="calls per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds between batches")
+    parser.add_argument("--after", type=int, default=0, help="resume after this toky_calls rowid")
+    parser.add_argument("--optimize", action="store_true",
+                        help="merge the index b-trees afterwards (one longer write)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    try:
+        toky_service.ensure_tables(conn)
+        total = conn.execute("SELECT COUNT(*) FROM toky_calls WHERE rowid > ?", (args.after,)).fetchone()[0]
+        print(f"indexing {total} calls, {args.batch} per batch")
+        done = 0
+        last = args.after
+        t0 = time.perf_counter()
+        while True:
+            batch_t0 = time.perf_counter()
+            batch = call_search.backfill_batch(conn, last, args.batch)
+            if batch is None:
+                break
+            last, n = batch
+            done += n
+            print(f"  {done}/{total}  up to rowid {last}  "
+                  f"({(time.perf_counter() - batch_t0) * 1000:.0f}ms)")
+            time.sleep(args.pause)
+        if args.optimize:
+            conn.execute("INSERT INTO toky_call_search (toky_call_search) VALUES ('optimize')")
+            conn.commit()
+        print(f"done: {done} calls in {time.perf_counter() - t0:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main_()
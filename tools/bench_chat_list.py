@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat_db.list_conversations as a user's conversation count grows.
+
+Seeds throwaway chat.db / employees.db files in a temp dir, then times the
+chat-list query and counts the SQL statements it issues. Latency and the
+statement count should stay flat from 10 to 400 conversations.
+
+    python3 tools/bench_chat_list.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from as_webapp.as_portal_api import chat_db
+
+SIZES = (10, 50, 100, 200, 400)
+MESSAGES_PER_CONV = 20
+RUNS = 20
+
+
+def _seed_employees(path: Path, n_users: int) -> None:
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT,
+            email TEXT, user_role TEXT, is_active INTEGER DEFAULT 1
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO users (id, first_name, last_name, email, user_role) VALUES (?, ?, ?, ?, 'staff')",
+        [(i, f"User{i}", "Bench", f"user{i}@example.com") for i in range(1, n_users + 1)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _seed_conversations(viewer: int, n_convs: int) -> None:
+    for i in range(n_convs):
+        other = viewer + 1 + i
+        if i % 5 == 0:
+            conv = chat_db.create_group(viewer, f"Group {i}", [other, other + 1])
+        else:
+            conv = chat_db.find_or_create_dm(viewer, other)
+        for j in range(MESSAGES_PER_CONV):
+            sender = viewer if j % 3 == 0 else other
+            chat_db.insert_message(conv["id"], sender, f"message {j}")
+
+
+def _count_statements(fn) -> int:
+    count = 0
+    real_conn = chat_db._conn
+
+    def traced():
+        nonlocal count
+        conn = real_conn()
+
+        def _trace(_sql):
+            nonlocal count
+            count += 1
+
+        conn.set_trace_callback(_trace)
+        return conn
+
+    chat_db._conn = traced
+    try:
+        fn()
+    finally:
+        chat_db._conn = real_conn
+    return count
+
+
+def main():
+    print("=" * 64)
+    print("chat_db.list_conversations benchmark")
+    print("=" * 64)
+    print(f"{'convs':>6} {'statements':>11} {'mean ms':>9} {'p95 ms':>8}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            chat_db.DB_PATH = Path(tmp) / "chat.db"
+            chat_db.EMPLOYEES_DB_PATH = Path(tmp) / "employees.db"
+            _seed_employees(chat_db.EMPLOYEES_DB_PATH, size + 2)
+            chat_db.init_schema()
+            viewer = 1
+            _seed_conversations(viewer, size)
+
+            statements = _count_statements(lambda: chat_db.list_conversations(viewer))
+            timings = []
+            for _ in range(RUNS):
+                t0 = time.perf_counter()
+                convs = chat_db.list_conversations(viewer)
+                timings.append((time.perf_counter() - t0) * 1000)
+            assert len(convs) == size, (len(convs), size)
+            timings.sort()
+            mean = sum(timings) / len(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{size:>6} {statements:>11} {mean:>9.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+HTML size per page, before and after moving the shared CSS/JS into static
+bundles (page/static_bundles.py).
+
+  before — STATIC_BUNDLES_INLINE mode: every block inlined, as pages used
+           to be sent on every view
+  after  — <link> / <script src> to the fingerprinted bundles, which the
+           browser caches for a year
+
+Sizes are raw and gzip-9 (roughly what goes over the wire). The bundles
+themselves are listed once at the end: that's the one-time download.
+
+    python3 tools/bench_page_size.py
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.testclient import TestClient
+
+import main
+from as_webapp.portal_web import staging_task_board as tb
+from page import page_cache, static_bundles
+from tools.bench_task_board import _seed
+
+PATHS = [
+    "/", "/about-us", "/home-staging-services/", "/real-estate-staging/",
+    "/our-differences/", "/contactus/", "/staging-inquiry/",
+    "/design", "/staging-pricing", "/gallery", "/blog/",
+]
+
+
+def _page_sizes() -> dict:
+    client = TestClient(main.app)
+    sizes = {}
+    for path in PATHS:
+        html = client.get(path).content
+        sizes[path] = (len(html), len(gzip.compress(html, 9)))
+    html = tb._build_board_page(tb._fetch_all_stagings()).encode()
+    sizes["/staging_task_board"] = (len(html), len(gzip.compress(html, 9)))
+    return sizes
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        tb.ZOHO_DB = str(Path(tmp) / "zoho_sync.db")
+        _seed(Path(tb.ZOHO_DB), 150)
+
+        static_bundles.INLINE = True
+        before = _page_sizes()
+        # Otherwise the page cache serves the inlined HTML again
+        page_cache.clear()
+        static_bundles.INLINE = False
+        after = _page_sizes()
+
+    print("=" * 78)
+    print("page HTML size, shared CSS/JS inlined (before) vs bundled (after)")
+    print("=" * 78)
+    print(f"{'page':<26} {'before':>10} {'after':>10} {'before gz':>10} {'after gz':>10}")
+    for path in before:
+        (b_raw, b_gz), (a_raw, a_gz) = before[path], after[path]
+        print(f"{path:<26} {b_raw:>10,} {a_raw:>10,} {b_gz:>10,} {a_gz:>10,}")
+
+    print("\nbundles (downloaded once, then cached):")
+    for name, filename in static_bundles.build_all().items():
+        raw = (static_bundles.BUNDLE_DIR / filename).stat().st_size
+        gz = (static_bundles.BUNDLE_DIR / (filename + ".gz")).stat().st_size
+        print(f"  {filename:<40} {raw:>10,} {gz:>10,} gz")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Staging Task Board page render.
+
+Seeds a throwaway zoho_sync.db with synthetic Staging_Report rows, then
+times the board page:
+
+  cold         — first render, every row and calendar card built
+  warm         — nothing changed, served from the cache
+  one edit     — a single row updated the way set_date does it
+  uncached     — the full render the page did on every load before caching
+
+    python3 tools/bench_task_board.py [--rows 150]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from as_webapp.portal_web import staging_task_board as tb
+from tools.zoho_sync.config import iso_date_columns_for
+from tools.zoho_sync.database import iso_date_column, iso_date_expr
+
+COLUMNS = [
+    "ID", "Staging_Display_Name", "Staging_Address", "Staging_Status",
+    "Coming_Staging_Destaging_Date", "Staging_Date", "Destaging_Date",
+    "Customer_First_Name", "Customer_Last_Name", "Stager", "Staging_Movers",
+    "Destaging_Movers", "General_Notes", "Total_Item_Number",
+    "Before_Picture_Upload_Date", "_sync_status",
+]
+# Other columns the row / card builders read; left empty
+EMPTY_COLUMNS = [
+    "After_Picture_Upload_Date", "Check_Basement_Furniture_Size_Date",
+    "Consultation_Date_and_Time", "Consultation_Stager1", "Customer_Email",
+    "Customer_Phone", "Design_Items_Matched_Date", "Destaging_Moving_Instructions",
+    "Driving_Time", "HouseSigma_URL", "Invoice_Sent_Date", "MLS",
+    "Next_Steps_Email_Sent_Date", "Occupancy_Type", "Owing_Amount", "Paid_Amount",
+    "Pictures_Folder", "Property_Type", "Staging_Accessories_Packing_Finish_Date",
+    "Staging_ETA", "Staging_Furniture_Design_Finish_Date",
+    "Staging_Moving_Instructions", "Staging_Type", "Total_Staging_Fee",
+    "WhatsApp_Group_Created_Date",
+]
+
+
+def _seed(path: Path, n_rows: int) -> None:
+    conn = sqlite3.connect(str(path))
+    conn.execute(f"CREATE TABLE Staging_Report ({', '.join(c + ' TEXT' for c in COLUMNS + EMPTY_COLUMNS)})")
+    for field in iso_date_columns_for("Staging_Report"):
+        conn.execute(
+            f"ALTER TABLE Staging_Report ADD COLUMN {iso_date_column(field)} TEXT "
+            f"GENERATED ALWAYS AS ({iso_date_expr(field)}) VIRTUAL"
+        )
+    conn.execute("CREATE TABLE Employee_Report (First_Name TEXT, Last_Name TEXT)")
+    start = date.today() - timedelta(days=10)
+    rows = []
+    for i in range(n_rows):
+        d = (start + timedelta(days=i // 4)).strftime("%m/%d/%Y")
+        rows.append((
+            str(3692314000000000000 + i), f"{i} Main St", json.dumps({"display_value": f"{i} Main St, Toronto"}),
+            "Active" if i % 6 else "Inquired", d, d, "", f"First{i}", f"Last{i}",
+            json.dumps([{"display_value": "Nency"}]), json.dumps([{"display_value": "Ravi"}]), "",
+            "Notes " * 20, "40", "", None,
+        ))
+    conn.executemany(
+        f"INSERT INTO Staging_Report ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})", rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=150)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tb.ZOHO_DB = str(Path(tmp) / "zoho_sync.db")
+        _seed(Path(tb.ZOHO_DB), args.rows)
+        cache = tb._BoardCache()
+
+        cold = _timed(cache.page)
+        warm = _timed(cache.page)
+
+        with tb._conn() as c:
+            c.execute("UPDATE Staging_Report SET Before_Picture_Upload_Date = ? WHERE ID = ?",
+                      (date.today().strftime("%m/%d/%Y"), str(3692314000000000000 + 7)))
+            c.commit()
+        one_edit = _timed(cache.page)
+
+        uncached = _timed(lambda: tb._build_board_page(tb._fetch_all_stagings()))
+
+    print("=" * 64)
+    print(f"staging task board render benchmark ({args.rows} rows)")
+    print("=" * 64)
+    for label, ms in (("cold", cold), ("warm", warm), ("one edit", one_edit), ("uncached", uncached)):
+        print(f"{label:<12} {ms:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the Toky call pipeline (as_portal_api/toky_pipeline.py).
+
+Seeds a scratch zoho_sync.db with N pending calls whose recordings are
+already in a scratch audio cache, switches toky_service to its stub
+Deepgram / Sonnet backends (fixed latency ±25%, no network), then drains
+the backlog twice:
+
+  serial  — toky_service.process_call one call at a time, the way the old
+            worker did
+  staged  — TokyPipeline with the configured per-stage pools
+
+and prints wall time plus the pipeline's per-stage metrics.
+
+    python3 tools/bench_toky_pipeline.py [--calls 40] [--transcribe-ms 200]
+        [--extract-ms 500] [--skip-serial]
+
+Stage pool sizes come from the usual TOKY_*_WORKERS variables.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from as_webapp.as_portal_api import toky_pipeline, toky_service
+
+
+def _seed(db_path: Path, audio_dir: Path, calls: int) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        toky_service.ensure_tables(conn)
+        conn.execute("DELETE FROM toky_calls")
+        conn.execute("DELETE FROM jobs")
+        for i in range(calls):
+            callid = f"bench-{i:04d}"
+            (audio_dir / f"{callid}.mp3").write_bytes(b"ID3" + os.urandom(2048))
+            toky_service.insert_cdr(conn, {
+                "callid": callid,
+                "direction": "inbound",
+                "from": f"+1416555{i:04d}",
+                "duration": 95,
+                "record_url": f"https://tokystorage.example/{callid}.mp3",
+            })
+    finally:
+        conn.close()
+
+
+def _serial(db_path: Path) -> int:
+    conn = sqlite3.connect(db_path)
+    done = 0
+    try:
+        while True:
+            claimed = toky_service.claim_next_call(conn, "bench-serial")
+            if not claimed:
+                return done
+            cdr, job = claimed
+            toky_service.process_call(conn, cdr)
+            toky_service.finish_call(conn, job)
+            done += 1
+    finally:
+        conn.close()
+
+
+async def _staged(db_path: Path, calls: int) -> dict:
+    finished = asyncio.Event()
+    done = []
+
+    async def on_done(summary: dict) -> None:
+        done.append(summary)
+        if len(done) >= calls:
+            finished.set()
+
+    toky_pipeline.POLL_SECONDS = 0.2
+    pipeline = toky_pipeline.TokyPipeline(str(db_path), on_done=on_done)
+    pipeline.start()
+    try:
+        await finished.wait()
+    finally:
+        await pipeline.stop()
+    return pipeline.metrics()
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--transcribe-ms", type=int, default=200)
+    parser.add_argument("--extract-ms", type=int, default=500)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    toky_service.TRANSCRIBE_BACKEND = "stub"
+    toky_service.EXTRACT_BACKEND = "stub"
+    toky_service.STUB_TRANSCRIBE_MS = args.transcribe_ms
+    toky_service.STUB_EXTRACT_MS = args.extract_ms
+    toky_pipeline.METRICS_LOG_SECONDS = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "zoho_sync.db"
+        toky_service.TOKY_AUDIO_DIR = Path(tmp) / "toky_audio"
+        toky_service.TOKY_AUDIO_DIR.mkdir()
+        print(f"{args.calls} calls, stub transcribe ~{args.transcribe_ms}ms, "
+              f"extract ~{args.extract_ms}ms")
+
+        if not args.skip_serial:
+            _seed(db_path, toky_service.TOKY_AUDIO_DIR, args.calls)
+            t0 = time.perf_counter()
+            n = _serial(db_path)
+            serial_s = time.perf_counter() - t0
+            print(f"serial: {n} calls in {serial_s:.1f}s ({n / serial_s * 60:.0f}/min)")
+
+        _seed(db_path, toky_service.TOKY_AUDIO_DIR, args.calls)
+        t0 = time.perf_counter()
+        metrics = asyncio.run(_staged(db_path, args.calls))
+        staged_s = time.perf_counter() - t0
+        print(f"staged: {args.calls} calls in {staged_s:.1f}s "
+              f"({args.calls / staged_s * 60:.0f}/min)")
+        print(json.dumps(metrics["stages"], indent=2))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark zoho_sync Database.upsert_records throughput.
+
+Builds synthetic Item_Report-shaped records (a few optional columns so the
+batch has several column signatures) and measures rows per second for:
+
+  full         — empty table, every record inserted
+  incremental  — table already populated, a slice of records re-upserted
+  unchanged    — every record re-upserted as-is (all skipped: identical to the stored row)
+
+Runs against a throwaway database in a temp dir, never data/zoho_sync.db.
+
+    python3 tools/bench_zoho_upsert.py [--rows 20000] [--incremental 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.zoho_sync.database import Database
+
+FIELDS = [
+    "Item_Name", "Item_Barcode", "Item_Type", "Item_Color", "Item_Style",
+    "Item_Depth", "Item_Width", "Item_Height", "Item_Notes", "Current_Location",
+    "Item_Image", "Resized_Image", "Modified_Time", "Added_Time",
+]
+OPTIONAL_FIELDS = ["Item_Notes", "Resized_Image", "Item_Style"]
+
+
+def make_record(i: int) -> dict:
+    record = {"ID": str(4_000_000_000 + i)}
+    for field in FIELDS:
+        if field in OPTIONAL_FIELDS and i % (OPTIONAL_FIELDS.index(field) + 3) == 0:
+            continue
+        if field == "Current_Location":
+            record[field] = {"display_value": f"Warehouse {i % 7}", "ID": str(i % 7)}
+        else:
+            record[field] = f"{field}-{i}"
+    return record
+
+
+async def run(rows: int, incremental: int) -> None:
+    records = [make_record(i) for i in range(rows)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        await db.connect()
+        try:
+            await db.create_table_from_fields("Item_Report", ["ID", "Item_Name"])
+
+            t0 = time.perf_counter()
+            result = await db.upsert_records("Item_Report", records)
+            full_s = time.perf_counter() - t0
+
+            changed = random.Random(0).sample(records, min(incremental, rows))
+            for r in changed:
+                r["Item_Notes"] = "edited"
+            t0 = time.perf_counter()
+            inc_result = await db.upsert_records("Item_Report", changed)
+            inc_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            noop_result = await db.upsert_records("Item_Report", records)
+            noop_s = time.perf_counter() - t0
+        finally:
+            await db.disconnect()
+
+    print("=" * 64)
+    print("zoho_sync upsert_records benchmark")
+    print("=" * 64)
+    print(f"{'mode':<12} {'rows':>8} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'full':<12} {result['successful']:>8} {full_s:>9.2f} {result['successful'] / full_s:>10.0f}")
+    print(f"{'incremental':<12} {inc_result['successful']:>8} {inc_s:>9.2f} {inc_result['successful'] / inc_s:>10.0f}")
+    print(f"{'unchanged':<12} {noop_result['unchanged']:>8} {noop_s:>9.2f} {noop_result['unchanged'] / noop_s:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--incremental", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.incremental))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Write the fingerprinted CSS/JS bundles (see page/static_bundles.py) to
+static/bundles/, with .gz / .br twins and manifest.json, and prune stale
+fingerprints. Run on deploy; the servers also build at startup.
+
+    python3 tools/build_static_bundles.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing the pages registers their bundles
+import page.components  # noqa: F401
+import page.staging_inquiry  # noqa: F401
+import as_webapp.portal_web.staging_task_board  # noqa: F401
+from page import static_bundles
+
+
+def main():
+    manifest = static_bundles.build_all(prune=True)
+    for name, filename in manifest.items():
+        sizes = [
+            f"{p.name.rsplit('.', 1)[-1]} {p.stat().st_size:,}"
+            for p in sorted(static_bundles.BUNDLE_DIR.glob(filename + "*"))
+        ]
+        print(f"{name:<24} {filename:<36} {' | '.join(sizes)}")
+    if static_bundles.brotli is None:
+        print("brotli not installed — wrote .gz variants only")
+
+
+if __name__ == "__main__":
+    main()
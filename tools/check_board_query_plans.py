@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the Staging_Report board queries.
+
+Builds a throwaway zoho_sync.db through the sync layer (so the generated
+_<field>_iso columns and their indexes are created exactly as in
+production), seeds it, and runs EXPLAIN QUERY PLAN on:
+
+  /api/v1/tasks/board   — every dated period (today, week, upcoming, past)
+  staging_task_board    — _fetch_all_stagings
+
+Exits non-zero if any of them scans Staging_Report instead of searching
+an index. Run after touching either query or the ISO date columns.
+
+    python3 tools/check_board_query_plans.py
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from as_webapp.as_portal_api.routes import _STAGING_SELECT, _board_query
+from as_webapp.portal_web.staging_task_board import _ALL_STAGINGS_SQL
+from tools.zoho_sync.database import Database
+
+PERIODS = ("today", "week", "upcoming", "past")
+ROWS = 2000
+
+
+def _staging_fields() -> list:
+    select = _STAGING_SELECT.split("FROM")[0].replace("SELECT", "")
+    fields = [f.strip() for f in select.split(",") if f.strip()]
+    return list(dict.fromkeys(fields + ["Coming_Staging_Destaging_Date", "Staging_Status"]))
+
+
+async def _build_db(path: Path) -> None:
+    db = Database(path)
+    await db.connect()
+    try:
+        await db.create_table_from_fields("Staging_Report", _staging_fields())
+        start = date.today() - timedelta(days=ROWS // 4)
+        records = []
+        for i in range(ROWS):
+            d = (start + timedelta(days=i // 2)).strftime("%m/%d/%Y")
+            records.append({
+                "ID": str(3692314000000000000 + i),
+                "Staging_Date": d,
+                "Destaging_Date": d if i % 3 else "",
+                "Coming_Staging_Destaging_Date": d,
+                "Staging_Status": ("Active", "Inquired", "Completed")[i % 3],
+            })
+        await db.upsert_records("Staging_Report", records)
+        await db.execute("ANALYZE")
+    finally:
+        await db.disconnect()
+
+
+def _plan(conn, sql, params=()) -> list:
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "zoho_sync.db"
+        asyncio.run(_build_db(path))
+        conn = sqlite3.connect(str(path))
+        checks = [(f"tasks/board period={p}", *_board_query(p, date.today())) for p in PERIODS]
+        checks.append(("staging_task_board _fetch_all_stagings", _ALL_STAGINGS_SQL, []))
+        for label, sql, params in checks:
+            plan = _plan(conn, sql, params)
+            scans = [step for step in plan if re.match(r"SCAN Staging_Report\b", step)]
+            status = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{status}] {label}")
+            for step in plan:
+                print(f"        {step}")
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} scan Staging_Report")
+        sys.exit(1)
+    print("\nAll board queries use an index")
+
+
+if __name__ == "__main__":
+    main()
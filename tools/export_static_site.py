@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prerender the public marketing site to static files for nginx.
+
+Renders every route registered through main.marketing_route (home,
+gallery, pricing, about, service pages, area landing pages, blog listing
+and each blog post) into <out>/<path>/index.html, copies static/ (with the
+CSS/JS bundles freshly built) to <out>/static/, writes a .gz twin of each
+page for gzip_static, and records everything in <out>/manifest.json.
+
+Anything not exported — the portal, /api/*, the Instagram image proxy,
+/staging-inquiry/, /design — still comes from the app:
+
+    location / {
+        root /srv/astra/site;
+        gzip_static on;
+        try_files $uri $uri/index.html @app;
+    }
+    location @app { proxy_pass http://127.0.0.1:5001; }
+
+Pages embed the Instagram posts and Google reviews as of export time, so
+re-run after deploys (and on a timer to pick up new posts).
+
+    python3 tools/export_static_site.py [--out export/site]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# Add parent directory to path
+sys.path.insert(0, str(ROOT))
+# main mounts static/ relative to the working directory
+os.chdir(ROOT)
+
+from starlette.testclient import TestClient
+
+import main
+from page import static_bundles
+
+
+def _html_path(out: Path, route: str) -> Path:
+    rel = route.strip("/")
+    return out / rel / "index.html" if rel else out / "index.html"
+
+
+def export(out: Path) -> dict:
+    static_bundles.build_all(prune=True)
+    staging = out.with_name(out.name + ".tmp")
+    if staging.exists():
+        shutil.rmtree(staging)
+    shutil.copytree(ROOT / "static", staging / "static")
+
+    client = TestClient(main.app)
+    pages = {}
+    failed = []
+    for route in main.MARKETING_PATHS:
+        response = client.get(route)
+        if response.status_code != 200:
+            failed.append((route, response.status_code))
+            continue
+        body = response.content
+        path = _html_path(staging, route)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+        Path(str(path) + ".gz").write_bytes(gzip.compress(body, 9, mtime=0))
+        pages[route] = {
+            "file": str(path.relative_to(staging)),
+            "bytes": len(body),
+            "sha256": hashlib.sha256(body).hexdigest(),
+        }
+    if failed:
+        shutil.rmtree(staging)
+        raise SystemExit("export aborted, routes failed: " +
+                         ", ".join(f"{r} ({code})" for r, code in failed))
+
+    assets = sorted(
+        str(p.relative_to(staging)) for p in (staging / "static").rglob("*") if p.is_file()
+    )
+    manifest = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "pages": pages,
+        "bundles": static_bundles.build_all(),
+        "assets": len(assets),
+    }
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+
+    # Swap the finished tree in so nginx never serves a half-written export
+    if out.exists():
+        old = out.with_name(out.name + ".old")
+        if old.exists():
+            shutil.rmtree(old)
+        out.rename(old)
+        staging.rename(out)
+        shutil.rmtree(old)
+    else:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        staging.rename(out)
+    return manifest
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=str(ROOT / "export" / "site"))
+    args = parser.parse_args()
+
+    out = Path(args.out).resolve()
+    manifest = export(out)
+    total = sum(p["bytes"] for p in manifest["pages"].values())
+    print(f"Exported {len(manifest['pages'])} pages ({total:,} bytes of HTML) "
+          f"and {manifest['assets']} assets to {out}")
+
+
+if __name__ == "__main__":
+    main_()
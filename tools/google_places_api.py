@@ -7,6 +7,15 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Called with no arguments whenever fresh reviews are fetched
+_refresh_listeners = []
+
+
+def add_refresh_listener(listener):
+    """Run `listener()` after each successful reviews refresh"""
+    _refresh_listeners.append(listener)
+
+
 class GooglePlacesAPI:
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_PLACES_API_KEY')
@@ -78,6 +87,8 @@ class GooglePlacesAPI:
 
                     # Cache the data
                     self._cache_data(review_data)
+                    for listener in _refresh_listeners:
+                        listener()
                     return review_data
 
         except Exception as e:
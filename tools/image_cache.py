@@ -0,0 +1,145 @@
+"""
+Byte-budgeted LRU store for proxied image bodies.
+
+Two tiers, each with its own byte budget:
+
+- memory: an OrderedDict of key -> CachedImage, most recently used last.
+- disk:   one file per key under `directory`, named `<key><ext>` where the
+          extension carries the content type. File mtime is the LRU clock
+          (touched on every hit), so the order survives restarts.
+
+A memory miss falls through to disk and promotes the entry back into
+memory. Inserting past either budget evicts least-recently-used entries
+until the tier fits again; a body larger than a whole budget is simply not
+kept in that tier.
+
+Keys must be filesystem-safe (the Instagram proxy uses 16 hex chars).
+Not thread-safe — meant to be used from one event loop.
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class CachedImage:
+    data: bytes
+    content_type: str
+    etag: str
+
+
+def make_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+
+
+class LRUImageStore:
+    def __init__(self, directory: Path, memory_bytes: int, disk_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._memory_used = 0
+        # key -> (filename, size), least recently used first
+        self._disk: "OrderedDict[str, tuple[str, int]]" = OrderedDict()
+        self._disk_used = 0
+        self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[Path(name).stem] = (name, size)
+            self._disk_used += size
+        self._evict_disk()
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        item = self._memory.get(key)
+        if item is not None:
+            self._memory.move_to_end(key)
+            return item
+        on_disk = self._disk.get(key)
+        if on_disk is None:
+            return None
+        name, _ = on_disk
+        path = self.directory / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            self._drop_disk(key)
+            return None
+        self._disk.move_to_end(key)
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        item = CachedImage(data, content_type, make_etag(data))
+        self._put_memory(key, item)
+        return item
+
+    def put(self, key: str, data: bytes, content_type: str) -> CachedImage:
+        item = CachedImage(data, content_type, make_etag(data))
+        self._put_memory(key, item)
+        self._put_disk(key, item)
+        return item
+
+    def _put_memory(self, key: str, item: CachedImage) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old.data)
+        if len(item.data) > self.memory_bytes:
+            return
+        self._memory[key] = item
+        self._memory_used += len(item.data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted.data)
+
+    def _put_disk(self, key: str, item: CachedImage) -> None:
+        self._drop_disk(key)
+        if len(item.data) > self.disk_bytes:
+            return
+        ext = mimetypes.guess_extension(item.content_type.split(";")[0].strip()) or ".bin"
+        name = key + ext
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            os.fchmod(fd, 0o644)  # mkstemp's 0600 would survive the rename
+            with os.fdopen(fd, "wb") as f:
+                f.write(item.data)
+            os.replace(tmp, self.directory / name)
+        except OSError as e:
+            print(f"Image cache write failed for {key}: {e}")
+            return
+        self._disk[key] = (name, len(item.data))
+        self._disk_used += len(item.data)
+        self._evict_disk()
+
+    def _drop_disk(self, key: str) -> None:
+        on_disk = self._disk.pop(key, None)
+        if on_disk is None:
+            return
+        name, size = on_disk
+        self._disk_used -= size
+        try:
+            (self.directory / name).unlink()
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        while self._disk_used > self.disk_bytes and self._disk:
+            self._drop_disk(next(iter(self._disk)))
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_used,
+        }
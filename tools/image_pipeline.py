@@ -0,0 +1,180 @@
+"""
+Image processing off the event loop.
+
+PIL decode / resize / encode is CPU-bound and holds the GIL, so running it
+inside an async handler (or even a thread) stalls every other request on
+the worker — chat SSE included. Jobs here run in a small process pool:
+
+    result = await image_pipeline.run(fn, *args)
+    accepted = image_pipeline.try_submit(fn, *args)
+
+`fn` must be a module-level function (it's pickled to the worker).
+run() waits for a free worker and returns the job's result.
+try_submit() schedules the job in the background and returns True, or
+returns False without queueing when IMAGE_POOL_MAX_PENDING jobs are
+already queued or running — callers turn that into a 503 so a burst of
+uploads is pushed back instead of piling up in memory.
+
+Pool size: IMAGE_POOL_WORKERS (default: half the CPUs, at least 1).
+Workers are spawned, not forked, so they don't inherit the server's
+threads and open sqlite handles.
+
+Jobs: render_area_photo() (staging-photo upload: one decode, every
+rendition in AREA_RENDITIONS written from it) and render_resized() (one
+on-demand ?w= rendition, see as_portal_api/media_renditions.py).
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", "32"))
+
+# name -> (bounding box, format, quality). "full" keeps the 1920x1440 JPEG
+# the staging-photo URLs have always pointed at.
+AREA_RENDITIONS = {
+    "full":  ((1920, 1440), "JPEG", 85),
+    "1280":  ((1280, 1280), "JPEG", 82),
+    "480":   ((480, 480), "JPEG", 80),
+    "webp":  ((1280, 1280), "WEBP", 80),
+}
+_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+# Raw staging-photo uploads (EXIF and GPS intact); never under static/.
+AREA_ORIGINALS_DIR = Path("data/area_originals")
+
+
+def rendition_filename(stem: str, name: str) -> str:
+    """Filename of a non-full rendition, e.g. kitchen_1a2b3c4d_480.jpg."""
+    fmt = AREA_RENDITIONS[name][1]
+    suffix = "" if name == "webp" else f"_{name}"
+    return f"{stem}{suffix}{_EXTENSIONS[fmt]}"
+
+
+def _save_atomic(image, path: Path, fmt: str, quality: int) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    os.fchmod(fd, 0o644)  # served from static/; mkstemp's 0600 survives the rename
+    os.close(fd)
+    try:
+        if fmt == "JPEG":
+            image.save(tmp, "JPEG", quality=quality, optimize=True)
+        else:
+            image.save(tmp, fmt, quality=quality, method=4)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_area_photo(src: str, full_path: str, renditions_dir: str, stem: str) -> dict:
+    """Decode `src` once and write every AREA_RENDITIONS entry: "full" to
+    full_path, the rest into renditions_dir. Largest first, each smaller one
+    resized from the previous; the re-encodes carry no EXIF. On failure the
+    files already written are removed. Runs in a pool worker; returns
+    {name: path}."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+    out_dir = Path(renditions_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+    by_size = sorted(AREA_RENDITIONS.items(), key=lambda kv: -kv[1][0][0])
+    try:
+        for name, (box, fmt, quality) in by_size:
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            path = Path(full_path) if name == "full" else out_dir / rendition_filename(stem, name)
+            _save_atomic(image, path, fmt, quality)
+            written[name] = str(path)
+    except BaseException:
+        # All or nothing: don't leave a public URL without its renditions
+        for path in written.values():
+            Path(path).unlink(missing_ok=True)
+        raise
+    return written
+
+
+def render_resized(src: str, dest: str, width: int, fmt: str, quality: int) -> int:
+    """Write `src` at most `width` px wide (never upscaled, EXIF orientation
+    applied) to `dest` in `fmt`. Runs in a pool worker; returns the size
+    in bytes of the written file."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as opened:
+        image = ImageOps.exif_transpose(opened)
+    if image.width > width:
+        image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+    if image.mode not in ("RGB", "L") and fmt == "JPEG":
+        image = image.convert("RGB")
+    path = Path(dest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _save_atomic(image, path, fmt, quality)
+    return path.stat().st_size
+
+
+class ImagePipeline:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._background: set = set()
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._slots = asyncio.Semaphore(self.workers)
+
+    def has_capacity(self, jobs: int = 1) -> bool:
+        return self.pending + jobs <= self.max_pending
+
+    async def run(self, fn, *args):
+        self.pending += 1
+        return await self._execute(fn, *args)
+
+    def try_submit(self, fn, *args) -> bool:
+        if not self.has_capacity():
+            return False
+        self.pending += 1
+        task = asyncio.ensure_future(self._execute_logged(fn, *args))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return True
+
+    async def _execute(self, fn, *args):
+        """Run one already-counted job; releases its pending slot."""
+        try:
+            self._ensure_started()
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def _execute_logged(self, fn, *args) -> None:
+        try:
+            await self._execute(fn, *args)
+        except Exception as e:
+            print(f"Image job {fn.__name__}{args} failed: {e}")
+
+    def shutdown(self) -> None:
+        """Cancel queued background jobs and stop the worker processes
+        (app shutdown hook)."""
+        for task in list(self._background):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pipeline = ImagePipeline()
@@ -3,8 +3,10 @@ Instagram Public Profile Scraper
 Fetches recent posts from a public Instagram profile without authentication.
 """
 
+import hashlib
 import httpx
 import json
+import time
 from typing import Optional
 import asyncio
 
@@ -119,6 +121,49 @@ def get_instagram_posts_sync(username: str = INSTAGRAM_USERNAME, limit: int = 12
 # Cache for storing posts
 _cached_posts = []
 _cache_time = None
+# image_id(image_url) -> image_url for the cached posts; rebuilt on refresh
+_image_index = {}
+# Called with no arguments after each successful refresh
+_refresh_listeners = []
+# lookup_image_url loads the cache on a miss at most this often
+MISS_RELOAD_SECONDS = 60
+_last_miss_load = 0.0
+
+
+def add_refresh_listener(listener) -> None:
+    """Run `listener()` whenever the post cache refreshes (e.g. to drop
+    pages rendered from the old posts)."""
+    _refresh_listeners.append(listener)
+
+
+def image_id(image_url: str) -> str:
+    """16-char id the image proxy serves an Instagram image under."""
+    return hashlib.md5(image_url.encode()).hexdigest()[:16]
+
+
+def _rebuild_image_index(posts: list) -> None:
+    global _image_index
+    _image_index = {
+        image_id(post["image_url"]): post["image_url"]
+        for post in posts if post.get("image_url")
+    }
+
+
+def lookup_image_url(image_id_: str) -> Optional[str]:
+    """Image URL for a proxy id among the cached posts. On a miss the post
+    cache is loaded (if stale) and checked again: a fresh process, or pages
+    served from the static export, may never have rendered it. Blocking —
+    call it off the event loop."""
+    global _last_miss_load
+    image_url = _image_index.get(image_id_)
+    if image_url is None and time.time() - _last_miss_load > MISS_RELOAD_SECONDS:
+        # Throttled so unknown ids can't each trigger an Instagram fetch
+        # while it's failing
+        _last_miss_load = time.time()
+        get_cached_posts()
+        image_url = _image_index.get(image_id_)
+    return image_url
+
 
 def get_cached_posts(max_age_seconds: int = 3600) -> list:
     """
@@ -130,7 +175,6 @@ def get_cached_posts(max_age_seconds: int = 3600) -> list:
     Returns:
         List of post data
     """
-    import time
     global _cached_posts, _cache_time
 
     current_time = time.time()
@@ -139,6 +183,9 @@ def get_cached_posts(max_age_seconds: int = 3600) -> list:
         try:
             _cached_posts = get_instagram_posts_sync()
             _cache_time = current_time
+            _rebuild_image_index(_cached_posts)
+            for listener in _refresh_listeners:
+                listener()
         except Exception as e:
             print(f"Error refreshing Instagram cache: {e}")
             # Return old cache if refresh fails
@@ -0,0 +1,308 @@
+"""
+Search index and facet counts for the Item_Report catalogue (item_management).
+
+Three tables in zoho_sync.db, all kept in step with Item_Report by
+triggers, so every writer is covered: the Zoho sync upserts and deletes,
+update_item (and its Model_3D sibling update), the 3D batch converter and
+anything run by hand.
+
+    item_search_rows   one row per named item: name, type, colour, style,
+                       barcode, parsed location, has_3d
+    item_search        FTS5 trigram index over name / type / colour /
+                       style / barcode (external content: item_search_rows),
+                       so any 3+ character substring hits, like the LIKE
+                       '%…%' it replaces
+    item_facets        (type, location, has_3d) → count; a few hundred
+                       cells however big the catalogue gets
+
+The filter dropdowns' counts are sums over item_facets (or over the name
+matches, when there's a search term), and the card grid is read a page of
+item names at a time, so a filter change never scans Item_Report.
+
+Item_Report is created by the Zoho sync, not here. ensure_index() sets the
+index up (and fills it) the first time it's called after the table
+exists; it's a single sqlite_master lookup after that.
+"""
+import os
+import sqlite3
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PAGE_SIZE = int(os.getenv("ITEM_PAGE_SIZE", "48"))   # item names (cards) per page
+
+WAREHOUSE = "3600 Warehouse"
+
+_FTS_COLUMNS = ("name", "item_type", "color", "style", "barcode")
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS item_search_rows (
+        row_id INTEGER PRIMARY KEY,
+        item_id TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        item_type TEXT NOT NULL,
+        color TEXT,
+        style TEXT,
+        barcode TEXT,
+        location TEXT NOT NULL,
+        has_3d INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_item_search_rows_name ON item_search_rows(name)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5(
+        name, item_type, color, style, barcode,
+        content = 'item_search_rows', content_rowid = 'row_id',
+        tokenize = 'trigram'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS item_facets (
+        item_type TEXT NOT NULL,
+        location TEXT NOT NULL,
+        has_3d INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (item_type, location, has_3d)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def _location(row: str) -> str:
+    """SQL twin of item_management.parse_location ('' when NULL, which the
+    location dropdown leaves out)."""
+    loc = f"{row}.Current_Location"
+    return (
+        f"CASE WHEN {loc} IS NULL THEN '' "
+        f"WHEN {loc} = '' THEN 'Unknown Location' "
+        f"WHEN {loc} LIKE '{{%' AND json_valid({loc}) "
+        f"THEN coalesce(json_extract({loc}, '$.display_value'), {loc}) "
+        f"ELSE {loc} END"
+    )
+
+
+def _row_values(row: str) -> str:
+    """item_search_rows' columns, from Item_Report row `row`."""
+    return (f"{row}.ID, {row}.Item_Name, coalesce({row}.Item_Type, ''), {row}.Item_Color, "
+            f"{row}.Item_Style, {row}.Barcode, {_location(row)}, "
+            f"coalesce({row}.Model_3D, '') != ''")
+
+
+_ROW_COLUMNS = "item_id, name, item_type, color, style, barcode, location, has_3d"
+
+
+def _index_row(row: str) -> str:
+    return f"""
+        INSERT INTO item_search_rows ({_ROW_COLUMNS})
+        SELECT {_row_values(row)}
+        WHERE coalesce({row}.Item_Name, '') != '';
+    """
+
+
+_WATCHED = ("ID", "Item_Name", "Item_Type", "Item_Color", "Item_Style", "Barcode",
+            "Current_Location", "Model_3D")
+
+# Trigger statements take the outer statement's conflict clause (an
+# INSERT OR IGNORE / OR REPLACE on Item_Report would otherwise leak into
+# them), so nothing below relies on one: rows are deleted before they're
+# re-inserted, and facet cells are created if missing and then counted.
+TRIGGERS = {
+    "item_search_report_ai": f"""
+        AFTER INSERT ON Item_Report BEGIN
+            DELETE FROM item_search_rows WHERE item_id = NEW.ID;
+            {_index_row('NEW')}
+        END
+    """,
+    "item_search_report_au": f"""
+        AFTER UPDATE ON Item_Report
+        WHEN {' OR '.join(f'NEW.{c} IS NOT OLD.{c}' for c in _WATCHED)}
+        BEGIN
+            DELETE FROM item_search_rows WHERE item_id = OLD.ID;
+            {_index_row('NEW')}
+        END
+    """,
+    "item_search_report_ad": """
+        AFTER DELETE ON Item_Report BEGIN
+            DELETE FROM item_search_rows WHERE item_id = OLD.ID;
+        END
+    """,
+    "item_search_rows_ai": f"""
+        AFTER INSERT ON item_search_rows BEGIN
+            INSERT INTO item_search (rowid, {', '.join(_FTS_COLUMNS)})
+                VALUES (NEW.row_id, {', '.join(f'NEW.{c}' for c in _FTS_COLUMNS)});
+            INSERT INTO item_facets (item_type, location, has_3d, n)
+                SELECT NEW.item_type, NEW.location, NEW.has_3d, 0
+                WHERE NOT EXISTS (SELECT 1 FROM item_facets WHERE item_type = NEW.item_type
+                                  AND location = NEW.location AND has_3d = NEW.has_3d);
+            UPDATE item_facets SET n = n + 1
+                WHERE item_type = NEW.item_type AND location = NEW.location AND has_3d = NEW.has_3d;
+        END
+    """,
+    "item_search_rows_ad": f"""
+        AFTER DELETE ON item_search_rows BEGIN
+            INSERT INTO item_search (item_search, rowid, {', '.join(_FTS_COLUMNS)})
+                VALUES ('delete', OLD.row_id, {', '.join(f'OLD.{c}' for c in _FTS_COLUMNS)});
+            UPDATE item_facets SET n = n - 1
+                WHERE item_type = OLD.item_type AND location = OLD.location AND has_3d = OLD.has_3d;
+            DELETE FROM item_facets
+                WHERE item_type = OLD.item_type AND location = OLD.location AND has_3d = OLD.has_3d
+                  AND n <= 0;
+        END
+    """,
+}
+
+
+def ensure_index(conn: sqlite3.Connection) -> bool:
+    """Make sure the index exists and is filled. False if Item_Report
+    hasn't been synced yet (or lacks the indexed columns)."""
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'item_search_report_ad'"
+    ).fetchone():
+        return True
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Item_Report'"
+    ).fetchone():
+        return False
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        for name, body in TRIGGERS.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        _refill(conn)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"[item_search] index unavailable: {e}")
+        return False
+    return True
+
+
+def _refill(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM item_search_rows")
+    conn.execute("INSERT INTO item_search (item_search) VALUES ('delete-all')")
+    conn.execute("DELETE FROM item_facets")
+    # Goes through item_search_rows_ai, which fills item_search / item_facets
+    conn.execute(f"INSERT INTO item_search_rows ({_ROW_COLUMNS}) SELECT {_row_values('r')} "
+                 f"FROM Item_Report r WHERE coalesce(r.Item_Name, '') != ''")
+
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    """Re-derive the index from Item_Report. Returns the indexed row count."""
+    if not ensure_index(conn):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    _refill(conn)
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM item_search_rows").fetchone()[0]
+
+
+# ---------------- queries ----------------
+
+def _conditions(filter_name: str, filter_type: str, filter_location: str,
+                filter_3d: str, skip: Optional[str] = None) -> Tuple[List[str], list]:
+    conds: List[str] = []
+    params: list = []
+    text = (filter_name or "").strip()
+    if len(text) >= 3:
+        conds.append("s.row_id IN (SELECT rowid FROM item_search WHERE item_search MATCH ?)")
+        params.append('"' + text.replace('"', '""') + '"')
+    elif text:
+        # Trigrams need 3 characters; 1–2 is a scan of the (small) rows table
+        conds.append("(" + " OR ".join(f"s.{c} LIKE ?" for c in _FTS_COLUMNS) + ")")
+        params.extend([f"%{text}%"] * len(_FTS_COLUMNS))
+    if skip != "type" and filter_type != "All":
+        conds.append("s.item_type = ?")
+        params.append(filter_type)
+    if skip != "location" and filter_location != "All":
+        conds.append("s.location = ?")
+        params.append(filter_location)
+    if skip != "3d" and filter_3d in ("Yes", "No"):
+        conds.append("s.has_3d = ?")
+        params.append(1 if filter_3d == "Yes" else 0)
+    return conds, params
+
+
+def facet_counts(conn: sqlite3.Connection, filter_name: str = "", filter_type: str = "All",
+                 filter_location: str = "All", filter_3d: str = "All") -> Dict:
+    """Counts for each dropdown option, given the search text and the
+    other dropdowns' selections: item_types / locations as sorted
+    (value, count) lists with type_total / loc_total, and has_3d / no_3d /
+    d3_total."""
+    if (filter_name or "").strip():
+        conds, params = _conditions(filter_name, "All", "All", "All")
+        cells = conn.execute(
+            f"SELECT item_type, location, has_3d, COUNT(*) FROM item_search_rows s "
+            f"WHERE {' AND '.join(conds)} GROUP BY 1, 2, 3",
+            params,
+        ).fetchall()
+    else:
+        cells = conn.execute("SELECT item_type, location, has_3d, n FROM item_facets").fetchall()
+
+    want_3d = {"Yes": 1, "No": 0}.get(filter_3d)
+
+    def keep(cell, skip: str) -> bool:
+        item_type, location, has_3d, _ = cell
+        return ((skip == "type" or filter_type == "All" or item_type == filter_type)
+                and (skip == "location" or filter_location == "All" or location == filter_location)
+                and (skip == "3d" or want_3d is None or has_3d == want_3d))
+
+    types: Counter = Counter()
+    locations: Counter = Counter()
+    d3_total = has_3d_count = 0
+    for cell in cells:
+        item_type, location, has_3d, n = cell
+        if item_type and keep(cell, "type"):
+            types[item_type] += n
+        if location and keep(cell, "location"):
+            locations[location] += n
+        if keep(cell, "3d"):
+            d3_total += n
+            if has_3d:
+                has_3d_count += n
+
+    return {
+        "item_types": sorted(types.items()),
+        "type_total": sum(types.values()),
+        "locations": sorted(locations.items()),
+        "loc_total": sum(locations.values()),
+        "has_3d": has_3d_count,
+        "no_3d": d3_total - has_3d_count,
+        "d3_total": d3_total,
+    }
+
+
+def page_of_items(conn: sqlite3.Connection, filter_name: str = "", filter_type: str = "All",
+                  filter_location: str = "All", filter_3d: str = "All", page: int = 1,
+                  page_size: Optional[int] = None) -> Tuple[Dict[str, List[sqlite3.Row]], bool]:
+    """One page of item groups ({Item_Name: [Item_Report rows]}, in name
+    order, warehouse stock first within a group) and whether more follow.
+    `conn` should have row_factory = sqlite3.Row."""
+    page_size = page_size or PAGE_SIZE
+    conds, params = _conditions(filter_name, filter_type, filter_location, filter_3d)
+    where = " AND ".join(conds) or "1"
+    names = [r[0] for r in conn.execute(
+        f"SELECT DISTINCT s.name FROM item_search_rows s WHERE {where} "
+        f"ORDER BY s.name LIMIT ? OFFSET ?",
+        params + [page_size + 1, (max(1, page) - 1) * page_size],
+    )]
+    has_more = len(names) > page_size
+    names = names[:page_size]
+    grouped: Dict[str, List[sqlite3.Row]] = {name: [] for name in names}
+    if not names:
+        return grouped, False
+    rows = conn.execute(
+        f"""
+        SELECT r.* FROM item_search_rows s
+        JOIN Item_Report r ON r.ID = s.item_id
+        WHERE {where} AND s.name IN ({', '.join('?' for _ in names)})
+        ORDER BY s.name,
+                 CASE WHEN s.location LIKE ? THEN 0 ELSE 1 END,
+                 r.Current_Location,
+                 r.Barcode
+        """,
+        params + names + [f"%{WAREHOUSE}%"],
+    ).fetchall()
+    for row in rows:
+        grouped[row["Item_Name"]].append(row)
+    return grouped, has_more
@@ -0,0 +1,260 @@
+"""
+Lease-based job queue in SQLite.
+
+One `jobs` table holds every queue, told apart by name:
+
+    job_queue.ensure_schema(conn)
+    q = JobQueue("toky", lease_seconds=600, max_attempts=4)
+    q.enqueue(conn, key=callid, payload={...})     # idempotent on key
+    job = q.claim(conn, worker="main-1")            # or None
+    q.heartbeat(conn, job)                          # extend the lease
+    q.complete(conn, job)                           # or q.fail(conn, job, err)
+
+Semantics:
+- claim() is one `UPDATE … WHERE id = (SELECT … LIMIT 1) RETURNING`, so
+  two workers can never lease the same job. It takes the oldest job that
+  is 'pending' and due, or 'leased' with an expired lease (its worker died
+  or stopped heartbeating — that counts as an attempt, so a job that keeps
+  killing its worker still ends up dead).
+- A lease is valid for lease_seconds. Long jobs call heartbeat()
+  periodically; heartbeat(), complete() and fail() only act while the
+  caller still holds the lease (same lease token), so a worker whose lease
+  lapsed and was re-issued can't clobber the new holder.
+- fail() reschedules with exponential backoff (backoff_base × 2^(attempt-1),
+  capped at backoff_cap, ±20% jitter) until max_attempts, then parks the
+  job as 'dead'. retry_dead() puts dead jobs back.
+- on_dead(conn, key, payload, error), if given, runs whenever a job goes
+  dead — from fail() or from claim() sweeping an expired lease — inside
+  the same transaction, so the caller can settle its own rows (it must
+  not commit).
+- enqueue() on a key that already exists: a done / dead job is revived as
+  pending; a leased one is flagged to run once more after it completes (the
+  payload changed while it ran); a pending one is left alone.
+
+The claim query is answered from idx_jobs_claim alone (queue, status,
+run_after, id). Callers own the connection and the transaction: every
+method commits, so pass a connection that isn't mid-transaction. SQLite
+≥ 3.35 (RETURNING).
+"""
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        queue TEXT NOT NULL,
+        key TEXT NOT NULL,
+        payload TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_after REAL NOT NULL DEFAULT 0,
+        lease_token TEXT,
+        leased_by TEXT,
+        lease_expires REAL,
+        rerun INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (queue, key)
+    )
+"""
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(queue, status, run_after, id)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(queue, status, lease_expires) "
+    "WHERE status = 'leased'",
+)
+
+
+@dataclass
+class Job:
+    id: int
+    queue: str
+    key: str
+    payload: Any
+    attempts: int
+    lease_token: str
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(SCHEMA)
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.commit()
+
+
+class JobQueue:
+    def __init__(self, name: str, lease_seconds: int = 300, max_attempts: int = 5,
+                 backoff_base: float = 30.0, backoff_cap: float = 3600.0,
+                 on_dead: Optional[Callable[[sqlite3.Connection, str, Any, str], None]] = None,
+                 ) -> None:
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.on_dead = on_dead
+
+    def enqueue(self, conn: sqlite3.Connection, key: str, payload: Any = None,
+                delay: float = 0.0) -> None:
+        conn.execute(
+            """
+            INSERT INTO jobs (queue, key, payload, run_after)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (queue, key) DO UPDATE SET
+                payload = excluded.payload,
+                status = CASE WHEN status IN ('done', 'dead') THEN 'pending' ELSE status END,
+                attempts = CASE WHEN status IN ('done', 'dead') THEN 0 ELSE attempts END,
+                run_after = CASE WHEN status IN ('done', 'dead') THEN excluded.run_after
+                                 ELSE run_after END,
+                rerun = CASE WHEN status = 'leased' THEN 1 ELSE rerun END,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (self.name, key, json.dumps(payload), time.time() + delay),
+        )
+        conn.commit()
+
+    def claim(self, conn: sqlite3.Connection, worker: str = "") -> Optional[Job]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        # Expired leases first go back to pending, so the claim itself is a
+        # plain index range scan.
+        swept = conn.execute(
+            """
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END,
+                   lease_token = NULL, lease_expires = NULL, last_error = 'lease expired',
+                   updated_at = CURRENT_TIMESTAMP
+            WHERE queue = ? AND status = 'leased' AND lease_expires <= ?
+            RETURNING key, payload, status
+            """,
+            (self.max_attempts, self.name, now),
+        ).fetchall()
+        if self.on_dead is not None:
+            for key, payload, status in swept:
+                if status == "dead":
+                    self.on_dead(conn, key, json.loads(payload) if payload else None,
+                                 "lease expired")
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'leased', attempts = attempts + 1,
+                   lease_token = ?, leased_by = ?, lease_expires = ?, rerun = 0,
+                   updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE queue = ? AND status = 'pending' AND run_after <= ?
+                ORDER BY run_after, id
+                LIMIT 1
+            )
+            RETURNING id, key, payload, attempts
+            """,
+            (token, worker or f"pid-{os.getpid()}", now + self.lease_seconds, self.name, now),
+        ).fetchone()
+        conn.commit()
+        if row is None:
+            return None
+        return Job(id=row[0], queue=self.name, key=row[1],
+                   payload=json.loads(row[2]) if row[2] else None,
+                   attempts=row[3], lease_token=token)
+
+    def claim_key(self, conn: sqlite3.Connection, key: str, worker: str = "") -> Optional[Job]:
+        """Lease one specific job if it's pending (due or not) — for scripts
+        that process an item inline and must keep the worker off it."""
+        token = uuid.uuid4().hex
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'leased', attempts = attempts + 1,
+                   lease_token = ?, leased_by = ?, lease_expires = ?, rerun = 0,
+                   updated_at = CURRENT_TIMESTAMP
+            WHERE queue = ? AND key = ? AND status = 'pending'
+            RETURNING id, key, payload, attempts
+            """,
+            (token, worker or f"pid-{os.getpid()}", time.time() + self.lease_seconds,
+             self.name, key),
+        ).fetchone()
+        conn.commit()
+        if row is None:
+            return None
+        return Job(id=row[0], queue=self.name, key=row[1],
+                   payload=json.loads(row[2]) if row[2] else None,
+                   attempts=row[3], lease_token=token)
+
+    def heartbeat(self, conn: sqlite3.Connection, job: Job) -> bool:
+        """Extend the lease. False if it was lost (expired and re-claimed)."""
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ?",
+            (time.time() + self.lease_seconds, job.id, job.lease_token),
+        )
+        conn.commit()
+        return cur.rowcount == 1
+
+    def complete(self, conn: sqlite3.Connection, job: Job) -> bool:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET
+                status = CASE WHEN rerun THEN 'pending' ELSE 'done' END,
+                attempts = CASE WHEN rerun THEN 0 ELSE attempts END,
+                run_after = 0, rerun = 0, lease_token = NULL, lease_expires = NULL,
+                last_error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_token = ?
+            """,
+            (job.id, job.lease_token),
+        )
+        conn.commit()
+        return cur.rowcount == 1
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def fail(self, conn: sqlite3.Connection, job: Job, error: str) -> str:
+        """Record a failed attempt. Returns the job's new status: 'pending'
+        (retry scheduled), 'dead', or 'lost' if the lease had lapsed."""
+        status = "dead" if job.attempts >= self.max_attempts else "pending"
+        run_after = 0 if status == "dead" else time.time() + self.backoff(job.attempts)
+        cur = conn.execute(
+            """
+            UPDATE jobs SET status = ?, run_after = ?, lease_token = NULL,
+                   lease_expires = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_token = ?
+            """,
+            (status, run_after, (error or "")[:1000], job.id, job.lease_token),
+        )
+        if cur.rowcount != 1:
+            conn.commit()
+            return "lost"
+        if status == "dead" and self.on_dead is not None:
+            self.on_dead(conn, job.key, job.payload, error or "")
+        conn.commit()
+        return status
+
+    def retry_dead(self, conn: sqlite3.Connection) -> int:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, run_after = 0, "
+            "updated_at = CURRENT_TIMESTAMP WHERE queue = ? AND status = 'dead'",
+            (self.name,),
+        )
+        conn.commit()
+        return cur.rowcount
+
+    def counts(self, conn: sqlite3.Connection) -> dict:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status",
+            (self.name,),
+        ).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "dead": 0}
+        counts.update({status: n for status, n in rows})
+        return counts
+
+    def purge_done(self, conn: sqlite3.Connection, days: int = 7) -> int:
+        cur = conn.execute(
+            "DELETE FROM jobs WHERE queue = ? AND status = 'done' "
+            "AND updated_at < datetime('now', ?)",
+            (self.name, f"-{days} days"),
+        )
+        conn.commit()
+        return cur.rowcount
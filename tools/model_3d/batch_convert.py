@@ -6,6 +6,14 @@ Usage:
     python3 -m tools.model_3d.batch_convert --item-name "Accent Chair 01052"
     python3 -m tools.model_3d.batch_convert --item-type "Accent Chair" --limit 5
     python3 -m tools.model_3d.batch_convert --item-type "Accent Chair" --dry-run
+    python3 -m tools.model_3d.batch_convert --retry-dead
+
+--item-type runs go through the shared job queue (tools/job_queue.py,
+queue 'model_3d'): each Item_Name is a job, leased while it converts (with
+heartbeats — a Tripo3D task takes minutes), so two runs never convert the
+same item and a killed run's items are picked up by the next one. Failed
+items are retried with backoff by later runs, up to MODEL_QUEUE's
+max_attempts; after that they're 'dead' until --retry-dead.
 """
 
 import asyncio
@@ -14,6 +22,7 @@ import os
 import sys
 import json
 import uuid
+import sqlite3
 import httpx
 import aiosqlite
 from pathlib import Path
@@ -38,6 +47,24 @@ THUMBNAIL_DIR = MODEL_DIR / "thumbnails"
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
 
+from tools.job_queue import JobQueue, ensure_schema as ensure_job_schema
+
+MODEL_QUEUE = JobQueue("model_3d", lease_seconds=600, max_attempts=3, backoff_base=600.0)
+HEARTBEAT_SECONDS = 120
+
+
+def _with_jobs(fn, *args):
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        ensure_job_schema(conn)
+        return fn(conn, *args)
+    finally:
+        conn.close()
+
+
+async def _jobs(fn, *args):
+    return await asyncio.to_thread(_with_jobs, fn, *args)
+
 
 class BatchConverter:
     """Handles batch conversion of items to 3D models"""
@@ -463,20 +490,54 @@ class BatchConverter:
 
         print(f"Found {len(items)} unique item(s) to convert")
 
-        if not items:
-            print("No items to convert")
+        if self.dry_run:
+            for i, item in enumerate(items, 1):
+                print(f"\n[{i}/{len(items)}] ", end="")
+                await self.convert_single_item(item['Item_Name'])
             return self.stats
 
-        for i, item in enumerate(items, 1):
-            print(f"\n[{i}/{len(items)}] ", end="")
-            await self.convert_single_item(item['Item_Name'])
+        def enqueue_all(conn):
+            for item in items:
+                MODEL_QUEUE.enqueue(conn, item['Item_Name'], {"item_type": item['Item_Type']})
+
+        await _jobs(enqueue_all)
+        await self.drain_queue()
+        return self.stats
 
+    async def drain_queue(self) -> None:
+        """Convert every due job in MODEL_QUEUE: this run's items plus
+        earlier failures whose backoff has passed."""
+        worker = f"batch_convert-{os.getpid()}"
+        first = True
+        while True:
+            job = await _jobs(MODEL_QUEUE.claim, worker)
+            if job is None:
+                break
             # Rate limit: wait between conversions
-            if i < len(items) and not self.dry_run:
+            if not first:
                 print("  Waiting 2s before next conversion...")
                 await asyncio.sleep(2)
+            first = False
 
-        return self.stats
+            counts = await _jobs(MODEL_QUEUE.counts)
+            print(f"\n[attempt {job.attempts}, {counts['pending']} more queued] ", end="")
+            heartbeat = asyncio.create_task(self._keep_leased(job))
+            try:
+                ok = await self.convert_single_item(job.key)
+            finally:
+                heartbeat.cancel()
+            if ok:
+                await _jobs(MODEL_QUEUE.complete, job)
+            else:
+                outcome = await _jobs(MODEL_QUEUE.fail, job, "conversion failed")
+                print(f"  Queue: {outcome}" + (" (use --retry-dead to requeue)" if outcome == "dead" else ""))
+
+    async def _keep_leased(self, job) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            if not await _jobs(MODEL_QUEUE.heartbeat, job):
+                print(f"\n  WARNING: lease on {job.key} lost")
+                return
 
     def print_summary(self):
         """Print conversion summary"""
@@ -497,10 +558,15 @@ async def main():
     parser.add_argument('--limit', type=int, help='Limit number of items to convert')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be converted without doing it')
     parser.add_argument('--list-types', action='store_true', help='List all item types and counts')
+    parser.add_argument('--retry-dead', action='store_true', help='Requeue items that ran out of attempts, then convert them')
 
     args = parser.parse_args()
 
     # Check for API key
+    if args.retry_dead:
+        requeued = await _jobs(MODEL_QUEUE.retry_dead)
+        print(f"Requeued {requeued} dead item(s)")
+
     if not os.getenv('TRIPO_API_KEY') and not args.dry_run and not args.list_types:
         print("ERROR: TRIPO_API_KEY environment variable not set")
         print("Get your API key at: https://platform.tripo3d.ai/api-keys")
@@ -545,6 +611,8 @@ async def main():
         await converter.convert_single_item(args.item_name)
     elif args.item_type:
         await converter.convert_by_type(args.item_type, limit=args.limit)
+    elif args.retry_dead:
+        await converter.drain_queue()
     else:
         print("Please specify --item-name or --item-type")
         print("Use --list-types to see available item types")
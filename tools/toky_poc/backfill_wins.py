@@ -57,17 +57,20 @@ def process_one_sync(cdr: dict) -> dict:
     conn.execute("PRAGMA busy_timeout = 30000")
     try:
         toky_service.insert_cdr(conn, cdr)
-        # Claim it (so parallel scripts + the live worker don't collide)
-        conn.execute(
-            "UPDATE toky_calls SET status='processing' WHERE callid=? AND status='pending'",
-            (cdr["callid"],),
-        )
+        # Lease its job (so parallel scripts + the live worker don't collide)
+        job = toky_service.CALL_QUEUE.claim_key(conn, cdr["callid"], worker="backfill_wins")
+        if job is None:
+            return {"callid": cdr["callid"], "error": "already processed or in progress"}
+        conn.execute("UPDATE toky_calls SET status='processing' WHERE callid=?", (cdr["callid"],))
         conn.commit()
         try:
-            return toky_service.process_call(conn, cdr)
+            summary = toky_service.process_call(conn, cdr)
         except Exception as e:
-            toky_service.mark_done(conn, cdr["callid"], status="error", error=str(e)[:500])
+            # Left for the live worker to retry, or 'error' once out of attempts
+            toky_service.fail_call(conn, job, str(e))
             return {"callid": cdr["callid"], "error": str(e)[:100]}
+        toky_service.finish_call(conn, job)
+        return summary
     finally:
         conn.close()
 
@@ -19,6 +19,8 @@ load_dotenv(ROOT / ".env")
 import httpx
 import uuid
 
+from as_webapp.as_portal_api import call_analytics, toky_service
+
 OUT = ROOT / "tools" / "toky_poc" / "out"
 DB = ROOT / "data" / "zoho_sync.db"
 TOKY_KEY = (ROOT / ".env").read_text().split("TOKY_API_KEY=")[1].split("\n")[0].strip()
@@ -116,6 +118,11 @@ def main() -> int:
                 conn.execute(
                     "UPDATE toky_calls SET status='done' WHERE callid = ?", (callid,)
                 )
+                # Retire its queued job so the worker doesn't re-run the
+                # call and overwrite the imported extract
+                job = toky_service.CALL_QUEUE.claim_key(conn, callid, worker="import_backfill")
+                if job is not None:
+                    toky_service.finish_call(conn, job)
                 updated_calls += 1
 
         # toky_extracts
@@ -201,6 +208,10 @@ def main() -> int:
                 inserted_drafts += 1
 
     conn.commit()
+    # Rows went in directly rather than through toky_service.save_extraction,
+    # so the /analytics aggregates are recounted from scratch.
+    call_analytics.ensure_tables(conn)
+    analysed = call_analytics.rebuild(conn)
     conn.close()
 
     print(f"  inserted toky_calls:      {inserted_calls} (updated: {updated_calls})")
@@ -208,6 +219,7 @@ def main() -> int:
     print(f"  inserted toky_transcripts: {inserted_transcripts}")
     print(f"  inserted toky_cs_tasks:   {inserted_cs}")
     print(f"  inserted toky_staging_drafts: {inserted_drafts}")
+    print(f"  analytics rebuilt over:   {analysed} calls")
     return 0
 
 
@@ -23,6 +23,10 @@ class Settings(BaseSettings):
 
     # Sync Configuration
     sync_interval_minutes: int = int(os.getenv("SYNC_INTERVAL_MINUTES", "30"))
+    # Max report pages fetched in parallel by ZohoCreatorAPI.iter_report_pages
+    zoho_page_concurrency: int = int(os.getenv("ZOHO_PAGE_CONCURRENCY", "4"))
+    # Stop paginating once today's local API call count reaches this (0 = no cap)
+    zoho_daily_call_budget: int = int(os.getenv("ZOHO_DAILY_CALL_BUDGET", "0"))
     timezone: str = os.getenv("TIMEZONE", "America/Toronto")
 
     # Server Configuration
@@ -61,6 +65,11 @@ SYNC_SCHEDULE = {
     "Staging_Report": {
         "interval_minutes": 60,
         "exclude_column_patterns": [],
+        # MM/DD/YYYY text columns that get an indexed ISO (YYYY-MM-DD)
+        # generated column, _<field>_iso, for date-range queries.
+        "iso_date_columns": [
+            "Staging_Date", "Destaging_Date", "Coming_Staging_Destaging_Date",
+        ],
     },
     "All_Modules": {
         "interval_minutes": 60,
@@ -117,6 +126,11 @@ def columns_excluded_for(report_name: str) -> list[str]:
     return [p.lower() for p in (list(GLOBAL_EXCLUDE_COLUMN_PATTERNS) + list(per_report))]
 
 
+def iso_date_columns_for(report_name: str) -> list[str]:
+    """Return the MM/DD/YYYY columns that get an indexed _<field>_iso generated column."""
+    return list((SYNC_SCHEDULE.get(report_name) or {}).get("iso_date_columns", []))
+
+
 def strip_excluded_columns(records: list, report_name: str) -> list:
     """Remove columns whose names contain any excluded substring pattern."""
     patterns = columns_excluded_for(report_name)
@@ -3,17 +3,43 @@ import asyncio
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any
-from .config import settings
+from .config import settings, iso_date_columns_for, SYNC_SCHEDULE
 from .utils import get_toronto_now_iso
 import logging
 import json
+import sqlite3
 
 logger = logging.getLogger(__name__)
 
+# Only used to render floats exactly as a TEXT column stores them
+_SQLITE_TEXT = sqlite3.connect(":memory:", check_same_thread=False)
+
+# Rows per executemany() call in upsert_records.
+UPSERT_CHUNK_SIZE = 500
+
+
+def iso_date_column(field_name: str) -> str:
+    """Name of the generated ISO date column for a MM/DD/YYYY field."""
+    return f"_{field_name}_iso"
+
+
+def iso_date_expr(field_name: str) -> str:
+    """SQL for MM/DD/YYYY -> YYYY-MM-DD; NULL for empty or malformed values."""
+    return (
+        f"CASE WHEN {field_name} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]' "
+        f"THEN substr({field_name}, 7, 4) || '-' || substr({field_name}, 1, 2) "
+        f"|| '-' || substr({field_name}, 4, 2) END"
+    )
+
+
 class Database:
     def __init__(self, db_path: Path = settings.database_path):
         self.db_path = db_path
         self._connection: Optional[aiosqlite.Connection] = None
+        # table name -> set of column names, valid while PRAGMA schema_version
+        # still equals _schema_version
+        self._column_cache: Dict[str, set] = {}
+        self._schema_version: Optional[int] = None
         # Create directories if they don't exist
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -21,7 +47,10 @@ class Database:
         """Establish database connection"""
         self._connection = await aiosqlite.connect(self.db_path)
         self._connection.row_factory = aiosqlite.Row
+        self._column_cache.clear()
         await self.init_core_tables()
+        for report_name in SYNC_SCHEDULE:
+            await self.ensure_iso_date_columns(report_name)
 
     async def disconnect(self):
         """Close database connection"""
@@ -120,6 +149,8 @@ class Database:
 
             await self._connection.commit()
 
+        self._column_cache.pop(safe_table_name, None)
+        await self.ensure_iso_date_columns(safe_table_name)
         logger.info(f"Created table {safe_table_name} with {len(fields)} fields")
 
     async def table_exists(self, table_name: str) -> bool:
@@ -132,29 +163,81 @@ class Database:
             result = await cursor.fetchone()
             return result is not None
 
+    async def _read_schema_version(self) -> Optional[int]:
+        async with self._connection.execute("PRAGMA schema_version") as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def _check_schema_version(self):
+        """Drop the column cache if anything (another connection, a manual
+        ALTER, a DROP) changed the schema since it was filled."""
+        version = await self._read_schema_version()
+        if version != self._schema_version:
+            self._column_cache.clear()
+            self._schema_version = version
+
+    async def get_table_columns(self, table_name: str) -> set:
+        """Column names of a table, served from the per-table cache."""
+        safe_table_name = self._sanitize_name(table_name)
+        columns = self._column_cache.get(safe_table_name)
+        if columns is None:
+            async with self._connection.execute(f"PRAGMA table_info({safe_table_name})") as cursor:
+                columns = {col[1] for col in await cursor.fetchall()}
+            self._column_cache[safe_table_name] = columns
+        return columns
+
     async def add_column_if_not_exists(self, table_name: str, column_name: str, column_type: str = "TEXT"):
         """Add a column to a table if it doesn't exist"""
         safe_table_name = self._sanitize_name(table_name)
         safe_column_name = self._sanitize_name(column_name)
 
-        # Check if column exists
-        query = f"PRAGMA table_info({safe_table_name})"
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(query)
-            columns = await cursor.fetchall()
-            existing_columns = [col[1] for col in columns]
-
-            if safe_column_name not in existing_columns:
-                alter_query = f"ALTER TABLE {safe_table_name} ADD COLUMN {safe_column_name} {column_type}"
+        existing_columns = await self.get_table_columns(safe_table_name)
+        if safe_column_name not in existing_columns:
+            alter_query = f"ALTER TABLE {safe_table_name} ADD COLUMN {safe_column_name} {column_type}"
+            async with self._connection.cursor() as cursor:
                 await cursor.execute(alter_query)
                 await self._connection.commit()
-                logger.info(f"Added column {safe_column_name} to table {safe_table_name}")
-
-    async def upsert_record(self, table_name: str, record: Dict[str, Any]) -> bool:
-        """Upsert a single record. Returns True if successful, False if skipped."""
+            existing_columns.add(safe_column_name)
+            # Our own ALTER bumped schema_version; the cache is already current.
+            self._schema_version = await self._read_schema_version()
+            logger.info(f"Added column {safe_column_name} to table {safe_table_name}")
+            if safe_column_name in iso_date_columns_for(safe_table_name):
+                await self.ensure_iso_date_columns(safe_table_name)
+
+    async def ensure_iso_date_columns(self, table_name: str):
+        """Add the VIRTUAL generated _<field>_iso columns configured for this
+        report (see iso_date_columns_for) and index them, so date-range
+        filters and ordering on MM/DD/YYYY text use an index instead of
+        scanning. Generated columns are hidden from PRAGMA table_info, so the
+        column cache and upserts never see them. Idempotent."""
         safe_table_name = self._sanitize_name(table_name)
+        fields = iso_date_columns_for(safe_table_name)
+        if not fields or not await self.table_exists(safe_table_name):
+            return
 
-        # Clean record keys and convert complex types to JSON
+        async with self._connection.execute(f"PRAGMA table_xinfo({safe_table_name})") as cursor:
+            existing = {col[1] for col in await cursor.fetchall()}
+        async with self._connection.cursor() as cursor:
+            for field in fields:
+                if field not in existing:
+                    continue
+                iso_column = iso_date_column(field)
+                if iso_column not in existing:
+                    await cursor.execute(
+                        f"ALTER TABLE {safe_table_name} ADD COLUMN {iso_column} TEXT "
+                        f"GENERATED ALWAYS AS ({iso_date_expr(field)}) VIRTUAL"
+                    )
+                    logger.info(f"Added generated column {iso_column} to table {safe_table_name}")
+                await cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{safe_table_name}{iso_column} "
+                    f"ON {safe_table_name} ({iso_column})"
+                )
+            await self._connection.commit()
+        # Hidden columns don't change the cached table_info column sets.
+        self._schema_version = await self._read_schema_version()
+
+    def _clean_record(self, record: Dict[str, Any], synced_at: Optional[str] = None) -> Dict[str, Any]:
+        """Sanitize keys, JSON-encode dicts/lists and add the system fields."""
         clean_record = {}
         for key, value in record.items():
             safe_key = self._sanitize_name(key)
@@ -167,7 +250,78 @@ class Database:
         # Add system fields
         if "Modified_Time" in clean_record:
             clean_record["_modified_time"] = clean_record["Modified_Time"]
-        clean_record["_synced_at"] = get_toronto_now_iso()
+        clean_record["_synced_at"] = synced_at or get_toronto_now_iso()
+        return clean_record
+
+    @staticmethod
+    def _changed_fields(clean_record: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+        """Zoho fields whose incoming value differs from the stored row.
+        Columns are TEXT, so incoming values are compared as the text SQLite
+        would store them: bools bind as 1/0, floats go through SQLite's own
+        REAL-to-TEXT conversion (e.g. 1e20 is stored as '1.0e+20')."""
+        def norm(value):
+            if value is None:
+                return None
+            if isinstance(value, bool):
+                value = int(value)
+            elif isinstance(value, float):
+                return _SQLITE_TEXT.execute("SELECT CAST(? AS TEXT)", (value,)).fetchone()[0]
+            return str(value)
+        return sorted(
+            key for key, value in clean_record.items()
+            if not key.startswith("_") and norm(value) != norm(current.get(key))
+        )
+
+    async def _classify_records(self, safe_table_name: str,
+                                cleaned: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Split cleaned records into rows to write and rows identical to
+        the stored row.
+
+        Always compared against the row as it is now, not against what the
+        last sync wrote: local writers (staging board, portal, item
+        management, 3D batch, page sync) update these rows directly, and a
+        Zoho write that failed leaves the local row diverged until the next
+        sync puts Zoho's values back."""
+        to_write, unchanged = [], 0
+        changes: Dict[str, List[str]] = {}
+        current = await self.get_records_by_ids(safe_table_name, [rec["ID"] for rec in cleaned])
+        for rec in cleaned:
+            record_id = str(rec["ID"])
+            existing = current.get(record_id)
+            if existing is None:
+                fields = sorted(key for key in rec if not key.startswith("_"))
+            else:
+                fields = self._changed_fields(rec, existing)
+            if fields:
+                to_write.append(rec)
+                changes[record_id] = fields
+            else:
+                unchanged += 1
+
+        return {
+            "to_write": to_write,
+            "unchanged": unchanged,
+            "changes": changes,
+            "inserted": sum(1 for rec in to_write if str(rec["ID"]) not in current),
+        }
+
+    @staticmethod
+    def _upsert_sql(safe_table_name: str, columns: tuple) -> str:
+        placeholders = ["?" for _ in columns]
+        update_pairs = [f"{col} = excluded.{col}" for col in columns if col != "ID"]
+        return f"""
+            INSERT INTO {safe_table_name} ({', '.join(columns)})
+            VALUES ({', '.join(placeholders)})
+            ON CONFLICT(ID) DO UPDATE SET
+            {', '.join(update_pairs)}
+        """
+
+    async def upsert_record(self, table_name: str, record: Dict[str, Any]) -> bool:
+        """Upsert a single record. Returns True if successful, False if skipped."""
+        safe_table_name = self._sanitize_name(table_name)
+
+        # Clean record keys and convert complex types to JSON
+        clean_record = self._clean_record(record)
 
         # Ensure ID field exists
         if "ID" not in clean_record:
@@ -189,21 +343,12 @@ class Database:
             return False
 
         # Add missing columns to table
+        await self._check_schema_version()
         for column_name in clean_record.keys():
             await self.add_column_if_not_exists(safe_table_name, column_name)
 
-        # Build upsert query
-        columns = list(clean_record.keys())
-        placeholders = ["?" for _ in columns]
-        update_pairs = [f"{col} = excluded.{col}" for col in columns if col != "ID"]
-
-        query = f"""
-            INSERT INTO {safe_table_name} ({', '.join(columns)})
-            VALUES ({', '.join(placeholders)})
-            ON CONFLICT(ID) DO UPDATE SET
-            {', '.join(update_pairs)}
-        """
-
+        columns = tuple(clean_record.keys())
+        query = self._upsert_sql(safe_table_name, columns)
         values = [clean_record[col] for col in columns]
 
         try:
@@ -214,88 +359,109 @@ class Database:
             logger.error(f"Failed to upsert record {clean_record.get('ID', 'Unknown')}: {e}")
             return False
 
-    async def upsert_records(self, table_name: str, records: List[Dict[str, Any]]) -> Dict[str, int]:
-        """Upsert multiple records in a transaction. Returns counts of successful and skipped records."""
+    async def upsert_records(self, table_name: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Upsert multiple records in a transaction. Returns counts of successful and skipped records.
+
+        Records identical to the stored row are not rewritten (no _synced_at bump, no WAL churn); they count as
+        successful and are reported in "unchanged". "changes" maps each
+        written record ID to the fields that changed (all fields for a new
+        row), "inserted" counts the new rows.
+
+        Runs one schema-evolution pass for the whole batch (against the cached
+        column set), then groups records by column signature so each group
+        shares one INSERT ... ON CONFLICT statement, executed with
+        executemany() in chunks of UPSERT_CHUNK_SIZE. A chunk that fails is
+        retried row by row so one bad record only skips itself."""
+        safe_table_name = self._sanitize_name(table_name)
         successful = 0
         skipped = 0
         skipped_records = []  # Collect skipped records to log after transaction
 
+        # Clean the records
+        cleaned: List[Dict[str, Any]] = []
+        synced_at = get_toronto_now_iso()
+        for record in records:
+            # Check for ID field before processing
+            if "ID" not in record:
+                skipped += 1
+                # Collect info for logging after transaction
+                skipped_records.append({
+                    'Item_Name': record.get('Item_Name', 'Unknown'),
+                    'Item_Barcode': record.get('Item_Barcode', 'Unknown'),
+                    'record_keys': list(record.keys())[:5]
+                })
+                continue
+            cleaned.append(self._clean_record(record, synced_at))
+
+        # One schema-evolution pass for the whole batch
+        await self._check_schema_version()
+        batch_columns: Dict[str, None] = {}
+        for clean_record in cleaned:
+            batch_columns.update(dict.fromkeys(clean_record))
+        for column_name in batch_columns:
+            await self.add_column_if_not_exists(safe_table_name, column_name)
+
+        # Drop rows that have not changed since the last sync
+        classified = await self._classify_records(safe_table_name, cleaned)
+        successful += classified["unchanged"]
+
+        # Group the remaining records by column signature
+        groups: Dict[tuple, List[tuple]] = {}
+        for clean_record in classified["to_write"]:
+            columns = tuple(clean_record.keys())
+            groups.setdefault(columns, []).append([clean_record[col] for col in columns])
+
+        changes = classified["changes"]
         async with self._connection.cursor() as cursor:
             await cursor.execute("BEGIN TRANSACTION")
 
             try:
-                for record in records:
-                    # Check for ID field before processing
-                    if "ID" not in record:
-                        skipped += 1
-                        # Collect info for logging after transaction
-                        skipped_records.append({
-                            'Item_Name': record.get('Item_Name', 'Unknown'),
-                            'Item_Barcode': record.get('Item_Barcode', 'Unknown'),
-                            'record_keys': list(record.keys())[:5]
-                        })
-                        continue
-
-                    # Process record with ID
-                    try:
-                        # Clean and prepare record
-                        clean_record = {}
-                        for key, value in record.items():
-                            safe_key = self._sanitize_name(key)
-                            if isinstance(value, (dict, list)):
-                                clean_record[safe_key] = json.dumps(value)
-                            else:
-                                clean_record[safe_key] = value
-
-                        # Add system fields
-                        if "Modified_Time" in clean_record:
-                            clean_record["_modified_time"] = clean_record["Modified_Time"]
-                        clean_record["_synced_at"] = get_toronto_now_iso()
-
-                        # Add missing columns
-                        for column_name in clean_record.keys():
-                            await self.add_column_if_not_exists(table_name, column_name)
-
-                        # Build upsert query
-                        columns = list(clean_record.keys())
-                        placeholders = ["?" for _ in columns]
-                        update_pairs = [f"{col} = excluded.{col}" for col in columns if col != "ID"]
-
-                        query = f"""
-                            INSERT INTO {self._sanitize_name(table_name)} ({', '.join(columns)})
-                            VALUES ({', '.join(placeholders)})
-                            ON CONFLICT(ID) DO UPDATE SET
-                            {', '.join(update_pairs)}
-                        """
-
-                        values = [clean_record[col] for col in columns]
-                        await cursor.execute(query, values)
-                        successful += 1
-
-                    except Exception as e:
-                        logger.error(f"Failed to upsert record {record.get('ID', 'Unknown')}: {e}")
-                        skipped += 1
+                for columns, rows in groups.items():
+                    query = self._upsert_sql(safe_table_name, columns)
+                    id_index = columns.index("ID")
+                    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+                        try:
+                            await cursor.executemany(query, chunk)
+                            successful += len(chunk)
+                        except Exception as e:
+                            logger.warning(f"Bulk upsert chunk failed for {safe_table_name}, retrying row by row: {e}")
+                            for values in chunk:
+                                record_id = str(values[id_index])
+                                try:
+                                    await cursor.execute(query, values)
+                                    successful += 1
+                                except Exception as row_error:
+                                    logger.error(f"Failed to upsert record {record_id}: {row_error}")
+                                    changes.pop(record_id, None)
+                                    skipped += 1
 
                 await cursor.execute("COMMIT")
-
-                # Log skipped records after transaction completes
-                for skipped_info in skipped_records:
-                    logger.warning(f"Record missing ID field: {skipped_info}")
-                    await self.log_sync_issue(
-                        table_name,
-                        "missing_id",
-                        json.dumps(skipped_info),
-                        "Record skipped during sync due to missing ID field"
-                    )
-
-                if skipped > 0:
-                    logger.info(f"Upserted {successful} records, skipped {skipped} records for table {table_name}")
-
-                return {"successful": successful, "skipped": skipped}
             except Exception as e:
                 await cursor.execute("ROLLBACK")
                 raise e
 
+        # Log skipped records after transaction completes
+        for skipped_info in skipped_records:
+            logger.warning(f"Record missing ID field: {skipped_info}")
+            await self.log_sync_issue(
+                table_name,
+                "missing_id",
+                json.dumps(skipped_info),
+                "Record skipped during sync due to missing ID field"
+            )
+
+        if skipped > 0:
+            logger.info(f"Upserted {successful} records, skipped {skipped} records for table {table_name}")
+
+        return {
+            "successful": successful,
+            "skipped": skipped,
+            "unchanged": classified["unchanged"],
+            "inserted": classified["inserted"],
+            "changes": changes,
+        }
+
     async def clear_table(self, table_name: str):
         """Clear all records from a table"""
         safe_table_name = self._sanitize_name(table_name)
@@ -402,6 +568,45 @@ class Database:
         query = f"SELECT * FROM {safe_table_name}"
         return await self.fetchall(query)
 
+    async def get_records_by_ids(self, table_name: str, record_ids: List[str]) -> Dict[str, Dict]:
+        """Existing rows for the given IDs, keyed by ID. Looked up in chunks
+        so a sync page never needs the whole table in memory."""
+        safe_table_name = self._sanitize_name(table_name)
+        ids = [str(rid) for rid in record_ids if rid]
+        if not ids or not await self.table_exists(safe_table_name):
+            return {}
+
+        found: Dict[str, Dict] = {}
+        for start in range(0, len(ids), UPSERT_CHUNK_SIZE):
+            chunk = ids[start:start + UPSERT_CHUNK_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = await self.fetchall(
+                f"SELECT * FROM {safe_table_name} WHERE ID IN ({placeholders})",
+                tuple(chunk),
+            )
+            for row in rows:
+                found[str(row.get("ID", ""))] = row
+        return found
+
+    async def delete_records_not_in(self, table_name: str, keep_ids: set) -> int:
+        """Delete every row whose ID is not in `keep_ids` (end of a full
+        sync: rows Zoho no longer returns). Returns the number deleted."""
+        safe_table_name = self._sanitize_name(table_name)
+        async with self._connection.cursor() as cursor:
+            await cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _sync_keep_ids (ID TEXT PRIMARY KEY)")
+            await cursor.execute("DELETE FROM _sync_keep_ids")
+            await cursor.executemany(
+                "INSERT OR IGNORE INTO _sync_keep_ids (ID) VALUES (?)",
+                [(str(rid),) for rid in keep_ids],
+            )
+            await cursor.execute(
+                f"DELETE FROM {safe_table_name} WHERE ID NOT IN (SELECT ID FROM _sync_keep_ids)"
+            )
+            deleted = cursor.rowcount
+            await cursor.execute("DELETE FROM _sync_keep_ids")
+            await self._connection.commit()
+        return deleted
+
     async def verify_sync_counts(self, table_name: str) -> Dict[str, int]:
         """Verify sync counts and update metadata if needed"""
         safe_table_name = self._sanitize_name(table_name)
@@ -1,6 +1,6 @@
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from .database import db
 from .zoho_api import zoho_api
 from .image_downloader import image_downloader
@@ -43,6 +43,74 @@ class SyncService:
             logger.info(f"Preserved {preserved_count} local Model_3D values during sync")
         return preserved
 
+    # ---- streaming pipeline ------------------------------------------------
+    # Pages flow fetch -> strip_excluded_columns -> existing-row lookup ->
+    # image URL processing -> Model_3D preservation -> upsert, one page at a
+    # time, so peak memory is bounded by page size rather than table size.
+
+    async def _strip_pages(self, pages: AsyncIterator[List[Dict]],
+                           report_name: str) -> AsyncIterator[List[Dict]]:
+        """Strip excluded columns (Table_Row_HTML cache, Employee PII, etc.)"""
+        async for records in pages:
+            yield strip_excluded_columns(records, report_name)
+
+    async def _prepare_records(self, records: List[Dict], report_name: str,
+                               table_name: str) -> Tuple[List[Dict], int]:
+        """Look up the page's existing rows by ID, then rewrite image URLs
+        (preserving good ones) and carry over local Model_3D values."""
+        existing_records = {}
+        try:
+            existing_records = await db.get_records_by_ids(
+                table_name, [r.get('ID') for r in records]
+            )
+        except Exception as e:
+            logger.warning(f"Could not fetch existing records for comparison: {e}")
+
+        records_with_urls, urls_processed = image_url_processor.process_records_for_urls(
+            records,
+            report_name,
+            existing_records  # Pass existing records to preserve good URLs
+        )
+        return self._preserve_model_3d(records_with_urls, existing_records), urls_processed
+
+    async def _prepare_pages(self, pages: AsyncIterator[List[Dict]], report_name: str,
+                             table_name: str) -> AsyncIterator[Tuple[List[Dict], int]]:
+        async for records in pages:
+            yield await self._prepare_records(records, report_name, table_name)
+
+    async def _fetch_pages(self, report_name: str,
+                           criteria: Optional[str] = None) -> AsyncIterator[List[Dict]]:
+        async for _, records in zoho_api.iter_report_pages(report_name, criteria):
+            if records:
+                yield records
+
+    async def _stream_upsert(self, report_name: str, table_name: str,
+                             criteria: Optional[str], seen_ids: Optional[set] = None) -> Dict:
+        """Run the pipeline for one report and upsert page by page."""
+        totals = {"fetched": 0, "successful": 0, "skipped": 0, "unchanged": 0,
+                  "urls_processed": 0, "max_modified": "", "changes": {}}
+
+        async def counted(pages):
+            async for records in pages:
+                totals["fetched"] += len(records)
+                for r in records:
+                    modified = r.get("Modified_Time")
+                    if modified and modified > totals["max_modified"]:
+                        totals["max_modified"] = modified
+                    if seen_ids is not None and r.get("ID"):
+                        seen_ids.add(str(r["ID"]))
+                yield records
+
+        pages = counted(self._strip_pages(self._fetch_pages(report_name, criteria), report_name))
+        async for records_with_urls, urls_processed in self._prepare_pages(pages, report_name, table_name):
+            upsert_result = await db.upsert_records(table_name, records_with_urls)
+            totals["successful"] += upsert_result["successful"]
+            totals["skipped"] += upsert_result["skipped"]
+            totals["unchanged"] += upsert_result["unchanged"]
+            totals["changes"].update(upsert_result["changes"])
+            totals["urls_processed"] += urls_processed
+        return totals
+
     async def sync_report(self, report_name: str, sync_type: str = "daily") -> Dict:
         """Sync a single report from Zoho Creator"""
         start_time = get_toronto_now()
@@ -64,31 +132,28 @@ class SyncService:
                 else:
                     raise Exception(f"Could not fetch metadata for {report_name}")
 
-            # Get total count for verification (especially for full sync)
-            expected_total_count = None
-            if sync_type == "full":
-                logger.info(f"Getting total record count for {report_name}...")
-                expected_total_count = await zoho_api.get_report_total_count(report_name)
-                logger.info(f"Total records in Zoho for {report_name}: {expected_total_count}")
-
-            # Get records based on sync type
+            # Pick the criteria based on sync type
+            criteria = None
             if sync_type == "daily":
-                records = await zoho_api.get_today_modified_records(report_name)
-            elif sync_type == "full":
-                records = await zoho_api.get_all_report_data(report_name)
-            else:
+                criteria = zoho_api.today_modified_criteria()
+            elif sync_type != "full":
                 # For incremental sync, get last sync time
                 sync_meta = await db.get_sync_metadata(table_name)
                 if sync_meta and sync_meta["last_modified_time"]:
                     last_sync = datetime.fromisoformat(sync_meta["last_modified_time"])
-                    records = await zoho_api.get_modified_records_since(
-                        report_name, last_sync, field_name=criteria_field_for(report_name)
+                    criteria = zoho_api.modified_since_criteria(
+                        last_sync, field_name=criteria_field_for(report_name)
                     )
-                else:
-                    # First sync, get all records
-                    records = await zoho_api.get_all_report_data(report_name)
+                # else: first sync, criteria stays None and all records are fetched
 
-            if not records:
+            # A full sync upserts in place and prunes rows Zoho no longer
+            # returns at the end, instead of clearing the table up front —
+            # existing rows stay available for URL / Model_3D preservation
+            # and a failed fetch leaves the table intact.
+            seen_ids = set() if sync_type == "full" else None
+            totals = await self._stream_upsert(report_name, table_name, criteria, seen_ids)
+
+            if totals["fetched"] == 0:
                 logger.info(f"No modified records found for {report_name}")
                 await db.log_sync(sync_type, table_name, "success", 0)
                 return {
@@ -98,63 +163,16 @@ class SyncService:
                     "message": "No records to sync"
                 }
 
-            # Strip excluded columns (Table_Row_HTML cache, Employee PII, etc.)
-            records = strip_excluded_columns(records, report_name)
-
-            # Get existing records for image comparison
-            existing_records = {}
-            try:
-                # Get existing records from database
-                existing_data = await db.get_all_records(table_name)
-                existing_records = {str(r.get('ID', '')): r for r in existing_data}
-            except Exception as e:
-                logger.warning(f"Could not fetch existing records for comparison: {e}")
-
-            # Process image URLs to use Zoho Creator URLs
-            urls_processed = 0
-            logger.info(f"Processing image URLs for {len(records)} records in {report_name}")
-            records_with_urls, urls_processed = image_url_processor.process_records_for_urls(
-                records,
-                report_name,
-                existing_records  # Pass existing records to preserve good URLs
-            )
-
-            # Preserve local Model_3D values
-            records_with_urls = self._preserve_model_3d(records_with_urls, existing_records)
+            if seen_ids is not None:
+                removed = await db.delete_records_not_in(table_name, seen_ids)
+                if removed:
+                    logger.info(f"Removed {removed} {table_name} rows no longer present in Zoho")
 
-            # Verify record count for full sync
-            if sync_type == "full" and expected_total_count:
-                if len(records) != expected_total_count:
-                    logger.warning(f"⚠️  Record count mismatch! Expected {expected_total_count} records from Zoho, but fetched {len(records)}")
-                else:
-                    logger.info(f"✓ Pre-sync verification passed: {len(records)} records match expected count")
-
-            # Save local Model_3D values before clearing for full sync
-            saved_model_3d = {}
-            if sync_type == "full":
-                for rid, rec in existing_records.items():
-                    model_val = rec.get('Model_3D')
-                    if model_val:
-                        saved_model_3d[rid] = model_val
-                if saved_model_3d:
-                    logger.info(f"Saved {len(saved_model_3d)} Model_3D values before full sync clear")
-                await db.clear_table(table_name)
-
-            # Upsert records with Zoho Creator URLs
-            upsert_result = await db.upsert_records(table_name, records_with_urls)
-
-            # Restore Model_3D values after full sync
-            if saved_model_3d:
-                restored = 0
-                for rid, model_val in saved_model_3d.items():
-                    await db.execute(
-                        f"UPDATE {table_name} SET Model_3D = ? WHERE ID = ? AND (Model_3D IS NULL OR Model_3D = '')",
-                        (model_val, rid)
-                    )
-                    restored += 1
-                logger.info(f"Restored {restored} Model_3D values after full sync")
-            synced_count = upsert_result["successful"]
-            skipped_count = upsert_result["skipped"]
+            synced_count = totals["successful"]
+            skipped_count = totals["skipped"]
+            unchanged_count = totals["unchanged"]
+            urls_processed = totals["urls_processed"]
+            expected_total_count = totals["fetched"] if sync_type == "full" else None
 
             # Log warning if any records were skipped
             if skipped_count > 0:
@@ -216,6 +234,8 @@ class SyncService:
 
             # Build message with skipped records info
             message = f"Successfully synced {synced_count} records and processed {urls_processed} image URLs"
+            if unchanged_count > 0:
+                message += f" ({unchanged_count} unchanged, not rewritten)"
             if skipped_count > 0:
                 message += f" (⚠️ {skipped_count} records skipped - missing ID field)"
 
@@ -224,6 +244,8 @@ class SyncService:
                 "status": "success",
                 "records_synced": synced_count,
                 "records_skipped": skipped_count,
+                "records_unchanged": unchanged_count,
+                "records_changed": len(totals["changes"]),
                 "urls_processed": urls_processed,
                 "duration": duration,
                 "message": message,
@@ -349,10 +371,11 @@ class SyncService:
                 logger.warning(f"Could not parse last_modified_time: {last_modified}, running daily sync")
                 return await self.sync_report(report_name, "daily")
 
-            # Fetch records modified since last sync
-            records = await zoho_api.get_modified_records_since(report_name, last_sync_dt)
+            # Stream records modified since last sync through the pipeline
+            criteria = zoho_api.modified_since_criteria(last_sync_dt)
+            totals = await self._stream_upsert(report_name, table_name, criteria)
 
-            if not records:
+            if totals["fetched"] == 0:
                 logger.info(f"No modified records found for {report_name} since {last_modified}")
                 return {
                     "report_name": report_name,
@@ -361,33 +384,13 @@ class SyncService:
                     "message": "No new changes"
                 }
 
-            logger.info(f"Found {len(records)} modified records for {report_name}")
-
-            # Get existing records to preserve good URLs
-            existing_records = {}
-            try:
-                existing_data = await db.get_all_records(table_name)
-                existing_records = {str(r.get('ID', '')): r for r in existing_data}
-            except Exception as e:
-                logger.warning(f"Could not fetch existing records for comparison: {e}")
-
-            # Process image URLs
-            records_with_urls, urls_processed = image_url_processor.process_records_for_urls(
-                records, report_name, existing_records
-            )
-
-            # Preserve local Model_3D values
-            records_with_urls = self._preserve_model_3d(records_with_urls, existing_records)
-
-            # Upsert records (not clearing table - incremental update)
-            upsert_result = await db.upsert_records(table_name, records_with_urls)
-            synced_count = upsert_result["successful"]
+            logger.info(f"Found {totals['fetched']} modified records for {report_name}")
+            synced_count = totals["successful"]
+            unchanged_count = totals["unchanged"]
+            urls_processed = totals["urls_processed"]
 
             # Update sync metadata
-            new_last_modified = max(
-                (r.get("Modified_Time", "") for r in records if r.get("Modified_Time")),
-                default=last_modified
-            )
+            new_last_modified = totals["max_modified"] or last_modified
 
             if new_last_modified:
                 # Get current record count
@@ -398,12 +401,14 @@ class SyncService:
             await db.log_sync("incremental", table_name, "success", synced_count)
 
             duration = (get_toronto_now() - start_time).total_seconds()
-            logger.info(f"Smart sync completed: {synced_count} records in {duration:.2f}s")
+            logger.info(f"Smart sync completed: {synced_count} records ({unchanged_count} unchanged) in {duration:.2f}s")
 
             return {
                 "report_name": report_name,
                 "status": "success",
                 "records_synced": synced_count,
+                "records_unchanged": unchanged_count,
+                "records_changed": len(totals["changes"]),
                 "urls_processed": urls_processed,
                 "duration": duration,
                 "message": f"Synced {synced_count} modified records"
@@ -446,17 +451,16 @@ class SyncService:
             # Step 2: Compare with local database to find actual changes
             table_name = "Item_Report"
             records_to_sync = []
+            local_records = await db.get_records_by_ids(
+                table_name, [r.get("ID") for r in sync_records]
+            )
 
             for record in sync_records:
                 record_id = record.get("ID")
                 if not record_id:
                     continue
 
-                # Get local record
-                local_record = await db.fetchone(
-                    f"SELECT * FROM {table_name} WHERE ID = ?",
-                    (record_id,)
-                )
+                local_record = local_records.get(str(record_id))
 
                 if not local_record:
                     # New record, needs sync
@@ -509,22 +513,11 @@ class SyncService:
             # Step 3: Sync only the changed records
             logger.info(f"[Smart Sync] Syncing {len(records_to_sync)} changed records")
 
-            # Get existing records to preserve good URLs
-            existing_records = {}
-            try:
-                existing_data = await db.get_all_records(table_name)
-                existing_records = {str(r.get('ID', '')): r for r in existing_data}
-            except Exception as e:
-                logger.warning(f"Could not fetch existing records for comparison: {e}")
-
-            # Process image URLs
-            records_with_urls, urls_processed = image_url_processor.process_records_for_urls(
-                records_to_sync, "Item_Report", existing_records
+            # Process image URLs and preserve local Model_3D values
+            records_with_urls, urls_processed = await self._prepare_records(
+                records_to_sync, "Item_Report", table_name
             )
 
-            # Preserve local Model_3D values
-            records_with_urls = self._preserve_model_3d(records_with_urls, existing_records)
-
             # Upsert only the changed records
             upsert_result = await db.upsert_records(table_name, records_with_urls)
             synced_count = upsert_result["successful"]
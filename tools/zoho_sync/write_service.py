@@ -1,11 +1,21 @@
 """
 Zoho Write Service - Handles bidirectional sync from website to Zoho Creator
 Uses a write-behind queue pattern for efficient API usage
+
+Field changes land in pending_zoho_updates; each touched record also gets
+one job in the shared job queue (tools/job_queue.py, queue 'zoho_write').
+The drainer leases a record's job before pushing its changes, so a crash
+mid-push just lets the lease expire and the record is retried, failures
+back off exponentially, and a record that keeps failing ends up 'dead'
+instead of being retried forever.
 """
+import asyncio
 import json
 import logging
+import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from tools.job_queue import JobQueue, ensure_schema as ensure_job_schema
 from .database import db
 from .zoho_api import zoho_api
 from .utils import get_toronto_now_iso
@@ -17,6 +27,49 @@ class ZohoWriteService:
     def __init__(self):
         self.max_batch_size = 10  # Max records to sync per cycle
         self.max_retries = 3
+        self.queue = JobQueue("zoho_write", lease_seconds=120,
+                              max_attempts=self.max_retries, backoff_base=30.0,
+                              on_dead=self._record_dead)
+
+    def _with_jobs(self, fn, *args):
+        """Run fn(conn, *args) on a short-lived sqlite3 connection (the job
+        queue is sync; called through asyncio.to_thread)."""
+        conn = sqlite3.connect(db.db_path, timeout=30)
+        try:
+            return fn(conn, *args)
+        finally:
+            conn.close()
+
+    async def _jobs(self, fn, *args):
+        return await asyncio.to_thread(self._with_jobs, fn, *args)
+
+    @staticmethod
+    def _record_dead(conn: sqlite3.Connection, key: str, record: dict, error: str) -> None:
+        """The queue gave up on a record (failed or lease-expired too often):
+        nothing will retry its changes any more, so stop reporting them as
+        pending."""
+        logger.error(f"Giving up on record {record['record_id']}: {error}")
+        conn.execute("""
+            UPDATE pending_zoho_updates SET status = 'failed'
+            WHERE record_id = ? AND report_name = ? AND status IN ('pending', 'syncing')
+        """, (record['record_id'], record['report_name']))
+
+    def _init_jobs(self, conn: sqlite3.Connection) -> None:
+        ensure_job_schema(conn)
+        # Records queued before the job queue existed
+        conn.execute("""
+            INSERT OR IGNORE INTO jobs (queue, key, payload)
+            SELECT DISTINCT ?, report_name || ':' || record_id,
+                   json_object('record_id', record_id, 'report_name', report_name)
+            FROM pending_zoho_updates
+            WHERE status IN ('pending', 'syncing') AND retry_count < ?
+        """, (self.queue.name, self.max_retries))
+        # ...and ones that had already used up their retries then
+        conn.execute("""
+            UPDATE pending_zoho_updates SET status = 'failed'
+            WHERE status IN ('pending', 'syncing') AND retry_count >= ?
+        """, (self.max_retries,))
+        conn.commit()
 
     async def init_tables(self):
         """Initialize the pending updates table"""
@@ -58,6 +111,7 @@ class ZohoWriteService:
             """)
 
             await db._connection.commit()
+            await self._jobs(self._init_jobs)
             logger.info("Initialized pending_zoho_updates and sync_conflicts tables")
 
     async def queue_update(self, record_id: str, report_name: str,
@@ -86,6 +140,8 @@ class ZohoWriteService:
             except Exception as e:
                 logger.error(f"Failed to queue update for {record_id}.{field}: {e}")
 
+        await self._jobs(self.queue.enqueue, f"{report_name}:{record_id}",
+                         {"record_id": record_id, "report_name": report_name})
         logger.info(f"Queued {len(changes)} field updates for record {record_id}")
 
     async def get_pending_count(self) -> int:
@@ -105,39 +161,37 @@ class ZohoWriteService:
         return result['count'] if result else 0
 
     async def process_pending_updates(self) -> Dict[str, int]:
-        """Process queued updates in batches"""
+        """Process queued updates in batches: lease up to max_batch_size
+        due record jobs, push each record's changes."""
         processed = 0
         failed = 0
 
-        # Get distinct records with pending updates
-        pending_records = await db.fetchall("""
-            SELECT DISTINCT record_id, report_name
-            FROM pending_zoho_updates
-            WHERE status = 'pending' AND retry_count < ?
-            ORDER BY created_at ASC
-            LIMIT ?
-        """, (self.max_retries, self.max_batch_size))
-
-        if not pending_records:
-            return {"processed": 0, "failed": 0}
-
-        logger.info(f"Processing {len(pending_records)} records with pending updates")
-
-        for record in pending_records:
+        for _ in range(self.max_batch_size):
+            job = await self._jobs(self.queue.claim, "zoho_write")
+            if job is None:
+                break
+            record = job.payload
             success = await self._sync_record(record['record_id'], record['report_name'])
             if success:
+                await self._jobs(self.queue.complete, job)
                 processed += 1
             else:
+                await self._jobs(self.queue.fail, job,
+                                 f"zoho update failed (attempt {job.attempts})")
                 failed += 1
 
+        if processed or failed:
+            logger.info(f"Processed {processed + failed} records with pending updates")
         return {"processed": processed, "failed": failed}
 
     async def _sync_record(self, record_id: str, report_name: str) -> bool:
         """Sync a single record's pending changes to Zoho"""
-        # Get all pending changes for this record
+        # Get all pending changes for this record. 'syncing' rows are from a
+        # push that died midway — the caller holds the record's lease, so
+        # nobody else is working on them.
         changes = await db.fetchall("""
             SELECT id, field_name, new_value, old_value FROM pending_zoho_updates
-            WHERE record_id = ? AND report_name = ? AND status = 'pending'
+            WHERE record_id = ? AND report_name = ? AND status IN ('pending', 'syncing')
         """, (record_id, report_name))
 
         if not changes:
@@ -207,15 +261,15 @@ class ZohoWriteService:
             SELECT COUNT(*) as count FROM pending_zoho_updates WHERE status = 'synced'
         """)
         failed = await db.fetchone("""
-            SELECT COUNT(*) as count FROM pending_zoho_updates
-            WHERE status = 'pending' AND retry_count >= ?
-        """, (self.max_retries,))
+            SELECT COUNT(*) as count FROM pending_zoho_updates WHERE status = 'failed'
+        """)
 
         return {
             "pending": pending['count'] if pending else 0,
             "syncing": syncing['count'] if syncing else 0,
             "synced": synced['count'] if synced else 0,
-            "failed": failed['count'] if failed else 0
+            "failed": failed['count'] if failed else 0,
+            "jobs": await self._jobs(self.queue.counts),
         }
 
     async def cleanup_old_records(self, days: int = 7):
@@ -225,6 +279,7 @@ class ZohoWriteService:
             WHERE status = 'synced'
             AND datetime(synced_at) < datetime('now', ?)
         """, (f'-{days} days',))
+        await self._jobs(self.queue.purge_done, days)
         logger.info(f"Cleaned up synced records older than {days} days")
 
 
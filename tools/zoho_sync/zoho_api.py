@@ -1,7 +1,8 @@
 import httpx
 import asyncio
+import random
 import sqlite3
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
@@ -49,6 +50,34 @@ def get_daily_call_count(days_back: int = 0) -> int:
     except Exception:
         return 0
 
+class ZohoCallBudgetExceeded(Exception):
+    """Raised when a paginated fetch would go past ZOHO_DAILY_CALL_BUDGET."""
+
+
+# Statuses worth retrying with backoff: throttling and Zoho-side errors.
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _AdaptiveLimit:
+    """Concurrency ceiling for page fetches: halves on throttling, creeps
+    back up by one after a run of clean responses (AIMD)."""
+
+    def __init__(self, maximum: int):
+        self.maximum = max(1, maximum)
+        self.current = self.maximum
+        self._clean = 0
+
+    def throttled(self):
+        self.current = max(1, self.current // 2)
+        self._clean = 0
+
+    def succeeded(self):
+        self._clean += 1
+        if self._clean >= self.current and self.current < self.maximum:
+            self.current += 1
+            self._clean = 0
+
+
 class ZohoCreatorAPI:
     def __init__(self):
         self.client_id = settings.zoho_client_id
@@ -155,24 +184,120 @@ class ZohoCreatorAPI:
             logger.error(f"Failed to fetch report {report_name}: {str(e)}")
             raise
 
+    async def _get_page_with_retry(self, report_name: str, criteria: Optional[str], page: int,
+                                   page_size: int, limiter: _AdaptiveLimit,
+                                   max_retries: int = 5) -> Dict:
+        """get_report_data with exponential backoff on 429/5xx/transport
+        errors. A 404 past page 1 means we paginated off the end."""
+        attempt = 0
+        while True:
+            try:
+                result = await self.get_report_data(report_name, criteria, page, page_size)
+                limiter.succeeded()
+                return result
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status == 404 and page > 1:
+                    return {"data": [], "has_more": False, "total_records": 0}
+                if status not in _RETRYABLE_STATUSES or attempt >= max_retries:
+                    raise
+                retry_after = e.response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else None
+            except httpx.TransportError:
+                if attempt >= max_retries:
+                    raise
+                delay = None
+            limiter.throttled()
+            attempt += 1
+            if delay is None:
+                delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"Retrying {report_name} page {page} in {delay:.1f}s "
+                           f"(attempt {attempt}/{max_retries}, concurrency now {limiter.current})")
+            await asyncio.sleep(delay)
+
+    def _remaining_call_budget(self) -> Optional[int]:
+        budget = settings.zoho_daily_call_budget
+        if budget <= 0:
+            return None
+        return budget - get_daily_call_count()
+
+    async def iter_report_pages(self, report_name: str, criteria: str = None,
+                                page_size: int = 200,
+                                max_concurrency: Optional[int] = None
+                                ) -> AsyncIterator[Tuple[int, List[Dict]]]:
+        """Yield (page_number, records) for every page of a report as each
+        page arrives — not necessarily in page order.
+
+        Page 1 is fetched alone. If it is full, up to `max_concurrency`
+        (default ZOHO_PAGE_CONCURRENCY) further pages are kept in flight
+        until a short page marks the end; pages requested past the end come
+        back empty, so at most concurrency-1 calls are wasted. Concurrency
+        is halved on 429/5xx and recovers as responses come back clean.
+        Raises ZohoCallBudgetExceeded rather than start a request past
+        ZOHO_DAILY_CALL_BUDGET."""
+        limiter = _AdaptiveLimit(max_concurrency or settings.zoho_page_concurrency)
+        remaining = self._remaining_call_budget()
+
+        def reserve_call():
+            nonlocal remaining
+            if remaining is None:
+                return
+            if remaining <= 0:
+                raise ZohoCallBudgetExceeded(
+                    f"Daily Zoho API budget ({settings.zoho_daily_call_budget}) reached "
+                    f"while fetching {report_name}"
+                )
+            remaining -= 1
+
+        reserve_call()
+        first = await self._get_page_with_retry(report_name, criteria, 1, page_size, limiter)
+        logger.info(f"Fetched page 1 of {report_name}: {len(first['data'])} records")
+        yield 1, first["data"]
+        if not first["has_more"]:
+            return
+
+        next_page = 2
+        last_page: Optional[int] = None  # first short page seen
+        in_flight: Dict[asyncio.Task, int] = {}
+        try:
+            while True:
+                while (len(in_flight) < limiter.current
+                       and (last_page is None or next_page < last_page)):
+                    reserve_call()
+                    task = asyncio.create_task(self._get_page_with_retry(
+                        report_name, criteria, next_page, page_size, limiter,
+                    ))
+                    in_flight[task] = next_page
+                    next_page += 1
+                if not in_flight:
+                    break
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = in_flight.pop(task)
+                    result = task.result()
+                    if not result["has_more"]:
+                        last_page = page if last_page is None else min(last_page, page)
+                    if result["data"]:
+                        logger.info(f"Fetched page {page} of {report_name}: {len(result['data'])} records")
+                        yield page, result["data"]
+        finally:
+            for task in in_flight:
+                task.cancel()
+
     async def get_all_report_data(self, report_name: str, criteria: str = None) -> List[Dict]:
         """Get all records from a report with pagination"""
-        all_records = []
-        page = 1
-        has_more = True
-
-        while has_more:
-            result = await self.get_report_data(report_name, criteria, page)
-            all_records.extend(result["data"])
-            has_more = result["has_more"]
-            page += 1
-
-            logger.info(f"Fetched page {page - 1} of {report_name}: {len(result['data'])} records")
+        pages: Dict[int, List[Dict]] = {}
+        async for page, records in self.iter_report_pages(report_name, criteria):
+            pages[page] = records
 
+        all_records = []
+        for page in sorted(pages):
+            all_records.extend(pages[page])
         return all_records
 
-    async def get_today_modified_records(self, report_name: str) -> List[Dict]:
-        """Get records modified today"""
+    @staticmethod
+    def today_modified_criteria() -> str:
+        """Criteria for records modified today"""
         # Get today's and tomorrow's date in Zoho format (d-MMM-yyyy)
         today = datetime.now()
         tomorrow = today + timedelta(days=1)
@@ -185,9 +310,28 @@ class ZohoCreatorAPI:
 
         # Criteria for records modified today (using range for datetime field)
         # Modified_Time is a datetime field, so == doesn't work with date-only values
-        criteria = f'Modified_Time >= "{today_str}" && Modified_Time < "{tomorrow_str}"'
+        return f'Modified_Time >= "{today_str}" && Modified_Time < "{tomorrow_str}"'
+
+    @staticmethod
+    def modified_since_criteria(since_date: datetime, field_name: str = "Modified_Time") -> str:
+        """Criteria for records where `field_name` is on/after `since_date`.
 
-        logger.info(f"Fetching records from {report_name} modified between {today_str} and {tomorrow_str}")
+        Note: Zoho Creator v2 criteria only reliably supports date-level resolution
+        (datetime-precision criteria returns 404). So sub-day sync intervals will
+        re-fetch the current day's matching rows each cycle — still vastly cheaper
+        than a full-table fetch.
+        """
+        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        day = since_date.strftime("%d")
+        month = month_names[since_date.month - 1]
+        date_str = f"{day}-{month}-{since_date.year}"
+        return f'{field_name} >= "{date_str}"'
+
+    async def get_today_modified_records(self, report_name: str) -> List[Dict]:
+        """Get records modified today"""
+        criteria = self.today_modified_criteria()
+        logger.info(f"Fetching records from {report_name} with {criteria}")
         return await self.get_all_report_data(report_name, criteria)
 
     async def get_modified_records_since(
@@ -198,50 +342,24 @@ class ZohoCreatorAPI:
     ) -> List[Dict]:
         """Get records where `field_name` is on/after `since_date`.
 
-        Note: Zoho Creator v2 criteria only reliably supports date-level resolution
-        (datetime-precision criteria returns 404). So sub-day sync intervals will
-        re-fetch the current day's matching rows each cycle — still vastly cheaper
-        than a full-table fetch.
-
         Some reports don't expose Modified_Time in their column set (or expose it
         as a non-queryable lookup/formula field); `field_name` lets the caller
         fall back to e.g. Added_Time for those.
         """
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        day = since_date.strftime("%d")
-        month = month_names[since_date.month - 1]
-        date_str = f"{day}-{month}-{since_date.year}"
-        criteria = f'{field_name} >= "{date_str}"'
-
-        logger.info(f"Fetching {report_name} where {field_name} >= {date_str}")
+        criteria = self.modified_since_criteria(since_date, field_name)
+        logger.info(f"Fetching {report_name} where {criteria}")
         return await self.get_all_report_data(report_name, criteria)
 
     async def get_report_total_count(self, report_name: str) -> int:
         """Get the total count of records in a report"""
         try:
-            # First, try to get metadata which might include count
-            metadata = await self.get_report_metadata(report_name)
-
-            # If metadata doesn't provide count, fetch records to count them
-            # Note: This is the most reliable way as Zoho API doesn't always
-            # provide total count in a separate endpoint
+            # Zoho API doesn't reliably provide a total count in a separate
+            # endpoint, so count by paging through the report (concurrently).
             logger.info(f"Counting total records for {report_name}...")
 
-            # We'll count by fetching all records
-            # This ensures accuracy but may take time for large datasets
             total_count = 0
-            page = 1
-            has_more = True
-
-            while has_more:
-                result = await self.get_report_data(report_name, criteria=None, page=page, page_size=200)
-                if "data" in result:
-                    total_count += len(result["data"])
-                    has_more = result.get("has_more", False)
-                    page += 1
-                else:
-                    break
+            async for _, records in self.iter_report_pages(report_name):
+                total_count += len(records)
 
             logger.info(f"Total count for {report_name}: {total_count}")
             return total_count